@@ -1,8 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
+from mediafiles.admin import image_job_status
 from .models import Slide
-import os
 
 class SlideAdmin(admin.ModelAdmin):
     list_display = ("title", "preview_image", "order", "is_active")  # แสดงตัวอย่างรูป
@@ -10,11 +10,22 @@ class SlideAdmin(admin.ModelAdmin):
     search_fields = ("title",)  # ค้นหาด้วยชื่อ
     list_filter = ("is_active",)  # ตัวกรองสถานะ
     ordering = ("order",)  # เรียงตาม order
+    readonly_fields = ("image_status",)
 
     fieldsets = (
         (
             _("Slide Information"),
-            {"fields": ("title", "description", "image", "link", "order", "is_active")},
+            {
+                "fields": (
+                    "title",
+                    "description",
+                    "image",
+                    "image_status",
+                    "link",
+                    "order",
+                    "is_active",
+                )
+            },
         ),
     )
 
@@ -22,24 +33,21 @@ class SlideAdmin(admin.ModelAdmin):
         """แสดงตัวอย่างภาพใน Django Admin"""
         if obj.image:
             return format_html(
-                '<img src="{}" style="width:100px; height:auto;" />', obj.image.url
+                '<img src="{}" style="width:100px; height:auto;" />',
+                obj.renditions.thumb,
             )
         return "-"
 
     preview_image.short_description = _("Preview")
 
-    def delete_model(self, request, obj):
-        """ลบไฟล์ภาพออกจากเซิร์ฟเวอร์เมื่อกดลบ Slide"""
-        if obj.image and os.path.isfile(obj.image.path):
-            os.remove(obj.image.path)
-        super().delete_model(request, obj)
-
-    def delete_queryset(self, request, queryset):
-        """ลบหลายรายการพร้อมกันและลบไฟล์ภาพ"""
-        for obj in queryset:
-            if obj.image and os.path.isfile(obj.image.path):
-                os.remove(obj.image.path)
-        super().delete_queryset(request, queryset)
+    def image_status(self, obj):
+        """สถานะการย่อรูปโดย process_image_jobs"""
+        return image_job_status(obj, "image")
+
+    image_status.short_description = _("Image processing")
+
+    # การลบไฟล์ภาพเมื่อลบ Slide (ทั้งทีละรายการและหลายรายการ) อยู่ใน
+    # signal delete_slide_image ซึ่งลบไฟล์หลัง transaction commit
 
 
 admin.site.register(Slide, SlideAdmin)
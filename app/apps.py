@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        # ลงทะเบียน signal สำหรับล้าง cache ของหน้าแรก
+        from . import cache  # noqa: F401
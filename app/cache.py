@@ -0,0 +1,77 @@
+import asyncio
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.oncommit import OnCommitBatch
+from mediafiles.jobs import image_processed
+from mediafiles.models import MediaFile
+from .models import Slide
+
+LANDING_CONTEXT_CACHE_KEY = "app:landing_context"
+LANDING_CONTEXT_TIMEOUT = 60 * 15  # 15 นาที (ล้างทันทีผ่าน signal เมื่อข้อมูลเปลี่ยน)
+LOGO_NAMES = ("social_logo", "social_logo_text")
+
+
+async def abuild_landing_context():
+    """
+    ดึงโลโก้ ข้อความโลโก้ (query เดียว) และสไลด์ที่เปิดใช้งาน พร้อมกันด้วย asyncio.gather
+
+    อ่านจาก primary เสมอ เพราะผลถูก cache ร่วมกันทุก request หลัง signal ล้าง cache
+    ถ้าอ่านจาก replica ที่ยังตามไม่ทันจะได้ข้อมูลเก่าค้างอยู่ทั้ง ``LANDING_CONTEXT_TIMEOUT``
+    """
+
+    async def logos():
+        return {
+            media_file.name: media_file
+            async for media_file in MediaFile.objects.using(DEFAULT_DB_ALIAS).filter(
+                name__in=LOGO_NAMES
+            )
+        }
+
+    async def slides():
+        slides = Slide.objects.using(DEFAULT_DB_ALIAS).filter(is_active=True).order_by("order")
+        return [slide async for slide in slides]
+
+    media, slide_list = await asyncio.gather(logos(), slides())
+    return {
+        "logo": media.get("social_logo"),
+        "logo_text": media.get("social_logo_text"),
+        "slides": slide_list,
+    }
+
+
+async def aget_landing_context():
+    """คืนค่า context ของหน้าแรกจาก cache หรือสร้างใหม่ถ้ายังไม่มี"""
+    context = await cache.aget(LANDING_CONTEXT_CACHE_KEY)
+    if context is None:
+        context = await abuild_landing_context()
+        await cache.aset(LANDING_CONTEXT_CACHE_KEY, context, LANDING_CONTEXT_TIMEOUT)
+    return context
+
+
+_invalidated = OnCommitBatch(cache.delete_many)
+
+
+def invalidate_landing_context():
+    """
+    ล้าง cache ของหน้าแรกหลัง transaction ปัจจุบัน commit
+
+    ถ้าล้างทันที request อื่นอาจสร้าง cache ใหม่จากแถวเดิมที่ยังไม่ถูก commit ทับ
+    แล้ว cache ข้อมูลเก่าไว้ทั้ง ``LANDING_CONTEXT_TIMEOUT``
+    """
+    _invalidated.add(LANDING_CONTEXT_CACHE_KEY)
+
+
+# ล้าง cache เมื่อสไลด์หรือไฟล์สื่อถูกบันทึก/ลบ
+@receiver([post_save, post_delete], sender=Slide)
+@receiver([post_save, post_delete], sender=MediaFile)
+def landing_content_changed(sender, **kwargs):
+    invalidate_landing_context()
+
+
+# งานย่อรูปชี้ฟิลด์ไปยังไฟล์ใหม่ด้วย update() (ไม่ส่ง post_save) แล้วลบไฟล์เดิมหลัง commit
+@receiver(image_processed, sender=Slide)
+@receiver(image_processed, sender=MediaFile)
+def landing_image_processed(sender, **kwargs):
+    invalidate_landing_context()
@@ -0,0 +1,159 @@
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from news.models import Article, bulk_delete_articles
+
+DEPLOYMENTS = {
+    # uvicorn รันได้ทั้งสองแบบ จึงเทียบกันที่ตัวแอปพลิเคชันเท่านั้น
+    "wsgi": ["core.wsgi:application", "--interface", "wsgi"],
+    "asgi": ["core.asgi:application", "--interface", "asgi3"],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "ยิงโหลดหน้าสาธารณะ (หน้าแรก รายการข่าว และข่าว) ผ่าน uvicorn แบบ WSGI และ ASGI "
+        "แล้วเทียบ p50/p99 และจำนวน request ต่อวินาที (ใช้ฐานข้อมูลตาม settings ปัจจุบัน "
+        "ข่าวทดสอบถูกลบเมื่อจบ)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="จำนวน request ต่อ URL")
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--workers", type=int, default=1, help="จำนวน worker ของ uvicorn")
+        parser.add_argument("--articles", type=int, default=200)
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--only", choices=sorted(DEPLOYMENTS))
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError("ต้องติดตั้ง uvicorn ก่อน (pip install uvicorn)")
+
+        articles = self.seed(options["articles"])
+        try:
+            latest = articles[-1]
+            urls = ["/", "/news/", latest.get_absolute_url()]
+            for name, target in DEPLOYMENTS.items():
+                if options["only"] and name != options["only"]:
+                    continue
+                with self.server(target, options["port"], options["workers"]):
+                    for url in urls:
+                        self.report(name, url, self.load(options, url))
+        finally:
+            bulk_delete_articles(Article.objects.filter(pk__in=[a.pk for a in articles]))
+
+    def seed(self, count):
+        prefix = f"bench-{time.time_ns()}"
+        now = timezone.now()
+        Article.objects.bulk_create(
+            Article(
+                title=f"{prefix} {i}",
+                slug=f"{prefix}-{i}",
+                content="benchmark " * 200,
+                status=Article.PUBLISHED,
+                publish_date=now - timedelta(minutes=count - i),
+            )
+            for i in range(count)
+        )
+        return list(Article.objects.filter(slug__startswith=prefix).order_by("publish_date"))
+
+    def server(self, target, port, workers):
+        command = [
+            sys.executable, "-m", "uvicorn", *target,
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--no-access-log", "--log-level", "warning",
+        ]
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get(
+            "DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE
+        )}
+        return _Server(command, port, env, cwd=settings.BASE_DIR)
+
+    def load(self, options, url):
+        """ยิง ``--requests`` ครั้งด้วย ``--concurrency`` connection (keep-alive)"""
+        port, total = options["port"], options["requests"]
+        latencies, errors = [], []
+        lock = threading.Lock()
+        remaining = iter(range(total))
+
+        def client():
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    started = time.perf_counter()
+                    try:
+                        connection.request("GET", url)
+                        response = connection.getresponse()
+                        response.read()
+                    except (OSError, http.client.HTTPException) as exc:
+                        errors.append(repr(exc))
+                        connection.close()
+                        continue
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        if response.status == 200:
+                            latencies.append(elapsed)
+                        else:
+                            errors.append(f"HTTP {response.status}")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client) for _ in range(options["concurrency"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors, time.perf_counter() - started
+
+    def report(self, deployment, url, result):
+        latencies, errors, elapsed = result
+        latencies.sort()
+
+        def percentile(p):
+            if not latencies:
+                return float("nan")
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(
+            f"{deployment:<5} {url[:40]:<40} {len(latencies) / elapsed:8.1f} req/s"
+            f"   p50 {percentile(0.50):7.1f}ms   p99 {percentile(0.99):7.1f}ms"
+            + (f"   errors {len(errors)}" if errors else "")
+        )
+
+
+class _Server:
+    """รัน uvicorn เป็น subprocess ระหว่างบล็อก ``with`` และรอจนรับ connection ได้"""
+
+    def __init__(self, command, port, env, cwd):
+        self.command, self.port, self.env, self.cwd = command, port, env, cwd
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.command, env=self.env, cwd=self.cwd)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CommandError(f"uvicorn หยุดทำงาน (exit {self.process.returncode})")
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=1).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.process.kill()
+        raise CommandError("uvicorn ไม่พร้อมภายใน 30 วินาที")
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait(timeout=30)
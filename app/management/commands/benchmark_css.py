@@ -0,0 +1,77 @@
+import gzip
+import re
+import statistics
+import time
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+MODES = (("เดิม", False), ("ตัด+critical", True))
+_NOSCRIPT_RE = re.compile(r"<noscript>.*?</noscript>", re.S)
+_STYLESHEET_RE = re.compile(r'<link rel="stylesheet" href="([^"]+)"')
+_IMPORT_RE = re.compile(r"@import\s+url\(")
+
+
+class Command(BaseCommand):
+    help = (
+        "เทียบขนาด CSS และประมาณเวลา first contentful paint ของหน้าแรก ระหว่าง CSS เต็มไฟล์กับ "
+        "CSS ที่ตัดแล้วพร้อม critical CSS (PRUNED_CSS) FCP คำนวณจากขนาดที่บีบอัดแล้วของ HTML "
+        "และ CSS ที่ block การแสดงผล กับ RTT/แบนด์วิดท์ที่กำหนด (ค่าเริ่มต้นเท่ากับ Slow 4G ของ "
+        "Lighthouse) ไม่ได้วัดจากเบราว์เซอร์ ให้รัน build_css ก่อน"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="/")
+        parser.add_argument("--requests", type=int, default=20)
+        parser.add_argument("--rtt", type=float, default=150, help="มิลลิวินาที")
+        parser.add_argument("--bandwidth", type=float, default=1.6, help="Mbps")
+
+    def handle(self, *args, **options):
+        bytes_per_ms = options["bandwidth"] * 1_000_000 / 8 / 1000
+        rtt = options["rtt"]
+        for label, pruned in MODES:
+            with override_settings(
+                DEBUG=False,
+                ALLOWED_HOSTS=["*"],
+                PRUNED_CSS=pruned,
+                # ชื่อไฟล์ไม่มี hash จะได้หาไฟล์ต้นทางจาก URL ได้
+                STORAGES={
+                    **settings.STORAGES,
+                    "staticfiles": {
+                        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+                    },
+                },
+            ):
+                cache.clear()
+                client = Client()
+                timings = []
+                for _ in range(options["requests"]):
+                    started = time.perf_counter()
+                    response = client.get(options["url"])
+                    timings.append(time.perf_counter() - started)
+            html = response.content
+            server_ms = statistics.median(timings) * 1000
+            blocking, imports = 0, 0
+            for href in _STYLESHEET_RE.findall(_NOSCRIPT_RE.sub("", html.decode())):
+                path = finders.find(href.removeprefix(settings.STATIC_URL))
+                if path is None:
+                    raise CommandError(f"ไม่พบไฟล์ของ {href}")
+                with open(path, "rb") as file:
+                    content = file.read()
+                blocking += len(gzip.compress(content))
+                imports += len(_IMPORT_RE.findall(content.decode()))
+
+            html_bytes = len(gzip.compress(html))
+            # เชื่อมต่อ (TCP+TLS) 2 RTT, ขอ HTML 1 RTT, CSS ที่ block อีก 1 RTT บน connection เดิม
+            # และ @import ไปโดเมนอื่น (Google Fonts) ต้องเชื่อมต่อใหม่อีก 3 RTT
+            fcp = server_ms + 3 * rtt + html_bytes / bytes_per_ms
+            if blocking:
+                fcp += rtt + blocking / bytes_per_ms
+            if imports:
+                fcp += 3 * rtt
+            self.stdout.write(
+                f"{label:<14} HTML {html_bytes / 1024:6.1f} KB  CSS ที่ block {blocking / 1024:6.1f} KB"
+                f"  @import ที่ block {imports}  server {server_ms:6.2f}ms  FCP (ประมาณ) {fcp:7.0f}ms"
+            )
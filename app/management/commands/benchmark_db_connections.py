@@ -0,0 +1,109 @@
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from news.views import published_articles
+
+MODES = ("per-request", "persistent", "pool")
+
+
+class Command(BaseCommand):
+    help = (
+        "จำลองรอบของ request (request_started, query หน้ารายการข่าว, request_finished) "
+        "บนฐานข้อมูลตาม settings ปัจจุบัน แบบเปิด connection ใหม่ทุก request, "
+        "persistent connection และ connection pool แล้วเทียบ latency และจำนวน connection ที่เปิด"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="จำนวน request ต่อ thread")
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--only", choices=MODES)
+
+    def handle(self, *args, **options):
+        base = connections.settings["default"]
+        for mode in MODES:
+            if options["only"] and mode != options["only"]:
+                continue
+            if mode == "pool" and not self.pool_available(base):
+                self.stdout.write("pool   ข้าม (ต้องใช้ PostgreSQL กับ psycopg 3 และ psycopg_pool)")
+                continue
+            alias = f"benchmark_{mode.replace('-', '_')}"
+            connections.settings[alias] = self.settings_for(mode, base, options["threads"])
+            try:
+                self.report(mode, *self.run(alias, options))
+            finally:
+                self.discard(alias)
+
+    def pool_available(self, base):
+        if base["ENGINE"] != "django.db.backends.postgresql":
+            return False
+        try:
+            import psycopg  # noqa: F401
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def settings_for(self, mode, base, threads):
+        options = {k: v for k, v in base["OPTIONS"].items() if k != "pool"}
+        settings = {**base, "OPTIONS": options, "CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False}
+        if mode == "persistent":
+            settings.update(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+        elif mode == "pool":
+            options["pool"] = {"min_size": threads, "max_size": threads}
+        return settings
+
+    def run(self, alias, options):
+        latencies, opened = [], []
+        lock = threading.Lock()
+
+        def count(sender, connection, **kwargs):
+            if connection.alias == alias:
+                with lock:
+                    opened.append(1)
+
+        def client():
+            timings = []
+            for _ in range(options["requests"]):
+                started = time.perf_counter()
+                request_started.send(sender=self.__class__)
+                list(published_articles().using(alias).order_by("-publish_date")[:12])
+                request_finished.send(sender=self.__class__)
+                timings.append(time.perf_counter() - started)
+            connections[alias].close()
+            with lock:
+                latencies.extend(timings)
+
+        connection_created.connect(count)
+        try:
+            threads = [threading.Thread(target=client) for _ in range(options["threads"])]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count)
+        return latencies, len(opened), elapsed
+
+    def report(self, mode, latencies, opened, elapsed):
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(
+            f"{mode:<12} {len(latencies) / elapsed:8.1f} req/s   p50 {percentile(0.50):7.2f}ms"
+            f"   p99 {percentile(0.99):7.2f}ms   เปิด connection {opened} ครั้ง"
+        )
+
+    def discard(self, alias):
+        connection = connections[alias]
+        connection.close()
+        if getattr(connection, "pool", None):
+            connection.close_pool()
+        del connections[alias]
+        del connections.settings[alias]
@@ -0,0 +1,94 @@
+import re
+import statistics
+import tempfile
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.http import HttpResponseNotFound
+from django.test import Client, RequestFactory, override_settings
+from django.views.static import serve
+from core.staticfiles import static_files_middleware
+
+MODES = (
+    # (ชื่อ, storage ของ collectstatic, ส่งด้วย middleware หรือ django.views.static.serve)
+    ("เดิม", "django.contrib.staticfiles.storage.StaticFilesStorage", False),
+    ("hash+บีบอัด", "core.staticfiles.CompressedManifestStaticFilesStorage", True),
+)
+ACCEPT_ENCODING = "gzip, deflate, br"
+
+
+class Command(BaseCommand):
+    help = (
+        "เทียบจำนวนไบต์และเวลาถึงไบต์แรก (TTFB) ของหน้าแรกพร้อมไฟล์ CSS/JS/ไอคอน ระหว่างไฟล์ static "
+        "แบบเดิม (ชื่อเดิม ส่งผ่าน django.views.static.serve) กับแบบมี hash และ gzip/brotli ที่ส่งผ่าน "
+        "static_files_middleware ทั้งการเข้าครั้งแรกและครั้งถัดไป (collectstatic ลงโฟลเดอร์ชั่วคราว)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="/")
+        parser.add_argument("--repeat", type=int, default=20, help="จำนวนรอบที่ใช้หาค่ากลางของ TTFB")
+
+    def handle(self, *args, **options):
+        for label, backend, use_middleware in MODES:
+            with tempfile.TemporaryDirectory() as root, override_settings(
+                DEBUG=False,
+                ALLOWED_HOSTS=["*"],
+                STATIC_ROOT=root,
+                STORAGES={**settings.STORAGES, "staticfiles": {"BACKEND": backend}},
+            ):
+                call_command("collectstatic", interactive=False, verbosity=0)
+                cache.clear()  # fragment ที่ cache ไว้อาจมี URL ของไฟล์ static แบบเดิม
+                if use_middleware:
+                    handler = static_files_middleware(lambda request: HttpResponseNotFound())
+                else:
+                    def handler(request, root=root):
+                        return serve(request, request.path[len(settings.STATIC_URL):], root)
+                self.report(label, options, handler)
+
+    def report(self, label, options, handler):
+        client = Client()
+        _, html, html_ttfb = self.measure(lambda: client.get(options["url"]), options["repeat"])
+        assets = sorted(set(re.findall(
+            rf'(?:href|src)="({re.escape(settings.STATIC_URL)}[^"]+)"', html.decode()
+        )))
+        factory = RequestFactory()
+        first_bytes, repeat_requests, lines = len(html), 0, []
+        for url in assets:
+            response, body, ttfb = self.measure(
+                lambda: handler(factory.get(url, HTTP_ACCEPT_ENCODING=ACCEPT_ENCODING)),
+                options["repeat"],
+            )
+            first_bytes += len(body)
+            if "immutable" not in response.get("Cache-Control", ""):
+                # browser ต้องถามซ้ำ (304) เมื่อเข้าหน้าถัดไป
+                repeat_requests += 1
+            lines.append(
+                f"    {url[:60]:<60} {len(body) / 1024:8.1f} KB  TTFB {ttfb * 1000:6.2f}ms  "
+                f"{response.get('Content-Encoding', 'identity'):<8} "
+                f"{response.get('Cache-Control', '-')}"
+            )
+        self.stdout.write(
+            f"{label}: ครั้งแรก {len(assets) + 1} request {first_bytes / 1024:.1f} KB "
+            f"(HTML TTFB {html_ttfb * 1000:.2f}ms), ครั้งถัดไปถามไฟล์ static ซ้ำ {repeat_requests} request"
+        )
+        for line in lines:
+            self.stdout.write(line)
+
+    def measure(self, send, repeat):
+        """ส่ง ``repeat`` ครั้ง คืน response และ body ของครั้งสุดท้าย กับค่ากลางของเวลาจนได้ไบต์แรก"""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = send()
+            if response.streaming:
+                chunks = iter(response.streaming_content)
+                body = next(chunks, b"")
+                timings.append(time.perf_counter() - started)
+                body += b"".join(chunks)
+                response.close()
+            else:
+                timings.append(time.perf_counter() - started)
+                body = response.content
+        return response, body, statistics.median(timings)
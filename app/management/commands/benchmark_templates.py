@@ -0,0 +1,44 @@
+import re
+import statistics
+from collections import defaultdict
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+_METRIC_RE = re.compile(r'tpl-([\w-]+);dur=([\d.]+);desc="(\d+) queries"')
+
+
+class Command(BaseCommand):
+    help = (
+        "render หน้าเว็บซ้ำหลายรอบโดยเปิด TEMPLATE_PROFILING แล้วสรุปเวลาและจำนวน query "
+        "ของแต่ละบล็อก {% profile %} ทั้งแบบ cache ว่าง (--cold) และแบบมี cache"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="*", default=["/"])
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--cold", action="store_true", help="ล้าง cache ก่อนทุก request")
+
+    def handle(self, *args, **options):
+        client = Client()
+        with override_settings(TEMPLATE_PROFILING=True, ALLOWED_HOSTS=["*"]):
+            for url in options["urls"]:
+                blocks = defaultdict(list)
+                for _ in range(options["requests"]):
+                    if options["cold"]:
+                        cache.clear()
+                    response = client.get(url)
+                    for name, duration, queries in _METRIC_RE.findall(
+                        response.get("Server-Timing", "")
+                    ):
+                        blocks[name].append((float(duration), int(queries)))
+                self.stdout.write(f"{url} ({response.status_code})")
+                for name, samples in sorted(
+                    blocks.items(), key=lambda item: -statistics.median(d for d, _ in item[1])
+                ):
+                    durations = [d for d, _ in samples]
+                    self.stdout.write(
+                        f"  {name:<16} median {statistics.median(durations):7.2f}ms "
+                        f"max {max(durations):7.2f}ms   "
+                        f"queries {max(q for _, q in samples)}"
+                    )
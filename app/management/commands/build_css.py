@@ -0,0 +1,52 @@
+import gzip
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core import css
+from core.rendering import project_templates
+
+
+class Command(BaseCommand):
+    help = (
+        "ตัด CSS ที่ไม่ได้ใช้ออกจาก static/dist/styles.css (ผลของ Tailwind) เป็น static/dist/site.css "
+        "และแยก CSS ส่วนบนของหน้าไว้ที่ static/dist/critical/ (รันหลัง npm run build:css)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--safelist", nargs="*", default=[], help="คลาสที่ต้องเก็บไว้เสมอ")
+
+    def handle(self, *args, **options):
+        static_dir = settings.STATICFILES_DIRS[0]
+        source = os.path.join(static_dir, css.SOURCE)
+        if not os.path.isfile(source):
+            raise CommandError(f"ไม่พบ {source} ให้รัน npm run build:css ก่อน")
+        with open(source, encoding="utf-8") as file:
+            original = file.read()
+        rules = css.parse(original)
+        self.stdout.write(f"{css.SOURCE:<28} {_sizes(original)}")
+        templates = {name: path for _, name, path in project_templates()}
+
+        classes = css.used_classes([*templates.values(), *css.script_paths()], options["safelist"])
+        self.write(os.path.join(static_dir, css.PRUNED), css.serialize(css.prune(rules, classes)))
+        for page, names in css.CRITICAL.items():
+            missing = [name for name in names if name not in templates]
+            if missing:
+                raise CommandError(f"ไม่พบเทมเพลต {', '.join(missing)} ของหน้า {page}")
+            classes = css.used_classes([templates[name] for name in names], options["safelist"])
+            # @import (ฟอนต์) ไม่ใส่ใน critical ให้โหลดพร้อมไฟล์เต็มเพื่อไม่ block การแสดงผล
+            self.write(
+                os.path.join(static_dir, css.CRITICAL_DIR, f"{page}.css"),
+                css.serialize(css.prune(rules, classes, imports=False)),
+            )
+
+    def write(self, path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        name = os.path.relpath(path, settings.STATICFILES_DIRS[0]).replace(os.sep, "/")
+        self.stdout.write(f"{name:<28} {_sizes(content)}")
+
+
+def _sizes(content):
+    data = content.encode()
+    return f"{len(data) / 1024:7.1f} KB (gzip {len(gzip.compress(data)) / 1024:6.1f} KB)"
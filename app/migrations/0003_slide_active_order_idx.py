@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_alter_slide_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='slide',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order'], name='app_slide_active_order_idx'),
+        ),
+    ]
@@ -2,9 +2,13 @@ import uuid
 import os
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from PIL import Image
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from core.caching import purge_fragments_for
+from core.tracking import FieldTrackingMixin
+from mediafiles.cleanup import delete_file_on_commit
+from mediafiles.jobs import queue_image_job
+from mediafiles.renditions import Renditions
 
 
 def get_slide_upload_path(instance, filename):
@@ -14,7 +18,7 @@ def get_slide_upload_path(instance, filename):
     return os.path.join("app/slides/", filename)
 
 
-class Slide(models.Model):
+class Slide(FieldTrackingMixin, models.Model):
     title = models.CharField(_("Title"), max_length=200, null=False, blank=False)
     description = models.TextField(_("Description"), blank=True, null=True)
     image = models.ImageField(
@@ -24,35 +28,48 @@ class Slide(models.Model):
     order = models.PositiveIntegerField(_("Order"), default=0)
     is_active = models.BooleanField(_("Active"), default=True)
 
+    tracked_fields = ("image",)
+
+    class Meta:
+        indexes = [
+            # สไลด์บนหน้าแรก: WHERE is_active ORDER BY order
+            models.Index(
+                fields=["order"],
+                condition=models.Q(is_active=True),
+                name="app_slide_active_order_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
+    @property
+    def renditions(self):
+        """รูปย่อของสไลด์ เช่น ``slide.renditions.hero``"""
+        return Renditions(self.image)
+
     def save(self, *args, **kwargs):
-        """ลดขนาดภาพก่อนบันทึก และลบรูปเก่าเมื่ออัปเดต"""
-        try:
-            old_instance = Slide.objects.get(pk=self.pk)
-            if old_instance.image and old_instance.image != self.image:
-                if os.path.isfile(old_instance.image.path):
-                    os.remove(old_instance.image.path)
-        except Slide.DoesNotExist:
-            pass
+        """ลบรูปเก่าเมื่ออัปเดต และส่งรูปใหม่ไปย่อขนาดนอก request"""
+        delete_file_on_commit(self.replaced_file("image"))
 
+        # ย่อรูปเฉพาะตอนสร้างใหม่หรือเปลี่ยนรูป
+        image_changed = self._state.adding or self.has_changed("image")
         super().save(*args, **kwargs)
 
-        # ตรวจสอบว่ามีรูปภาพหรือไม่
-        if self.image:
-            image_path = self.image.path
-            with Image.open(image_path) as img:
-                max_width = 1920  # กำหนดความกว้างสูงสุด 1920px 600px
-                if img.width > max_width:
-                    new_height = int((max_width / img.width) * img.height)
-                    img = img.resize((max_width, new_height), Image.LANCZOS)
-                    img.save(image_path, quality=85)  # ลดคุณภาพเพื่อประหยัดพื้นที่
+        # ตรวจสอบว่ามีรูปภาพหรือไม่ แล้วให้ process_image_jobs ย่อรูป
+        if self.image and image_changed:
+            queue_image_job(self, "image", max_width=1920)  # กำหนดความกว้างสูงสุด 1920px
 
 
 # Signal เพื่อลบไฟล์ภาพเมื่อ Slide ถูกลบ
 @receiver(post_delete, sender=Slide)
 def delete_slide_image(sender, instance, **kwargs):
     """ลบไฟล์รูปภาพจริง ๆ เมื่อลบ Record"""
-    if instance.image and os.path.isfile(instance.image.path):
-        os.remove(instance.image.path)
+    purge_fragments_for(sender)
+    delete_file_on_commit(instance.image)
+
+
+@receiver(post_save, sender=Slide)
+def slide_saved(sender, instance, **kwargs):
+    """ล้าง cache ส่วนสไลด์ของหน้าแรกเมื่อมีการบันทึก Slide"""
+    purge_fragments_for(sender)
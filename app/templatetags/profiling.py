@@ -0,0 +1,29 @@
+from django import template
+from core.rendering import profile_block
+
+register = template.Library()
+
+
+class ProfileNode(template.Node):
+    def __init__(self, name, nodelist):
+        self.name = name
+        self.nodelist = nodelist
+
+    def render(self, context):
+        with profile_block(self.name.resolve(context)):
+            return self.nodelist.render(context)
+
+
+@register.tag
+def profile(parser, token):
+    """
+    จับเวลาและนับ query ของส่วนที่ครอบไว้ เมื่อเปิด ``TEMPLATE_PROFILING``::
+
+        {% profile "slide" %}{% include 'slide.html' %}{% endprofile %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(f"{bits[0]} ต้องมีชื่อของบล็อกหนึ่งค่า")
+    nodelist = parser.parse(("endprofile",))
+    parser.delete_first_token()
+    return ProfileNode(parser.compile_filter(bits[1]), nodelist)
@@ -0,0 +1,32 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+from core.css import PRUNED, SOURCE, critical_css
+
+register = template.Library()
+
+
+@register.simple_tag
+def stylesheet(critical=None):
+    """
+    ลิงก์ CSS ของเว็บ เมื่อเปิด ``PRUNED_CSS`` ใช้ไฟล์ที่ตัดคลาสที่ไม่ได้ใช้แล้ว (core/css.py)
+    และถ้าระบุหน้า จะฝัง CSS ส่วนบนของหน้านั้นไว้ใน ``<style>`` แล้วโหลดไฟล์เต็มแบบไม่ block::
+
+        {% stylesheet critical="index" %}
+    """
+    if not settings.PRUNED_CSS:
+        return format_html('<link rel="stylesheet" href="{}" />', static(SOURCE))
+    href = static(PRUNED)
+    inline = critical_css(critical) if critical else None
+    if not inline:
+        return format_html('<link rel="stylesheet" href="{}" />', href)
+    return format_html(
+        "<style>{}</style>\n"
+        '<link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'" />\n'
+        '<noscript><link rel="stylesheet" href="{}" /></noscript>',
+        mark_safe(inline.replace("</", "<\\/")),
+        href,
+        href,
+    )
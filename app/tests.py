@@ -1,3 +1,456 @@
-from django.test import TestCase
+import gzip
+import io
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from PIL import Image
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache.utils import make_template_fragment_key
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.template import engines
+from django.templatetags.static import static
+from core import css
+from core.caching import FRAGMENT_DEPENDENCIES
+from core.database import database_config, replica_configs
+from core.instrumentation import reset_metrics
+from core.rendering import preload_templates
+from core.testing import (
+    QueryBudgetTestMixin,
+    QueryPlanTestMixin,
+    ReplicaTestMixin,
+    changelist_url,
+)
+from mediafiles import cleanup
+from mediafiles.jobs import run_pending
+from mediafiles.models import MediaFile
+from news.models import Article
+from .cache import LANDING_CONTEXT_CACHE_KEY
+from .models import Slide
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+def make_image(name="slide.jpg", size=(40, 20)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "navy").save(buffer, format="JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
 
 # Create your tests here.
+class LandingPageCacheTests(QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MediaFile.objects.create(name="social_logo", file="mediafiles/soc_logo.webp")
+        MediaFile.objects.create(
+            name="social_logo_text", file="mediafiles/social_logo_text.webp"
+        )
+        # สร้างผ่าน bulk_create เพื่อไม่ให้ Slide.save ย่อรูปที่ไม่มีอยู่จริง
+        Slide.objects.bulk_create(
+            [
+                Slide(title="สไลด์ 2", image="app/slides/2.jpg", order=2),
+                Slide(title="สไลด์ 1", image="app/slides/1.jpg", order=1),
+                Slide(title="ปิดใช้งาน", image="app/slides/3.jpg", is_active=False),
+            ]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cold_cache_uses_two_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["logo"].name, "social_logo")
+        self.assertEqual(response.context["logo_text"].name, "social_logo_text")
+        self.assertEqual(
+            [slide.title for slide in response.context["slides"]],
+            ["สไลด์ 1", "สไลด์ 2"],
+        )
+
+    async def test_landing_page_under_asgi(self):
+        response = await self.async_client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "สไลด์ 1")
+
+    def test_cold_cache_queries_use_indexes(self):
+        with self.assertNoSequentialScans():
+            self.client.get("/")
+
+    def test_warm_cache_uses_no_queries(self):
+        self.client.get("/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/")
+        self.assertContains(response, "สไลด์ 1")
+
+    def test_slide_change_invalidates_cache(self):
+        self.client.get("/")
+        with self.captureOnCommitCallbacks(execute=True):
+            Slide.objects.get(title="สไลด์ 2").delete()
+        self.assertIsNone(cache.get(LANDING_CONTEXT_CACHE_KEY))
+
+    def test_media_file_change_invalidates_cache(self):
+        self.client.get("/")
+        with self.captureOnCommitCallbacks(execute=True):
+            MediaFile.objects.create(name="crru", file="mediafiles/crru.webp")
+        self.assertIsNone(cache.get(LANDING_CONTEXT_CACHE_KEY))
+
+    def test_cache_is_cleared_only_after_commit(self):
+        self.client.get("/")
+        with self.captureOnCommitCallbacks(execute=True):
+            Slide.objects.filter(title="สไลด์ 2").update(title="สไลด์ใหม่")
+            Slide.objects.get(title="สไลด์ใหม่").save()
+            # request ระหว่าง transaction ยังได้ cache เดิม ไม่สร้างใหม่จากแถวที่ยังไม่ commit
+            self.assertIsNotNone(cache.get(LANDING_CONTEXT_CACHE_KEY))
+        self.assertIsNone(cache.get(LANDING_CONTEXT_CACHE_KEY))
+        self.assertContains(self.client.get("/"), "สไลด์ใหม่")
+
+
+class LandingReplicaTests(ReplicaTestMixin, TransactionTestCase):
+    def test_landing_cache_is_rebuilt_from_primary(self):
+        cache.clear()
+        Slide.objects.bulk_create([Slide(title="สไลด์ใหม่", image="app/slides/1.jpg")])
+        with self.captureReplicaQueries() as replica:
+            response = self.client.get("/")
+        self.assertContains(response, "สไลด์ใหม่")
+        self.assertEqual(len(replica), 0)
+
+
+class LandingFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.slide = Slide.objects.bulk_create(
+            [Slide(title="สไลด์", image="app/slides/1.jpg")]
+        )[0]
+        self.client.get("/")
+
+    def assertFragmentCached(self, fragment, cached=True):
+        value = cache.get(make_template_fragment_key(fragment))
+        if cached:
+            self.assertIsNotNone(value, fragment)
+        else:
+            self.assertIsNone(value, fragment)
+
+    def test_sections_are_cached(self):
+        for fragment in (
+            "landing_slide",
+            "landing_card_interview",
+            "landing_feature",
+            "landing_news_blog",
+            "landing_event",
+        ):
+            self.assertFragmentCached(fragment)
+
+    def test_slide_delete_purges_only_slide_fragment(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.slide.delete()
+        self.assertFragmentCached("landing_slide", cached=False)
+        self.assertFragmentCached("landing_news_blog")
+
+    def test_slide_save_purges_only_slide_fragment(self):
+        self.slide.title = "สไลด์ใหม่"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.slide.save()
+        self.assertFragmentCached("landing_slide", cached=False)
+        self.assertFragmentCached("landing_feature")
+        self.assertContains(self.client.get("/"), "สไลด์ใหม่")
+
+    def test_registered_fragments_are_used_by_landing_template(self):
+        source = Path(settings.BASE_DIR, "app/templates/index.html").read_text()
+        for label, fragments in FRAGMENT_DEPENDENCIES.items():
+            for fragment in fragments:
+                self.assertRegex(source, rf"{{% cache \d+ {fragment} %}}", label)
+
+    def test_static_fragments_are_not_purged_by_content_saves(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.objects.create(title="ข่าว", slug="news", content="เนื้อหา")
+        self.assertFragmentCached("landing_news_blog")
+        self.assertFragmentCached("landing_slide")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SlideSaveTests(TestCase):
+    def setUp(self):
+        slide = Slide.objects.create(title="สไลด์", image=make_image())
+        self.slide = Slide.objects.get(pk=slide.pk)
+
+    def test_save_runs_single_update(self):
+        self.slide.title = "สไลด์ใหม่"
+        with CaptureQueriesContext(connection) as queries:
+            self.slide.save()
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]["sql"].startswith("UPDATE"))
+
+    def test_replacing_image_removes_old_file(self):
+        old_path = self.slide.image.path
+        self.slide.image = make_image("new.jpg", (800, 400))
+        with self.captureOnCommitCallbacks(execute=True):
+            # upsert ไฟล์ใน storage + UPDATE + INSERT งานย่อรูป (ไม่ย่อรูประหว่าง request)
+            with self.assertNumQueries(3):
+                self.slide.save()
+        cleanup.wait()
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(self.slide.image.path))
+
+    def test_large_image_is_resized_by_worker(self):
+        slide = Slide.objects.create(title="ใหญ่", image=make_image("big.jpg", (3000, 1500)))
+        with Image.open(slide.image.path) as img:
+            self.assertEqual(img.width, 3000)
+        run_pending()
+        slide.refresh_from_db()  # รูปที่ย่อแล้วเป็นไฟล์ใหม่ ไม่เขียนทับไฟล์เดิม
+        with Image.open(slide.image.path) as img:
+            self.assertEqual(img.size, (1920, 960))
+
+    def test_resized_slide_refreshes_landing_context(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            slide = Slide.objects.create(title="ใหญ่", image=make_image("big.jpg", (3000, 1500)))
+        self.client.get("/")
+        with self.captureOnCommitCallbacks(execute=True):
+            run_pending()
+        slide.refresh_from_db()
+        slides = self.client.get("/").context["slides"]
+        self.assertEqual(
+            [s.image.name for s in slides if s.pk == slide.pk], [slide.image.name]
+        )
+        self.assertTrue(slide.image.storage.exists(slide.image.name))
+
+
+class SlideAdminQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def test_changelist(self):
+        self.login_admin()
+        # ชื่อไฟล์ที่ไม่ใช่รูป หน้ารายการจึงไม่ต้องสร้าง rendition ของไฟล์ที่ไม่มีอยู่จริง
+        self.assertConstantQueries(
+            changelist_url(Slide),
+            lambda count: Slide.objects.bulk_create(
+                Slide(title="สไลด์", image="app/slides/x.bin") for _ in range(count)
+            ),
+        )
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    def test_defaults_use_persistent_connections_with_health_checks(self):
+        config = database_config(environ={"DB_PASSWORD": "secret"})
+        self.assertEqual(config["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(config["PASSWORD"], "secret")
+        self.assertEqual(config["CONN_MAX_AGE"], 60)
+        self.assertTrue(config["CONN_HEALTH_CHECKS"])
+        self.assertNotIn("OPTIONS", config)
+
+    def test_pool_is_sized_per_worker(self):
+        config = database_config(environ={"DB_POOL": "1", "WEB_THREADS": "8"})
+        self.assertEqual(config["CONN_MAX_AGE"], 0)  # Django ไม่ให้ใช้ pool คู่กับ persistent connection
+        self.assertEqual(config["OPTIONS"]["pool"], {"min_size": 1, "max_size": 8, "timeout": 10})
+        config = database_config(environ={"DB_POOL": "true", "DB_POOL_MAX_SIZE": "3"})
+        self.assertEqual(config["OPTIONS"]["pool"]["max_size"], 3)
+
+    def test_prefix_and_invalid_values(self):
+        config = database_config("REPLICA_", {"REPLICA_HOST": "db2", "REPLICA_CONN_MAX_AGE": "0"})
+        self.assertEqual(config["HOST"], "db2")
+        self.assertFalse(config["CONN_HEALTH_CHECKS"])
+        with self.assertRaises(ImproperlyConfigured):
+            database_config(environ={"DB_CONN_MAX_AGE": "forever"})
+        with self.assertRaises(ImproperlyConfigured):
+            database_config(environ={"DB_ENGINE": "django.db.backends.sqlite3", "DB_POOL": "1"})
+
+    def test_replicas_share_primary_settings(self):
+        replicas = replica_configs(environ={"DB_PASSWORD": "x", "DB_REPLICA_HOSTS": "db2, db3:6432"})
+        self.assertEqual(list(replicas), ["replica_1", "replica_2"])
+        self.assertEqual((replicas["replica_1"]["HOST"], replicas["replica_1"]["PORT"]), ("db2", "5432"))
+        self.assertEqual((replicas["replica_2"]["HOST"], replicas["replica_2"]["PORT"]), ("db3", "6432"))
+        self.assertEqual(replicas["replica_2"]["PASSWORD"], "x")
+        self.assertEqual(replicas["replica_1"]["TEST"], {"MIRROR": "default"})
+        self.assertEqual(replica_configs(environ={}), {})
+
+
+class TemplateRenderingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_project_templates_are_precompiled(self):
+        loader = engines["django"].engine.template_loaders[0]
+        loader.reset()
+        self.assertGreaterEqual(preload_templates(), 3)
+        cached = {key.split("-")[0] for key in loader.get_template_cache}
+        self.assertLessEqual({"base.html", "index.html", "slide.html"}, cached)
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    def test_profiled_blocks_are_reported_in_server_timing(self):
+        Slide.objects.create(title="สไลด์", image="app/slides/x.bin")
+        with self.assertLogs("core.rendering", "INFO") as logs:
+            response = self.client.get("/")
+        timing = response["Server-Timing"]
+        for name in ("navbar", "slide", "news_blog", "event", "footer"):
+            self.assertIn(f"tpl-{name};dur=", timing)
+        self.assertIn("GET /: ", logs.output[0])
+
+    @override_settings(TEMPLATE_PROFILING=False)
+    def test_profiling_is_off_by_setting(self):
+        self.assertNotIn("tpl-", self.client.get("/").get("Server-Timing", ""))
+
+
+@override_settings(SERVER_TIMING=True, TEMPLATE_PROFILING=False)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_metrics()
+        self.addCleanup(reset_metrics)
+
+    def test_server_timing_reports_queries_cache_and_templates(self):
+        cold = self.client.get("/")["Server-Timing"]
+        warm = self.client.get("/")["Server-Timing"]
+        self.assertRegex(cold, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(cold, r'cache;desc="\d+ hits [1-9]\d* misses"')
+        self.assertRegex(warm, r'cache;desc="[1-9]\d* hits 0 misses"')
+        self.assertRegex(warm, r"tpl;dur=[\d.]+")
+        self.assertIn("total;dur=", warm)
+
+    def test_metrics_are_aggregated_per_url_name(self):
+        self.client.get("/")
+        self.client.get("/")
+        self.client.get("/news/")
+        with self.settings(METRICS_ALLOWED_IPS=["127.0.0.1"]):
+            body = self.client.get("/metrics").content.decode()
+        self.assertIn('http_request_duration_seconds_count{view="app.views.landing_page"} 2', body)
+        self.assertIn('http_request_duration_seconds{view="news:article_list",quantile="0.99"}', body)
+        self.assertIn('http_requests_total{view="app.views.landing_page",status="200"} 2', body)
+        self.assertRegex(body, r'http_db_queries_total\{view="news:article_list"\} [1-9]')
+
+    def test_metrics_are_closed_by_default(self):
+        # หลัง reverse proxy ทุก request มาจาก 127.0.0.1
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.5"], METRICS_TOKEN="secret")
+    def test_metrics_need_allowed_address_or_token(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.0.0.9").status_code, 404)
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.0.0.5").status_code, 200)
+        for header, status in (("Bearer wrong", 404), ("Bearer secret", 200)):
+            with self.subTest(header):
+                response = self.client.get("/metrics", headers={"Authorization": header})
+                self.assertEqual(response.status_code, status)
+
+    @override_settings(SLOW_REQUEST_SECONDS=0)
+    def test_slow_requests_are_logged_with_top_queries(self):
+        with self.assertLogs("core.instrumentation", "WARNING") as logs:
+            self.client.get("/news/")
+        self.assertIn("GET /news/ (news:article_list)", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+
+class StaticFilesTests(SimpleTestCase):
+    def setUp(self):
+        source, root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        os.makedirs(os.path.join(source, "dist"))
+        with open(os.path.join(source, "dist", "site.css"), "w") as css:
+            css.write('body { background: url("bg.svg"); }\n' + ".card { margin: 0 }\n" * 100)
+        with open(os.path.join(source, "dist", "bg.svg"), "w") as svg:
+            svg.write("<svg></svg>")
+        overrides = override_settings(
+            STATIC_ROOT=root,
+            STATICFILES_DIRS=[source],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+    def test_hashed_files_are_served_compressed_with_long_cache(self):
+        url = static("dist/site.css")
+        self.assertRegex(url, r"^/static/dist/site\.[0-9a-f]{12}\.css$")
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        content = gzip.decompress(b"".join(response.streaming_content))
+        self.assertIn(static("dist/bg.svg").rsplit("/", 1)[1].encode(), content)
+
+        identity = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertFalse(identity.has_header("Content-Encoding"))
+        self.assertEqual(b"".join(identity.streaming_content), content)
+
+        cached = self.client.get(
+            url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(cached.status_code, 304)
+
+    def test_unhashed_names_get_short_cache(self):
+        response = self.client.get("/static/dist/site.css")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+        self.assertEqual(self.client.get("/static/dist/missing.css").status_code, 404)
+
+
+class CssPruningTests(SimpleTestCase):
+    CSS = r"""
+        @import url('https://fonts.example/a.css');
+        @layer base { html { margin: 0 } }
+        @layer utilities {
+            /* comment */
+            .md\:flex { @media (width >= 48rem) { display: flex; } }
+            .w-1\/2, .unused { width: 50%; }
+            .btn { color: red; &:hover { color: blue; } }
+            .btn:not(.unused) { content: "}"; }
+            .\32 xl\:p-4 { padding: 1rem; }
+            .menu .unused { color: green; }
+        }
+        @keyframes spin { to { rotate: 1turn; } }
+    """
+
+    def test_keeps_only_rules_whose_classes_are_used(self):
+        classes = css.candidates('<div class="md:flex w-1/2 btn 2xl:p-4">')
+        pruned = css.serialize(css.prune(css.parse(self.CSS), classes))
+        self.assertIn(r".md\:flex{@media (width >= 48rem){display: flex;}}", pruned)
+        self.assertIn(r".w-1\/2{width: 50%;}", pruned)
+        self.assertIn(".btn{color: red;&:hover{color: blue;}}", pruned)
+        self.assertIn('.btn:not(.unused){content: "}";}', pruned)
+        self.assertIn(r".\32 xl\:p-4{padding: 1rem;}", pruned)
+        self.assertIn("html{margin: 0;}", pruned)
+        self.assertIn("@keyframes spin", pruned)
+        self.assertIn("@import", pruned)
+        self.assertNotIn(".menu", pruned)
+        self.assertNotIn("comment", pruned)
+
+    def test_critical_css_leaves_out_imports(self):
+        pruned = css.serialize(css.prune(css.parse(self.CSS), set(), imports=False))
+        self.assertNotIn("@import", pruned)
+        self.assertNotIn(".btn", pruned)
+
+
+@override_settings(
+    STORAGES={
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+)
+class StylesheetTagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PRUNED_CSS=True)
+    def test_landing_page_inlines_critical_css(self):
+        response = self.client.get("/")
+        self.assertContains(response, "<style>@layer")
+        self.assertContains(response, '<link rel="preload" href="/static/dist/site.css" as="style"')
+        self.assertContains(response, '<noscript><link rel="stylesheet" href="/static/dist/site.css" />')
+        other = self.client.get("/news/")
+        self.assertContains(other, '<link rel="stylesheet" href="/static/dist/site.css" />')
+        self.assertNotContains(other, "<style>")
+
+    @override_settings(PRUNED_CSS=False)
+    def test_full_stylesheet_when_pruning_is_off(self):
+        response = self.client.get("/")
+        self.assertContains(response, '<link rel="stylesheet" href="/static/dist/styles.css" />')
+        self.assertNotContains(response, "<style>")
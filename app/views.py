@@ -1,19 +1,18 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
-from mediafiles.models import MediaFile
+from .cache import aget_landing_context
 from .models import Slide
 
 
 # Create your views here.
-def landing_page(request):
-    logo = MediaFile.objects.get(name="social_logo")  # ดึงข้อมูลรูปภาพโลโก้
-    logo_text = MediaFile.objects.get(name="social_logo_text")  # ดึงข้อมูลรูปภาพข้อความโลโก้
+async def landing_page(request):
+    """
+    หน้าแรก: โลโก้ ข้อความโลโก้ และสไลด์ ดึงจาก cache (ดู app/cache.py)
 
-    """ดึงข้อมูลสไลด์ที่เปิดใช้งานและเรียงลำดับ"""
-    slides = Slide.objects.filter(is_active=True).order_by("order")
-
-    return render(
-        request, "index.html", {"logo": logo, "logo_text": logo_text, "slides": slides}
-    )
+    render ใน thread เพราะ fragment ที่หมดอายุใน cache อาจแตะฐานข้อมูลระหว่าง render
+    """
+    context = await aget_landing_context()
+    return await sync_to_async(render)(request, "index.html", context)
 
 
 def slide_list(request):
@@ -0,0 +1,44 @@
+"""
+Cache ส่วนย่อยของเทมเพลต (template fragment) และการล้าง cache ตามโมเดลที่เปลี่ยน
+
+เทมเพลตใช้ ``{% cache <timeout> <fragment> %}`` ตามปกติ ส่วนโมเดลที่เป็นแหล่งข้อมูล
+ของ fragment ถูกลงทะเบียนไว้ใน ``FRAGMENT_DEPENDENCIES`` เพื่อให้ signal ของแต่ละแอป
+เรียก ``purge_fragments_for(sender)`` แล้วล้างเฉพาะ fragment ที่ได้รับผลกระทบ
+
+ข้อมูลที่ fragment แสดงต้องอ่านจาก ``default`` (``.using(DEFAULT_DB_ALIAS)``) ไม่ใช่ read replica
+(core/routers.py) ไม่เช่นนั้นหลังล้าง cache request ถัดไปอาจสร้าง fragment จาก replica ที่ยังตามไม่ทัน
+แล้ว cache ข้อมูลเก่าไว้จนหมดเวลา
+"""
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+
+# โมเดล (app_label.ModelName) -> ชื่อ fragment ที่แสดงข้อมูลจากโมเดลนั้น
+# fragment ที่เป็นเนื้อหาคงที่ (เช่น news_blog.html, event.html) ไม่ต้องลงทะเบียน หมดเวลาแล้วสร้างใหม่เอง
+FRAGMENT_DEPENDENCIES = {
+    "app.Slide": {"landing_slide"},
+}
+
+
+def register_fragment(fragment, *models):
+    """ลงทะเบียนว่า fragment นี้ใช้ข้อมูลจากโมเดลใดบ้าง (ระบุเป็น "app_label.ModelName")"""
+    for label in models:
+        FRAGMENT_DEPENDENCIES.setdefault(label, set()).add(fragment)
+
+
+def fragments_for(model):
+    """ชื่อ fragment ทั้งหมดที่ขึ้นกับโมเดลนี้"""
+    return FRAGMENT_DEPENDENCIES.get(model._meta.label, set())
+
+
+def purge_fragments(*fragments, vary_on=None):
+    """ล้าง cache ของ fragment ที่ระบุ หลัง transaction ปัจจุบัน commit แล้ว"""
+    keys = [make_template_fragment_key(fragment, vary_on) for fragment in fragments]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def purge_fragments_for(model):
+    """ล้าง fragment ทุกตัวที่ขึ้นกับโมเดลนี้"""
+    purge_fragments(*fragments_for(model))
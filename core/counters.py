@@ -0,0 +1,89 @@
+"""
+ตัวนับแบบ denormalized (เช่น จำนวนข่าวที่เผยแพร่ของแต่ละหมวดหมู่)
+
+ค่าถูกเก็บเป็นคอลัมน์ของโมเดลเป้าหมาย แล้วให้ signal ของแต่ละแอปเรียก ``adjust()``
+เพิ่ม/ลดค่าทีละน้อยเมื่อข้อมูลต้นทางเปลี่ยน หน้าเว็บจึงอ่านจำนวนได้โดยไม่ต้อง COUNT
+
+การแก้ข้อมูลที่ไม่ผ่าน signal (เช่น ``QuerySet.update()``) ทำให้ค่าคลาดได้
+ตัวนับที่ลงทะเบียนด้วย ``register_counter()`` จึงคำนวณใหม่ได้ด้วย ``reconcile()``
+(คำสั่ง ``manage.py reconcile_counters``)::
+
+    register_counter(
+        Category, "published_articles_count",
+        Article.objects.filter(status=Article.PUBLISHED), "category",
+    )
+"""
+
+from dataclasses import dataclass
+from django.db import models
+from django.db.models import Case, Count, F, Value, When
+from django.db.models.functions import Greatest
+
+RECONCILE_BATCH_SIZE = 500
+
+
+@dataclass(frozen=True)
+class Counter:
+    model: type  # โมเดลที่มีคอลัมน์ตัวนับ
+    field: str
+    source: models.QuerySet  # แถวที่ถูกนับ
+    group_by: str  # lookup จากแถวที่ถูกนับไปยัง pk ของ ``model``
+
+    def __str__(self):
+        return f"{self.model._meta.label}.{self.field}"
+
+
+COUNTERS = []
+
+
+def register_counter(model, field, source, group_by):
+    counter = Counter(model, field, source, group_by)
+    COUNTERS.append(counter)
+    return counter
+
+
+def adjust(model, field, deltas):
+    """
+    บวกค่า ``deltas`` ({pk: จำนวนที่เปลี่ยน}) เข้ากับคอลัมน์ ``field`` ด้วย UPDATE เดียว
+    (``SET field = MAX(field + CASE ..., 0)``) จึงไม่เสียค่าเมื่อมีการแก้ไขพร้อมกัน
+    """
+    by_delta = {}
+    for pk, delta in deltas.items():
+        if pk is not None and delta:
+            by_delta.setdefault(delta, []).append(pk)
+    if not by_delta:
+        return
+    change = Case(
+        *[When(pk__in=pks, then=Value(delta)) for delta, pks in by_delta.items()],
+        default=Value(0),
+        output_field=models.IntegerField(),
+    )
+    model._base_manager.filter(
+        pk__in=[pk for pks in by_delta.values() for pk in pks]
+    ).update(**{field: Greatest(F(field) + change, Value(0))})
+
+
+def counts(counter):
+    """จำนวนจริงของแต่ละ pk จาก GROUP BY query เดียว"""
+    return dict(
+        counter.source.order_by()
+        .values(counter.group_by)
+        .annotate(total=Count("pk"))
+        .values_list(counter.group_by, "total")
+    )
+
+
+def reconcile(counter):
+    """คำนวณตัวนับใหม่ทั้งหมด แล้วแก้เฉพาะแถวที่ค่าไม่ตรง คืนจำนวนแถวที่แก้"""
+    actual = counts(counter)
+    changed = []
+    rows = counter.model._base_manager.only("pk", counter.field)
+    for obj in rows.iterator(chunk_size=RECONCILE_BATCH_SIZE):
+        total = actual.get(obj.pk, 0)
+        if getattr(obj, counter.field) != total:
+            setattr(obj, counter.field, total)
+            changed.append(obj)
+    counter.model._base_manager.bulk_update(
+        changed, [counter.field], batch_size=RECONCILE_BATCH_SIZE
+    )
+    return len(changed)
@@ -0,0 +1,216 @@
+"""
+ตัด CSS ที่ไม่ได้ใช้ออกจากไฟล์ที่ Tailwind/FlyonUI สร้าง และแยก CSS ส่วนบนของหน้า (critical)
+
+``manage.py build_css`` (รันหลัง ``npm run build:css``) อ่าน ``static/dist/styles.css``
+หาคลาสที่ใช้จริงจากเทมเพลตทุกไฟล์ของโปรเจกต์และ JavaScript ใน ``static/js`` แล้วเขียน
+
+- ``static/dist/site.css`` เหลือเฉพาะ rule ที่คลาสทุกตัวใน selector ถูกใช้
+- ``static/dist/critical/<หน้า>.css`` เฉพาะ rule ของเทมเพลตส่วนบนของหน้านั้น (ดู ``CRITICAL``)
+  ``{% stylesheet critical="<หน้า>" %}`` ฝังไฟล์นี้ใน ``<style>`` แล้วโหลด site.css แบบไม่ block
+
+การหาคลาสใช้วิธีเดียวกับ Tailwind คือทุกคำในไฟล์ต้นทางถือว่าอาจเป็นชื่อคลาส คลาสที่ประกอบขึ้น
+ตอนรัน (เช่น ``"bg-" + color``) จึงต้องเขียนเต็มไว้ในเทมเพลตหรือใส่ใน ``--safelist``
+คลาสใน ``:not()``, ``:is()``, ``:where()`` และ ``:has()`` ไม่ถูกนำมาตัดสิน (เก็บ rule ไว้)
+"""
+
+import os
+import re
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+SOURCE = "dist/styles.css"
+PRUNED = "dist/site.css"
+CRITICAL_DIR = "dist/critical"
+# เทมเพลตที่อยู่ส่วนบนของแต่ละหน้า (ก่อนเลื่อนจอ)
+CRITICAL = {
+    "index": ["base.html", "include/navbar.html", "slide.html"],
+}
+# at-rule ที่มี rule อยู่ข้างใน ตัด rule ข้างในได้ at-rule อื่น (@keyframes, @font-face, ...) เก็บทั้งก้อน
+GROUPING_RULES = {"@media", "@supports", "@layer", "@container", "@scope", "@starting-style"}
+
+_critical_cache = {}  # path -> (mtime, เนื้อหา)
+
+_TOKEN_RE = re.compile(r"""[\s"'`<>]+""")
+_CLASS_RE = re.compile(r"\.((?:\\[0-9a-fA-F]{1,6}\s?|\\.|[\w-])+)")
+_ESCAPE_RE = re.compile(r"\\([0-9a-fA-F]{1,6}\s?|.)")
+_PSEUDO_FUNCTION_RE = re.compile(r":(?:not|is|where|has)\(")
+
+
+def candidates(text):
+    """ทุกคำในไฟล์ต้นทางที่อาจเป็นชื่อคลาส"""
+    return set(_TOKEN_RE.split(text))
+
+
+def used_classes(paths, safelist=()):
+    classes = set(safelist)
+    for path in paths:
+        with open(path, encoding="utf-8") as source:
+            classes |= candidates(source.read())
+    return classes
+
+
+def script_paths():
+    """ไฟล์ JavaScript ใน STATICFILES_DIRS (FlyonUI เปิด/ปิดคลาสจาก JavaScript)"""
+    for directory in settings.STATICFILES_DIRS:
+        directory = directory[1] if isinstance(directory, tuple) else directory
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(".js"):
+                    yield os.path.join(root, filename)
+
+
+def _unescape(match):
+    value = match.group(1)
+    if re.fullmatch(r"[0-9a-fA-F]{1,6}\s?", value):
+        return chr(int(value.strip(), 16))
+    return value
+
+
+def selector_classes(selector):
+    """คลาสที่ element ต้องมีจึงจะตรงกับ selector (ไม่รวมคลาสในวงเล็บของ pseudo-class)"""
+    required = []
+    depth = 0
+    position = 0
+    for match in _PSEUDO_FUNCTION_RE.finditer(selector):
+        if match.start() < position:
+            continue
+        required.append(selector[position:match.start()])
+        depth, index = 1, match.end()
+        while index < len(selector) and depth:
+            depth += {"(": 1, ")": -1}.get(selector[index], 0)
+            index += 1
+        position = index
+    required.append(selector[position:])
+    return {
+        _ESCAPE_RE.sub(_unescape, name)
+        for part in required
+        for name in _CLASS_RE.findall(part)
+    }
+
+
+def _split_top_level(text, separator):
+    parts, depth, quote, start = [], 0, None, 0
+    for index, char in enumerate(text):
+        if index and text[index - 1] == "\\":
+            continue
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:index])
+            start = index + 1
+    parts.append(text[start:])
+    return parts
+
+
+def parse(css):
+    """
+    แยก CSS เป็นรายการของ ``(prelude, children)`` สำหรับบล็อก และ ``(text, None)`` สำหรับ
+    declaration หรือ at-rule ที่จบด้วย ``;`` (ตัด comment ออก)
+    """
+    nodes, stack = [], []
+    buffer, index, quote, parens = [], 0, None, 0
+    while index < len(css):
+        char = css[index]
+        if quote:
+            buffer.append(char)
+            if char == "\\":
+                buffer.append(css[index + 1 : index + 2])
+                index += 1
+            elif char == quote:
+                quote = None
+        elif char == "\\":
+            buffer.append(css[index : index + 2])
+            index += 2
+            continue
+        elif css.startswith("/*", index):
+            end = css.find("*/", index + 2)
+            index = len(css) if end < 0 else end + 2
+            continue
+        elif char in "\"'":
+            quote = char
+            buffer.append(char)
+        elif char == "(":
+            parens += 1
+            buffer.append(char)
+        elif char == ")":
+            parens -= 1
+            buffer.append(char)
+        elif char == "{" and not parens:
+            stack.append((nodes, "".join(buffer).strip()))
+            nodes, buffer = [], []
+        elif char == "}" and not parens:
+            _flush(nodes, buffer)
+            parent, prelude = stack.pop()
+            parent.append((prelude, nodes))
+            nodes, buffer = parent, []
+        elif char == ";" and not parens:
+            _flush(nodes, buffer)
+            buffer = []
+        else:
+            buffer.append(char)
+        index += 1
+    _flush(nodes, buffer)
+    return nodes
+
+
+def _flush(nodes, buffer):
+    text = re.sub(r"\s*\n\s*", " ", "".join(buffer).strip())
+    if text:
+        nodes.append((text, None))
+
+
+def prune(nodes, classes, imports=True):
+    """เก็บเฉพาะ rule ที่คลาสที่ต้องมีทั้งหมดอยู่ใน ``classes``"""
+    kept = []
+    for prelude, children in nodes:
+        if children is None:
+            if imports or not prelude.startswith("@import"):
+                kept.append((prelude, None))
+            continue
+        if prelude.startswith("@"):
+            if prelude.split(None, 1)[0].split("(", 1)[0] not in GROUPING_RULES:
+                kept.append((prelude, children))
+                continue
+        else:
+            selectors = [
+                selector.strip()
+                for selector in _split_top_level(prelude, ",")
+                if selector_classes(selector) <= classes
+            ]
+            if not selectors:
+                continue
+            prelude = ",".join(selectors)
+        children = prune(children, classes, imports)
+        if children:
+            kept.append((prelude, children))
+    return kept
+
+
+def serialize(nodes):
+    parts = []
+    for prelude, children in nodes:
+        if children is None:
+            parts.append(prelude + ";")
+        else:
+            parts.append(prelude + "{" + serialize(children) + "}")
+    return "".join(parts)
+
+
+def critical_css(page):
+    """เนื้อหาของ ``dist/critical/<page>.css`` (None ถ้ายังไม่ได้ build_css) อ่านใหม่เมื่อไฟล์เปลี่ยน"""
+    path = finders.find(f"{CRITICAL_DIR}/{page}.css")
+    if path is None:
+        return None
+    mtime = os.stat(path).st_mtime
+    cached = _critical_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, encoding="utf-8") as source:
+            cached = _critical_cache[path] = (mtime, source.read())
+    return cached[1]
@@ -0,0 +1,87 @@
+"""
+ตั้งค่าฐานข้อมูลจาก environment variable (ไม่เก็บรหัสผ่านไว้ใน settings)
+
+    DB_ENGINE         ค่าเริ่มต้น ``django.db.backends.postgresql``
+    DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+    DB_CONN_MAX_AGE   อายุของ persistent connection (วินาที) ค่าเริ่มต้น 60, 0 = เปิด/ปิดทุก request
+    DB_POOL           ``1`` เพื่อใช้ connection pool ของ psycopg 3 แทน persistent connection
+    DB_POOL_MIN_SIZE  จำนวน connection ที่ pool เปิดค้างไว้ ค่าเริ่มต้น 1
+    DB_POOL_MAX_SIZE  จำนวน connection สูงสุดต่อ worker process ค่าเริ่มต้นเท่ากับ ``WEB_THREADS``
+    DB_POOL_TIMEOUT   เวลารอ connection ว่างจาก pool (วินาที) ค่าเริ่มต้น 10
+    WEB_THREADS       จำนวน thread ที่ใช้ฐานข้อมูลพร้อมกันในหนึ่ง worker ค่าเริ่มต้น 4
+    DB_REPLICA_HOSTS  host ของ read replica คั่นด้วย ``,`` (ใช้ค่าอื่นเหมือน DB_*) ดู core/routers.py
+
+pool และ persistent connection อยู่ใน process ของแต่ละ worker ดังนั้นจำนวน connection
+ทั้งหมดคือ จำนวน worker x DB_POOL_MAX_SIZE ซึ่งต้องไม่เกิน ``max_connections`` ของ PostgreSQL
+"""
+
+import os
+from django.core.exceptions import ImproperlyConfigured
+
+TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+def database_config(prefix="DB_", environ=None):
+    """คืนค่าสำหรับ ``DATABASES[alias]`` จากตัวแปรที่ขึ้นต้นด้วย ``prefix``"""
+    environ = os.environ if environ is None else environ
+
+    def get(name, default=""):
+        return environ.get(prefix + name, default)
+
+    config = {
+        "ENGINE": get("ENGINE", "django.db.backends.postgresql"),
+        "NAME": get("NAME", "socdb_2025"),
+        "USER": get("USER", "postgres"),
+        "PASSWORD": get("PASSWORD"),
+        "HOST": get("HOST", "localhost"),
+        "PORT": get("PORT", "5432"),
+    }
+    if get("POOL").lower() in TRUE_VALUES:
+        if not config["ENGINE"].endswith("postgresql"):
+            raise ImproperlyConfigured(f"{prefix}POOL ใช้ได้กับ PostgreSQL เท่านั้น")
+        # pool คืนเฉพาะ connection ที่ยังใช้ได้ จึงไม่ต้องใช้ CONN_MAX_AGE/CONN_HEALTH_CHECKS
+        config["CONN_MAX_AGE"] = 0
+        config["OPTIONS"] = {
+            "pool": {
+                "min_size": _int(environ, prefix + "POOL_MIN_SIZE", 1),
+                "max_size": _int(
+                    environ, prefix + "POOL_MAX_SIZE", _int(environ, "WEB_THREADS", 4)
+                ),
+                "timeout": _int(environ, prefix + "POOL_TIMEOUT", 10),
+            }
+        }
+    else:
+        config["CONN_MAX_AGE"] = _int(environ, prefix + "CONN_MAX_AGE", 60)
+        # ตรวจ connection ที่ใช้ซ้ำก่อน request แรกที่ใช้ (ฐานข้อมูลรีสตาร์ต/ตัด connection)
+        config["CONN_HEALTH_CHECKS"] = config["CONN_MAX_AGE"] != 0
+    return config
+
+
+def replica_configs(prefix="DB_", environ=None):
+    """
+    ``{"replica_1": {...}, ...}`` หนึ่งรายการต่อ host ใน ``<prefix>REPLICA_HOSTS``
+    (``host`` หรือ ``host:port``) ตอนรันเทสต์ replica เป็น mirror ของ default
+    """
+    environ = os.environ if environ is None else environ
+    primary = database_config(prefix, environ)
+    replicas = {}
+    hosts = [h.strip() for h in environ.get(prefix + "REPLICA_HOSTS", "").split(",") if h.strip()]
+    for number, host in enumerate(hosts, start=1):
+        host, _, port = host.partition(":")
+        replicas[f"replica_{number}"] = {
+            **primary,
+            "HOST": host,
+            "PORT": port or primary["PORT"],
+            "TEST": {"MIRROR": "default"},
+        }
+    return replicas
+
+
+def _int(environ, name, default):
+    value = environ.get(name, "")
+    if value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ImproperlyConfigured(f"{name} ต้องเป็นตัวเลข (ได้ {value!r})")
@@ -0,0 +1,333 @@
+"""
+วัดประสิทธิภาพของทุก request โดยไม่ต้องเปิด profiler
+
+``request_metrics_middleware`` เก็บค่าของแต่ละ request: เวลารวม, จำนวนและเวลาของ query
+(ทุก connection), cache hit/miss, เวลา render เทมเพลต และขนาด response แล้ว
+
+- ส่งกลับใน header ``Server-Timing`` เมื่อ ``SERVER_TIMING`` เปิดอยู่ (ต่อท้ายบล็อก ``tpl-*``
+  ของ core/rendering.py)
+- รวมสถิติแยกตามชื่อ URL (``view_name`` เช่น ``news:article_list``, ``admin:...``, ``media``)
+  ให้ Prometheus ดึงที่ ``/metrics`` ช่วงเวลาเป็น percentile จากตัวอย่างล่าสุด ``SAMPLES`` ตัว
+- request ที่ช้ากว่า ``SLOW_REQUEST_SECONDS`` เขียน log ``core.instrumentation`` พร้อม query
+  ที่ช้าที่สุด
+
+cache hit/miss นับผ่าน backend ``InstrumentedFileBasedCache`` และเวลาเทมเพลตนับผ่าน backend
+``DjangoTemplates`` ของโมดูลนี้ (ตั้งไว้ใน settings) สถิติเก็บในหน่วยความจำของแต่ละ process
+Prometheus จึงต้องดึงจากทุก worker เวลาของ response แบบ stream (ไฟล์สื่อ) นับถึงตอนเริ่มส่ง
+"""
+
+import heapq
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger(__name__)
+
+SAMPLES = 1024  # ตัวอย่างเวลาต่อ URL ที่ใช้คำนวณ percentile
+QUANTILES = (0.5, 0.9, 0.99)
+TOP_QUERIES = 5
+UNRESOLVED = "<unresolved>"
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slowest = []  # heap ของ (วินาที, sql) ขนาดไม่เกิน TOP_QUERIES
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.seconds = None
+        self.size = None
+
+    def server_timing(self):
+        return (
+            f"total;dur={self.seconds * 1000:.2f}, "
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries", '
+            f'cache;desc="{self.cache_hits} hits {self.cache_misses} misses", '
+            f"tpl;dur={self.template_seconds * 1000:.2f}"
+        )
+
+    def top_queries(self):
+        return sorted(self.slowest, reverse=True)
+
+
+# เป็นอ็อบเจกต์ที่แก้ได้ จึงเห็นค่าเดียวกันใน thread ของ sync_to_async
+_metrics = ContextVar("request_metrics", default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - started
+        metrics.queries += 1
+        metrics.db_seconds += seconds
+        if len(metrics.slowest) < TOP_QUERIES:
+            heapq.heappush(metrics.slowest, (seconds, sql))
+        elif seconds > metrics.slowest[0][0]:
+            heapq.heapreplace(metrics.slowest, (seconds, sql))
+
+
+def _install(connection, **kwargs):
+    # ใส่ไว้หน้าสุด execute_wrapper() ชั่วคราว (เช่น profile_block) ที่ pop() ตัวท้ายจะได้ไม่ถอดตัวนี้ออก
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+# connection ของแต่ละ thread (รวม thread ของ sync_to_async) ได้ตัววัดตอนเชื่อมต่อ
+connection_created.connect(_install, dispatch_uid="core.instrumentation")
+
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+    """นับ hit/miss ของ ``get()`` (``get_many()``, ``aget()`` และ ``{% cache %}`` เรียกผ่าน ``get()``)"""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        metrics = _metrics.get()
+        if metrics is not None:
+            if value is _MISSING:
+                metrics.cache_misses += 1
+            else:
+                metrics.cache_hits += 1
+        return default if value is _MISSING else value
+
+
+class InstrumentedFileBasedCache(CacheMetricsMixin, FileBasedCache):
+    pass
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        metrics = _metrics.get()
+        if metrics is None:
+            return super().render(context, request)
+        # นับเฉพาะเทมเพลตชั้นนอก เทมเพลตที่ render ซ้อนอยู่ข้างในรวมอยู่ในเวลานั้นแล้ว
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_seconds += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """``DjangoTemplates`` ที่จับเวลา render"""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+class ViewStats:
+    def __init__(self):
+        self.samples = deque(maxlen=SAMPLES)
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_seconds = 0.0
+        self.response_bytes = 0
+        self.statuses = Counter()
+
+    def add(self, metrics, status):
+        self.samples.append(metrics.seconds)
+        self.count += 1
+        self.seconds += metrics.seconds
+        self.queries += metrics.queries
+        self.db_seconds += metrics.db_seconds
+        self.cache_hits += metrics.cache_hits
+        self.cache_misses += metrics.cache_misses
+        self.template_seconds += metrics.template_seconds
+        self.response_bytes += metrics.size or 0
+        self.statuses[status] += 1
+
+    def quantiles(self):
+        samples = sorted(self.samples)
+        return [
+            (q, samples[min(len(samples) - 1, int(q * len(samples)))]) for q in QUANTILES
+        ]
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else UNRESOLVED
+
+
+def _size(response):
+    if response.has_header("Content-Length"):
+        try:
+            return int(response["Content-Length"])
+        except ValueError:
+            return None
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+def _start():
+    for connection in connections.all():
+        _install(connection)
+    return _metrics.set(RequestMetrics())
+
+
+def _finish(request, response, token):
+    metrics = _metrics.get()
+    _metrics.reset(token)
+    metrics.seconds = time.perf_counter() - metrics.started
+    metrics.size = _size(response)
+    view = _view_name(request)
+    with _stats_lock:
+        stats = _stats.get(view)
+        if stats is None:
+            stats = _stats[view] = ViewStats()
+        stats.add(metrics, response.status_code)
+
+    if settings.SERVER_TIMING:
+        timing = metrics.server_timing()
+        if response.has_header("Server-Timing"):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response["Server-Timing"] = timing
+    if metrics.seconds >= settings.SLOW_REQUEST_SECONDS:
+        logger.warning(
+            "request ช้า %s %s (%s) %.0fms, %d queries %.0fms, tpl %.0fms, %s bytes%s",
+            request.method,
+            request.path,
+            view,
+            metrics.seconds * 1000,
+            metrics.queries,
+            metrics.db_seconds * 1000,
+            metrics.template_seconds * 1000,
+            metrics.size if metrics.size is not None else "?",
+            "".join(
+                f"\n  {seconds * 1000:.1f}ms {sql[:300]}" for seconds, sql in metrics.top_queries()
+            ),
+        )
+    return response
+
+
+@sync_and_async_middleware
+def request_metrics_middleware(get_response):
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            token = _start()
+            try:
+                response = await get_response(request)
+            except BaseException:
+                _metrics.reset(token)
+                raise
+            return _finish(request, response, token)
+
+    else:
+
+        def middleware(request):
+            token = _start()
+            try:
+                response = get_response(request)
+            except BaseException:
+                _metrics.reset(token)
+                raise
+            return _finish(request, response, token)
+
+    return middleware
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics():
+    """สถิติทั้งหมดของ process นี้ในรูปแบบข้อความของ Prometheus"""
+    with _stats_lock:
+        views = sorted(
+            (view, stats, stats.quantiles(), dict(stats.statuses))
+            for view, stats in _stats.items()
+        )
+    lines = [
+        "# HELP http_request_duration_seconds เวลาตอบ request แยกตามชื่อ URL",
+        "# TYPE http_request_duration_seconds summary",
+    ]
+    for view, stats, quantiles, _ in views:
+        label = f'view="{_label(view)}"'
+        for q, seconds in quantiles:
+            lines.append(f'http_request_duration_seconds{{{label},quantile="{q}"}} {seconds:.6f}')
+        lines.append(f"http_request_duration_seconds_sum{{{label}}} {stats.seconds:.6f}")
+        lines.append(f"http_request_duration_seconds_count{{{label}}} {stats.count}")
+
+    lines += [
+        "# HELP http_requests_total จำนวน request แยกตามชื่อ URL และสถานะ",
+        "# TYPE http_requests_total counter",
+    ]
+    for view, _, _, statuses in views:
+        for status, count in sorted(statuses.items()):
+            lines.append(f'http_requests_total{{view="{_label(view)}",status="{status}"}} {count}')
+
+    for name, help_text, attr, fmt in (
+        ("http_db_queries_total", "จำนวน query", "queries", "d"),
+        ("http_db_seconds_total", "เวลาของ query", "db_seconds", ".6f"),
+        ("http_cache_hits_total", "cache hit", "cache_hits", "d"),
+        ("http_cache_misses_total", "cache miss", "cache_misses", "d"),
+        ("http_template_seconds_total", "เวลา render เทมเพลต", "template_seconds", ".6f"),
+        ("http_response_bytes_total", "ขนาด response", "response_bytes", "d"),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for view, stats, _, _ in views:
+            lines.append(f'{name}{{view="{_label(view)}"}} {getattr(stats, attr):{fmt}}')
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+    if token and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return True
+    return request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    """
+    ``/metrics`` สำหรับ Prometheus เปิดให้ request ที่มี ``Authorization: Bearer <METRICS_TOKEN>``
+    หรือมาจาก IP ใน ``METRICS_ALLOWED_IPS`` (ค่าเริ่มต้นปิดทั้งคู่ ดูหมายเหตุเรื่อง proxy ใน settings)
+    """
+    if not _metrics_allowed(request):
+        raise Http404
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,35 @@
+"""
+รวมงานที่ต้องทำหลัง transaction commit ไว้ทำครั้งเดียวต่อรายการ
+
+signal หลายตัวใน transaction เดียวอาจขอทำงานกับรายการเดียวกันหลายครั้ง (เช่น บันทึกหลายส่วนของ
+หน้าเดียวกัน) ``OnCommitBatch`` เก็บ key ไว้ในชุดของ thread ปัจจุบัน แล้วเรียก ``handler(keys)``
+ครั้งเดียวหลัง commit ถ้า rollback งานก็ไม่ถูกเรียก (ชุดที่ค้างจะถูกทำพร้อมรอบถัดไป)::
+
+    touched = OnCommitBatch(lambda pks: Page.objects.filter(pk__in=pks).update(...))
+    touched.add(page.pk)
+"""
+
+import threading
+from django.db import transaction
+
+
+class OnCommitBatch:
+    def __init__(self, handler):
+        self.handler = handler
+        self._local = threading.local()
+
+    def add(self, *keys):
+        """เพิ่ม key (ข้าม None) แล้วเรียก ``handler`` หลัง transaction ปัจจุบัน commit"""
+        pending = getattr(self._local, "pending", None)
+        if pending is None:
+            pending = self._local.pending = set()
+        pending.update(key for key in keys if key is not None)
+        transaction.on_commit(self.flush)
+
+    def flush(self):
+        """ทำงานกับ key ที่รออยู่ทั้งหมด"""
+        pending = getattr(self._local, "pending", None)
+        if not pending:
+            return
+        self._local.pending = None
+        self.handler(pending)
@@ -0,0 +1,112 @@
+"""
+แบ่งหน้าแบบ keyset (seek) แทน OFFSET
+
+หน้าถัดไปถูกอ้างด้วยค่าของแถวสุดท้ายในหน้าก่อน (cursor) แล้วกรองด้วย
+``WHERE (publish_date, id) < (ค่าเดิม)`` ฐานข้อมูลจึงเริ่มอ่าน index ตรงตำแหน่งนั้นเลย
+หน้าที่ลึกแค่ไหนก็ใช้เวลาเท่ากับหน้าแรก ต่างจาก OFFSET ที่ต้องอ่านแถวก่อนหน้าทิ้งทั้งหมด::
+
+    page = keyset_paginate(queryset, ("-publish_date", "-id"), request.GET.get("after"))
+    page.items, page.next_cursor
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str | None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _fields(model, ordering):
+    names = [name.lstrip("-") for name in ordering]
+    if len({name.startswith("-") for name in ordering}) != 1:
+        raise ValueError("ทุกฟิลด์ใน ordering ต้องเรียงทิศทางเดียวกัน")
+    return [model._meta.pk if name == "pk" else model._meta.get_field(name) for name in names]
+
+
+def encode_cursor(fields, obj):
+    """cursor ของแถว ``obj`` (ค่าแบบข้อความเต็มความละเอียด เช่น datetime ระดับไมโครวินาที)"""
+    data = json.dumps([field.value_to_string(obj) for field in fields], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(fields, cursor):
+    """แปลง cursor กลับเป็นค่าของแต่ละฟิลด์ ถ้าไม่ถูกต้องจะ raise InvalidCursor"""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(raw, list) or len(raw) != len(fields):
+            raise InvalidCursor(cursor)
+        values = [field.to_python(value) for field, value in zip(fields, raw)]
+    except (ValueError, TypeError, ValidationError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if any(value is None for value in values):
+        raise InvalidCursor(cursor)
+    return values
+
+
+def _seek_condition(fields, values, descending):
+    """
+    ``(a, b, ...) < (x, y, ...)`` ในรูป ``a <= x AND (a < x OR (a = x AND b < y) ...)``
+
+    เงื่อนไข ``a <= x`` ที่ซ้ำอยู่ทำให้ฐานข้อมูลใช้เป็นช่วงของ index scan ได้
+    """
+    op = "lt" if descending else "gt"
+    bound = Q(**{f"{fields[0].name}__{op}e": values[0]})
+    seek = Q()
+    for i, (field, value) in enumerate(zip(fields, values)):
+        equal = {prev.name: prev_value for prev, prev_value in zip(fields[:i], values[:i])}
+        seek |= Q(**equal, **{f"{field.name}__{op}": value})
+    return bound & seek
+
+
+def keyset_paginate(queryset, ordering, cursor=None, per_page=20, bounds=None):
+    """
+    หน้าหนึ่งของ ``queryset`` เรียงตาม ``ordering`` (ฟิลด์สุดท้ายต้อง unique เช่น id)
+    ต่อจาก ``cursor`` ของหน้าก่อน (None = หน้าแรก)
+
+    ``bounds`` คือเงื่อนไขช่วงของฟิลด์แรกใน ordering (เช่น ไม่เกินเวลาปัจจุบัน) ซึ่งถูกต่อ
+    ท้ายเงื่อนไข seek เพื่อให้ฐานข้อมูลเริ่ม index scan ที่ตำแหน่ง cursor
+    (SQLite ใช้ขอบเขตแรกที่พบของคอลัมน์เป็นช่วงของ index เท่านั้น)
+    """
+    fields, queryset = _seek(queryset, ordering, cursor, bounds)
+    return _page(fields, list(queryset[: per_page + 1]), per_page)
+
+
+async def akeyset_paginate(queryset, ordering, cursor=None, per_page=20, bounds=None):
+    """``keyset_paginate`` สำหรับ async view"""
+    fields, queryset = _seek(queryset, ordering, cursor, bounds)
+    return _page(fields, [item async for item in queryset[: per_page + 1]], per_page)
+
+
+def _seek(queryset, ordering, cursor, bounds):
+    fields = _fields(queryset.model, ordering)
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(fields, cursor)
+        queryset = queryset.filter(
+            _seek_condition(fields, values, ordering[0].startswith("-"))
+        )
+    if bounds is not None:
+        queryset = queryset.filter(bounds)
+    return fields, queryset
+
+
+def _page(fields, items, per_page):
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor(fields, items[-1])
+    return KeysetPage(items, next_cursor)
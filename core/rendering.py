@@ -0,0 +1,155 @@
+"""
+ความเร็วในการ render เทมเพลต
+
+``preload_templates()`` คอมไพล์เทมเพลตทั้งหมดของโปรเจกต์ลง cached loader ตอนเริ่ม process
+(เรียกจาก core/wsgi.py และ core/asgi.py) request แรกของแต่ละ worker จึงไม่ต้อง parse
+``base.html`` และ include ต่าง ๆ
+
+เมื่อ ``TEMPLATE_PROFILING`` เปิดอยู่ ``template_profiling_middleware`` จะเก็บเวลาและจำนวน query
+ของแต่ละบล็อก ``{% profile "ชื่อ" %}...{% endprofile %}`` (app/templatetags/profiling.py)
+แล้วส่งกลับใน header ``Server-Timing`` (ดูได้ในแท็บ Network ของเบราว์เซอร์) และเขียน log
+ของ logger ``core.rendering`` เวลาของบล็อกที่ซ้อนกันนับรวมบล็อกด้านใน
+"""
+
+import logging
+import os
+import re
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger(__name__)
+
+_profile = ContextVar("template_profile", default=None)
+_METRIC_RE = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def preload_templates():
+    """คอมไพล์ทุกไฟล์ .html ในโฟลเดอร์เทมเพลตของโปรเจกต์ (ไม่รวมของ Django/แพ็กเกจ) คืนจำนวนไฟล์"""
+    count = 0
+    for engine, name, _ in project_templates():
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError:
+            logger.exception("คอมไพล์เทมเพลต %s ไม่ได้", name)
+            continue
+        count += 1
+    return count
+
+
+def project_templates():
+    """``(engine, ชื่อ, path)`` ของไฟล์ .html ทุกไฟล์ในโฟลเดอร์เทมเพลตของโปรเจกต์"""
+    for engine in engines.all():
+        engine = getattr(engine, "engine", None)  # เฉพาะ DjangoTemplates
+        if engine is None:
+            continue
+        for directory in _template_dirs(engine):
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    if filename.endswith(".html"):
+                        path = os.path.join(root, filename)
+                        name = os.path.relpath(path, directory).replace(os.sep, "/")
+                        yield engine, name, path
+
+
+def _template_dirs(engine):
+    base = os.path.realpath(settings.BASE_DIR)
+    for loader in engine.template_loaders:
+        for inner in getattr(loader, "loaders", [loader]):
+            for directory in inner.get_dirs():
+                directory = os.path.realpath(directory)
+                if directory.startswith(base + os.sep) and os.path.isdir(directory):
+                    yield directory
+
+
+class RenderProfile:
+    def __init__(self):
+        self.blocks = []  # (ชื่อ, วินาที, จำนวน query) ตามลำดับที่ render เสร็จ
+
+    def server_timing(self):
+        return ", ".join(
+            f'tpl-{_METRIC_RE.sub("-", name)};dur={seconds * 1000:.2f};desc="{queries} queries"'
+            for name, seconds, queries in self.blocks
+        )
+
+
+@contextmanager
+def profile_block(name):
+    """จับเวลาและนับ query ของโค้ดในบล็อก (ไม่ทำอะไรถ้าไม่ได้เปิด profiling ใน request นี้)"""
+    profile = _profile.get()
+    if profile is None:
+        yield
+        return
+    queries = 0
+
+    def count(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(count))
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.blocks.append((name, time.perf_counter() - started, queries))
+
+
+def _start():
+    if not settings.TEMPLATE_PROFILING:
+        return None
+    return _profile.set(RenderProfile())
+
+
+def _finish(request, response, token):
+    profile = _profile.get()
+    _profile.reset(token)
+    if not profile.blocks:
+        return response
+    timing = profile.server_timing()
+    if response.has_header("Server-Timing"):
+        timing = f"{response['Server-Timing']}, {timing}"
+    response["Server-Timing"] = timing
+    blocks = ", ".join(
+        f"{name} {seconds * 1000:.1f}ms/{queries}q" for name, seconds, queries in profile.blocks
+    )
+    logger.info("%s %s: %s", request.method, request.path, blocks)
+    return response
+
+
+@sync_and_async_middleware
+def template_profiling_middleware(get_response):
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            token = _start()
+            if token is None:
+                return await get_response(request)
+            try:
+                response = await get_response(request)
+            except BaseException:
+                _profile.reset(token)
+                raise
+            return _finish(request, response, token)
+
+    else:
+
+        def middleware(request):
+            token = _start()
+            if token is None:
+                return get_response(request)
+            try:
+                response = get_response(request)
+            except BaseException:
+                _profile.reset(token)
+                raise
+            return _finish(request, response, token)
+
+    return middleware
@@ -0,0 +1,122 @@
+"""
+ส่ง query อ่านของหน้าเว็บสาธารณะไปที่ read replica
+
+``replica_routing_middleware`` กำหนดต่อ request ว่าอ่านจาก replica ได้หรือไม่
+(เฉพาะ GET/HEAD ที่ไม่ใช่หน้า admin) แล้ว ``PrimaryReplicaRouter`` ส่ง query อ่านของโมเดลใน
+``REPLICA_APPS`` ไปที่ alias ใน ``settings.DATABASE_REPLICAS`` (สุ่มหนึ่งตัว)
+
+งานเขียนทุกอย่างไปที่ ``default`` และหลังจากเขียนแล้ว query อ่านที่เหลือของ request นั้นก็ไปที่
+``default`` ด้วย เมื่อผู้ใช้ส่ง POST/PUT/PATCH/DELETE จะได้ cookie ที่ทำให้ request ถัดไปอ่านจาก
+``default`` อีก ``DATABASE_REPLICA_PIN_SECONDS`` วินาที จึงเห็นสิ่งที่ตัวเองเพิ่งแก้แม้ replica ยังตามไม่ทัน
+
+query นอก request (management command, worker, on_commit) และ query ใน transaction อ่านจาก
+``default`` เสมอ
+"""
+
+import random
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import reverse
+from django.utils.decorators import sync_and_async_middleware
+
+REPLICA_APPS = {"app", "news", "pages", "mediafiles"}
+PIN_COOKIE = "db_pinned"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class _Routing:
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+
+
+# เป็นอ็อบเจกต์ที่แก้ได้ จึงเห็นค่าเดียวกันใน thread ของ sync_to_async
+_routing = ContextVar("replica_routing", default=None)
+
+
+def replicas():
+    return settings.DATABASE_REPLICAS
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if (
+            routing is None
+            or not routing.use_replica
+            or model._meta.app_label not in REPLICA_APPS
+            or not replicas()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return None
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return None  # อ่านความสัมพันธ์จากฐานข้อมูลเดียวกับตัวอ็อบเจกต์
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.use_replica = False
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False  # replica ได้ schema จากการ replicate
+        return None
+
+
+def _start(request):
+    use_replica = (
+        request.method in SAFE_METHODS
+        and PIN_COOKIE not in request.COOKIES
+        and not request.path.startswith(reverse("admin:index"))
+    )
+    return _routing.set(_Routing(use_replica))
+
+
+def _finish(request, response, token):
+    _routing.reset(token)
+    if request.method not in SAFE_METHODS:
+        response.set_cookie(
+            PIN_COOKIE,
+            "1",
+            max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite="Lax",
+        )
+    return response
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            token = _start(request)
+            try:
+                response = await get_response(request)
+            except BaseException:
+                _routing.reset(token)
+                raise
+            return _finish(request, response, token)
+
+    else:
+
+        def middleware(request):
+            token = _start(request)
+            try:
+                response = get_response(request)
+            except BaseException:
+                _routing.reset(token)
+                raise
+            return _finish(request, response, token)
+
+    return middleware
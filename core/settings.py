@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+from core.database import TRUE_VALUES, database_config, replica_configs
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,9 +26,9 @@ SECRET_KEY = "django-insecure-4hzjr-kz*d5^#p7=p@hzet#1-r5n82xdj=dedp7l^g#slytyoy
 
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DJANGO_DEBUG", "1").lower() in TRUE_VALUES
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",") if host]
 
 
 # Application definition
@@ -46,9 +47,15 @@ INSTALLED_APPS = [
     "ckeditor",
     "ckeditor_uploader",
     "users",  # แอพพลิเคชันสำหรับจัดการผู้ใช้
+    "search",  # ดัชนีค้นหาข่าวและหน้า
 ]
 
 MIDDLEWARE = [
+    # ส่งไฟล์ใน STATIC_ROOT (มี hash + gzip/brotli) ก่อน middleware อื่น ดู core/staticfiles.py
+    "core.staticfiles.static_files_middleware",
+    "core.instrumentation.request_metrics_middleware",
+    "core.routers.replica_routing_middleware",
+    "core.rendering.template_profiling_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -64,9 +71,10 @@ ROOT_URLCONF = "core.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates ที่จับเวลา render ให้ core.instrumentation
+        "BACKEND": "core.instrumentation.DjangoTemplates",
+        "NAME": "django",
         "DIRS": [BASE_DIR / "templates"],  # โฟลเดอร์ที่เก็บไฟล์ HTML ของเรา
-        "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.debug",
@@ -74,24 +82,68 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
             ],
+            # เก็บเทมเพลตที่คอมไพล์แล้วไว้ในหน่วยความจำ (ตอน DEBUG ถูกล้างเมื่อไฟล์เปลี่ยน)
+            # และคอมไพล์ทั้งหมดไว้ก่อนตอนเริ่ม worker ด้วย core.rendering.preload_templates()
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
         },
     },
 ]
 
+# เวลาและจำนวน query ของแต่ละบล็อก {% profile %} ใน header Server-Timing (core/rendering.py)
+TEMPLATE_PROFILING = (
+    os.environ.get("TEMPLATE_PROFILING", "1" if DEBUG else "").lower() in TRUE_VALUES
+)
+
+# เวลา/query/cache ของทุก request (core/instrumentation.py) สถิติรวมดูที่ /metrics
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "1" if DEBUG else "").lower() in TRUE_VALUES
+SLOW_REQUEST_SECONDS = float(os.environ.get("SLOW_REQUEST_SECONDS", "1.0"))
+# /metrics มีเวลา SQL ของทุก view ปิดไว้จนกว่าจะตั้งค่าใดค่าหนึ่ง หลัง reverse proxy (nginx) ทุก request
+# มี REMOTE_ADDR เป็นของ proxy (เช่น 127.0.0.1) การเปิดตาม IP จึงเปิดให้ทุกคน ให้ใช้ METRICS_TOKEN
+# (Prometheus ส่ง "Authorization: Bearer <token>") หรือปิด location /metrics ที่ proxy แทน
+METRICS_ALLOWED_IPS = [
+    ip for ip in os.environ.get("METRICS_ALLOWED_IPS", "").split(",") if ip
+]
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
 WSGI_APPLICATION = "core.wsgi.application"
 
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# ค่าเชื่อมต่อ การใช้ connection ซ้ำ และ connection pool อ่านจาก environment (ดู core/database.py)
+
 DATABASES = {
+    "default": database_config(),
+    **replica_configs(),
+}
+
+# หน้าเว็บสาธารณะอ่านจาก replica (core/routers.py) หลังผู้ใช้แก้ข้อมูลจะอ่านจาก default ช่วงหนึ่ง
+DATABASE_ROUTERS = ["core.routers.PrimaryReplicaRouter"]
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# ใช้ file-based cache เพื่อให้ทุก worker process เห็น cache ชุดเดียวกัน
+# (การล้าง cache ผ่าน signal จึงมีผลกับทุก process)
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
-        "NAME": "socdb_2025",  # ชื่อฐานข้อมูลที่ต้องการใช้
-        "USER": "postgres",  # ชื่อผู้ใช้ PostgreSQL
-        "PASSWORD": "Soc@0903297444",  # รหัสผ่านของ PostgreSQL
-        "HOST": "localhost",  # หรือ IP ของเซิร์ฟเวอร์ PostgreSQL
-        "PORT": "5432",  # พอร์ตเริ่มต้นของ PostgreSQL
+        # FileBasedCache ที่นับ hit/miss ให้ core.instrumentation
+        "BACKEND": "core.instrumentation.InstrumentedFileBasedCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache/"),
+        "TIMEOUT": 60 * 15,
+        "OPTIONS": {"MAX_ENTRIES": 1000},
     }
 }
 
@@ -133,8 +185,14 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 STATICFILES_DIRS = [BASE_DIR / "static"]  # โฟลเดอร์ที่เก็บไฟล์ Static ของเรา
+# ใช้ CSS ที่ตัดคลาสที่ไม่ได้ใช้ และฝัง CSS ส่วนบนของหน้า (manage.py build_css, core/css.py)
+PRUNED_CSS = os.environ.get("PRUNED_CSS", "" if DEBUG else "1").lower() in TRUE_VALUES
+STATIC_MAX_AGE = 60  # Cache-Control ของไฟล์ static ที่ไม่มี hash ในชื่อ
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media/")  # โฟลเดอร์ที่เก็บไฟล์ Media ของเรา
+# ให้ web server ส่งไฟล์ media แทน Django: "nginx" (X-Accel-Redirect) หรือ "apache" (X-Sendfile)
+MEDIA_ACCEL_REDIRECT = None
+MEDIA_ACCEL_PREFIX = "/protected-media/"  # location แบบ internal ของ nginx ที่ชี้ไปยัง MEDIA_ROOT
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -145,6 +203,19 @@ AUTH_USER_MODEL = "users.CustomUser"  # บอก Django ให้ใช้ Cust
 
 CKEDITOR_BASEPATH = "/static/ckeditor/ckeditor/"
 CKEDITOR_UPLOAD_PATH = "uploads/"
+
+# ไฟล์ที่อัปโหลดผ่าน FileField เก็บตามเนื้อหา ไฟล์ซ้ำเก็บครั้งเดียว (mediafiles/storage.py)
+# ไฟล์ของ CKEditor เก็บตามชื่อเดิม เพราะหน้า "Browse Server" อ่านจากโฟลเดอร์ของมัน
+STORAGES = {
+    "default": {
+        "BACKEND": "mediafiles.storage.ContentAddressedStorage",
+        "OPTIONS": {"passthrough": [CKEDITOR_UPLOAD_PATH]},
+    },
+    # collectstatic ใส่ hash ในชื่อไฟล์และสร้าง .gz/.br (core/staticfiles.py)
+    "staticfiles": {
+        "BACKEND": "core.staticfiles.CompressedManifestStaticFilesStorage",
+    },
+}
 CKEDITOR_CONFIGS = {
     "awesome_ckeditor": {
         "toolbar": "Basic",
@@ -0,0 +1,189 @@
+"""
+ไฟล์ static แบบมี hash ในชื่อและบีบอัดไว้ก่อน
+
+``manage.py collectstatic`` ด้วย ``CompressedManifestStaticFilesStorage`` คัดลอกไฟล์ลง
+``STATIC_ROOT`` พร้อมสำเนาที่มี hash ของเนื้อหาในชื่อ (เช่น ``dist/styles.3f2a9c1b7e4d.css``)
+``{% static %}`` จะชี้ไปยังชื่อนั้น แล้วสร้าง ``.gz`` และ ``.br`` (ถ้าติดตั้ง Brotli) ของไฟล์ที่บีบอัดได้
+
+``static_files_middleware`` ส่งไฟล์จาก ``STATIC_ROOT`` ก่อนถึง middleware อื่น (แบบ WhiteNoise)
+เลือกไฟล์ที่บีบอัดแล้วตาม ``Accept-Encoding`` ไฟล์ที่มี hash ในชื่อได้ ``Cache-Control`` หนึ่งปี
+(immutable) ไฟล์ชื่อเดิม (เช่นที่ CKEditor โหลดเอง) ได้ ``STATIC_MAX_AGE`` วินาที รายชื่อไฟล์ถูกอ่าน
+ครั้งเดียวตอนเริ่ม worker จึงต้องเริ่ม worker ใหม่หลัง collectstatic ตอน ``DEBUG`` ไม่ใช้ middleware นี้
+(``core/urls.py`` ส่งไฟล์จาก ``static/`` โดยตรง)
+"""
+
+import gzip
+import mimetypes
+import os
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.http import http_date, quote_etag
+
+try:
+    import brotli
+except ImportError:  # ไม่มี Brotli ก็ส่งแบบ gzip
+    brotli = None
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+COMPRESS_MIN_SIZE = 256
+# ไฟล์ที่บีบอัดมาแล้ว บีบซ้ำไม่ได้ผล
+INCOMPRESSIBLE = {
+    ".br", ".gz", ".zip", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".avif",
+    ".woff", ".woff2", ".mp3", ".mp4", ".webm",
+}
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))  # ลำดับที่เลือกเมื่อ browser รับได้หลายแบบ
+
+
+def compress_file(path):
+    """เขียน ``path.gz`` และ ``path.br`` ถ้าเล็กกว่าต้นฉบับพอ คืนรายชื่อไฟล์ที่เขียน"""
+    if os.path.splitext(path)[1].lower() in INCOMPRESSIBLE:
+        return []
+    with open(path, "rb") as source:
+        data = source.read()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return []
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data)))
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) >= len(data) * 0.95:
+            continue
+        with open(path + suffix, "wb") as target:
+            target.write(compressed)
+        written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # ไฟล์ที่ยังไม่ได้ collectstatic (หรือไม่มี manifest) ใช้ hash ของไฟล์ใน STATIC_ROOT แทนการ error
+    manifest_strict = False
+    # ไฟล์ต้นทางของ Tailwind (static/src/input.css มี @import "tailwindcss" ที่ไม่ใช่ URL) ไม่ต้องทำ hash
+    unprocessed = ("src/",)
+
+    def post_process(self, paths, dry_run=False, **options):
+        paths = {
+            name: value for name, value in paths.items() if not name.startswith(self.unprocessed)
+        }
+        names = set(paths)
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(names):
+            if self.exists(name):
+                compress_file(self.path(name))
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.filename = os.path.basename(path)
+        if immutable:
+            self.cache_control = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        else:
+            self.cache_control = f"public, max-age={settings.STATIC_MAX_AGE}"
+        self.variants = {None: self._stat(path)}  # encoding -> (path, ขนาด, mtime)
+        for encoding, suffix in ENCODINGS:
+            if os.path.isfile(path + suffix):
+                self.variants[encoding] = self._stat(path + suffix)
+
+    @staticmethod
+    def _stat(path):
+        stat = os.stat(path)
+        return path, stat.st_size, int(stat.st_mtime)
+
+    def select(self, accept_encoding):
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and (encoding in accepted or "*" in accepted):
+                return encoding
+        return None
+
+    def response(self, request):
+        encoding = self.select(request.headers.get("Accept-Encoding", ""))
+        path, size, last_modified = self.variants[encoding]
+        etag = quote_etag(f"{last_modified:x}-{size:x}{'-' + encoding if encoding else ''}")
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = FileResponse(
+                open(path, "rb"), content_type=self.content_type, filename=self.filename
+            )
+            if encoding:
+                response["Content-Encoding"] = encoding
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = self.cache_control
+        if len(self.variants) > 1:
+            response["Vary"] = "Accept-Encoding"
+        return response
+
+
+def scan_static_root(root=None):
+    """``{url ที่อยู่หลัง STATIC_URL: StaticFile}`` ของทุกไฟล์ใน ``STATIC_ROOT``"""
+    root = root or settings.STATIC_ROOT
+    hashed = set(getattr(staticfiles_storage, "hashed_files", {}).values())
+    suffixes = tuple(suffix for _, suffix in ENCODINGS)
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, "/")
+            if any(path.endswith(s) and os.path.isfile(path[: -len(s)]) for s in suffixes):
+                continue  # สำเนาที่บีบอัดของไฟล์อื่น
+            files[name] = StaticFile(path, immutable=name in hashed)
+    return files
+
+
+@sync_and_async_middleware
+def static_files_middleware(get_response):
+    if settings.DEBUG or not settings.STATIC_ROOT or not os.path.isdir(settings.STATIC_ROOT):
+        raise MiddlewareNotUsed
+    files = scan_static_root()
+    prefix = settings.STATIC_URL
+
+    def respond(request):
+        if request.method not in ("GET", "HEAD") or not request.path.startswith(prefix):
+            return None
+        static_file = files.get(request.path[len(prefix):])
+        return static_file.response(request) if static_file is not None else None
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            response = respond(request)
+            if response is None:
+                response = await get_response(request)
+            return response
+
+    else:
+
+        def middleware(request):
+            response = respond(request)
+            if response is None:
+                response = get_response(request)
+            return response
+
+    return middleware
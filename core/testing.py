@@ -0,0 +1,152 @@
+"""
+เครื่องมือสำหรับเทสต์ของทุกแอป
+"""
+
+import re
+from contextlib import contextmanager
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+# SQLite: "SCAN news_article" = อ่านทั้งตาราง ส่วน "SCAN t USING INDEX ..." คือไล่ index
+# ตามลำดับของ ORDER BY (หยุดเมื่อครบ LIMIT) จึงไม่นับเป็นการอ่านทั้งตาราง
+_SQLITE_SCAN_RE = re.compile(r"\bSCAN (?!CONSTANT ROW)(?!\()(\S+)(?!.*\bUSING\b)")
+_SQLITE_SUBQUERY_RE = re.compile(r"\b(?:CO-ROUTINE|MATERIALIZE) (\S+)")
+_POSTGRES_SCAN_RE = re.compile(r"\bSeq Scan on (\S+)")
+
+
+def explain(sql, params=None):
+    """แผนการ query (บรรทัดละหนึ่งขั้น) ของฐานข้อมูลปัจจุบัน"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # ข้อมูลทดสอบมีน้อยจน seq scan ถูกกว่าเสมอ ปิดไว้เพื่อดูว่ามี index ที่ใช้ได้หรือไม่
+            # (ถ้าไม่มีเลย แผนจะยังเป็น Seq Scan)
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + sql, params)
+        else:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [" ".join(str(column) for column in row) for row in cursor.fetchall()]
+
+
+def sequential_scans(sql, params=None):
+    """ชื่อตารางที่แผนของ query นี้อ่านทั้งตาราง"""
+    plan = explain(sql, params)
+    pattern = _POSTGRES_SCAN_RE if connection.vendor == "postgresql" else _SQLITE_SCAN_RE
+    # ผลของ subquery ที่ SQLite สร้างไว้ชั่วคราว ไม่ใช่ตาราง
+    subqueries = {m.group(1) for line in plan for m in _SQLITE_SUBQUERY_RE.finditer(line)}
+    return [
+        match.group(1).strip('"')
+        for line in plan
+        for match in pattern.finditer(line)
+        if match.group(1) not in subqueries
+    ]
+
+
+class QueryPlanTestMixin:
+    """
+    ตรวจด้วย EXPLAIN ว่า query ที่หน้าเว็บสาธารณะใช้มี index รองรับ::
+
+        with self.assertNoSequentialScans():
+            self.client.get("/news/")
+    """
+
+    @contextmanager
+    def assertNoSequentialScans(self, allow=()):
+        """ทุก SELECT ในบล็อกต้องไม่อ่านทั้งตาราง (ยกเว้นตารางใน ``allow``)"""
+        with CaptureQueriesContext(connection) as queries:
+            yield queries
+        selects = [q["sql"] for q in queries if q["sql"].lstrip().upper().startswith("SELECT")]
+        self.assertTrue(selects, "ไม่มี SELECT ให้ตรวจ")
+        for sql in selects:
+            scans = [table for table in sequential_scans(sql) if table not in allow]
+            self.assertFalse(
+                scans,
+                f"sequential scan บน {', '.join(scans)}:\n{sql}\n" + "\n".join(explain(sql)),
+            )
+
+    def assertQueryUsesIndex(self, queryset, allow=()):
+        sql, params = queryset.query.sql_with_params()
+        scans = [table for table in sequential_scans(sql, params) if table not in allow]
+        self.assertFalse(
+            scans,
+            f"sequential scan บน {', '.join(scans)}:\n{sql}\n" + "\n".join(explain(sql, params)),
+        )
+
+
+class QueryBudgetTestMixin:
+    """
+    ตรวจว่าจำนวน query ของหน้าหนึ่งไม่ขึ้นกับจำนวนแถว (ไม่มี N+1)::
+
+        self.assertConstantQueries(changelist_url(Tag), make_tags)
+    """
+
+    def login_admin(self):
+        user = get_user_model().objects.create_superuser(
+            username="budget-admin", email="budget-admin@example.com", password="x"
+        )
+        self.client.force_login(user)
+        return user
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return queries
+
+    def assertConstantQueries(self, url, seed, rows=500, max_queries=None):
+        """
+        ``seed(n)`` สร้างข้อมูลเพิ่ม n แถว จำนวน query ของ GET ``url`` เมื่อมี 1 แถว
+        ต้องเท่ากับเมื่อมี ``rows`` แถว (และไม่เกิน ``max_queries`` ถ้าระบุ)
+        """
+        seed(1)
+        few = self.count_queries(url)
+        seed(rows - 1)
+        many = self.count_queries(url)
+        self.assertEqual(
+            len(many),
+            len(few),
+            f"{url}: {len(few)} query เมื่อมี 1 แถว แต่ {len(many)} query เมื่อมี {rows} แถว\n"
+            + "\n".join(q["sql"] for q in many),
+        )
+        if max_queries is not None:
+            self.assertLessEqual(len(many), max_queries, url)
+
+
+class ReplicaTestMixin:
+    """
+    เพิ่ม alias ``replica`` ที่ต่อกับฐานข้อมูลทดสอบเดียวกับ default แทน read replica จริง
+    ใช้กับ TransactionTestCase เพราะอีก connection เห็นเฉพาะข้อมูลที่ commit แล้ว::
+
+        class Tests(ReplicaTestMixin, TransactionTestCase):
+            ...
+
+    alias ถูกเพิ่มหลัง test runner ตั้งค่าฐานข้อมูลแล้ว จึงไม่ต้องใส่ไว้ใน ``databases`` ของคลาส
+    """
+
+    replica_alias = "replica"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        primary = connections["default"].settings_dict
+        connections.settings[cls.replica_alias] = {
+            **primary,
+            "TEST": {**primary["TEST"], "MIRROR": "default"},
+        }
+        cls.databases = {*cls.databases, cls.replica_alias}
+        cls.addClassCleanup(cls._remove_replica)
+        cls.enterClassContext(override_settings(DATABASE_REPLICAS=[cls.replica_alias]))
+
+    @classmethod
+    def _remove_replica(cls):
+        connections[cls.replica_alias].close()
+        del connections[cls.replica_alias]
+        del connections.settings[cls.replica_alias]
+
+    def captureReplicaQueries(self):
+        return CaptureQueriesContext(connections[self.replica_alias])
+
+
+def changelist_url(model):
+    return reverse(f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist")
@@ -0,0 +1,85 @@
+"""
+Mixin สำหรับจำค่าเดิมของฟิลด์ตอนโหลด instance จากฐานข้อมูล
+
+ใช้แทนการ ``Model.objects.get(pk=self.pk)`` ใน save()/pre_save เพื่อตรวจว่าไฟล์
+(หรือฟิลด์อื่น) ถูกเปลี่ยนหรือไม่ โดยไม่ต้อง SELECT ซ้ำ::
+
+    class Slide(FieldTrackingMixin, models.Model):
+        tracked_fields = ("image",)
+
+    old_image = slide.replaced_file("image")  # FieldFile เดิม หรือ None
+"""
+
+from django.db.models.fields.files import FieldFile
+
+
+class FieldTrackingMixin:
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_tracked_fields()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # ค่าที่เพิ่งบันทึกกลายเป็นค่าเดิมสำหรับการบันทึกครั้งต่อไป
+        self.snapshot_tracked_fields()
+
+    def snapshot_tracked_fields(self):
+        """จำค่าปัจจุบันของฟิลด์ที่ติดตาม (ข้ามฟิลด์ที่ถูก defer)"""
+        deferred = self.get_deferred_fields()
+        self._tracked_originals = {
+            name: self._tracked_value(name)
+            for name in self.tracked_fields
+            if self._meta.get_field(name).attname not in deferred
+        }
+
+    def _tracked_value(self, name):
+        value = getattr(self, self._meta.get_field(name).attname)
+        if isinstance(value, FieldFile):
+            return value.name or ""
+        return value
+
+    def load_originals(self, *names, using=None):
+        """
+        อ่านค่าเดิมของฟิลด์ที่ยังไม่มี (instance ไม่ได้โหลดจากฐานข้อมูล หรือฟิลด์ถูก defer)
+        ด้วย query เดียว ใช้ใน pre_save ก่อนแถวถูกเขียนทับ ถ้ายังไม่มีแถวก็ไม่มีค่าเดิม
+        """
+        missing = [name for name in names if not self.is_tracked(name)]
+        if not missing or self.pk is None:
+            return
+        attnames = {name: self._meta.get_field(name).attname for name in missing}
+        row = (
+            self._meta.base_manager.using(using or self._state.db or "default")
+            .filter(pk=self.pk)
+            .values(*attnames.values())
+            .first()
+        )
+        if row is not None:
+            self._tracked_originals = {
+                **getattr(self, "_tracked_originals", {}),
+                **{name: row[attname] for name, attname in attnames.items()},
+            }
+
+    def is_tracked(self, name):
+        """มีค่าเดิมของฟิลด์นี้ให้เปรียบเทียบหรือไม่ (instance ใหม่หรือฟิลด์ที่ถูก defer จะไม่มี)"""
+        return name in getattr(self, "_tracked_originals", {})
+
+    def get_original(self, name, default=None):
+        """ค่าของฟิลด์ตอนโหลดหรือบันทึกครั้งล่าสุด"""
+        return getattr(self, "_tracked_originals", {}).get(name, default)
+
+    def has_changed(self, name):
+        """ฟิลด์ถูกเปลี่ยนจากค่าเดิมหรือไม่ (ถ้าไม่มีค่าเดิมถือว่าไม่เปลี่ยน)"""
+        if not self.is_tracked(name):
+            return False
+        return self.get_original(name) != self._tracked_value(name)
+
+    def replaced_file(self, name):
+        """FieldFile ของไฟล์เดิม ถ้าไฟล์ถูกแทนที่หรือถูกล้าง มิฉะนั้นคืน None"""
+        original = self.get_original(name)
+        if not original or not self.has_changed(name):
+            return None
+        return FieldFile(self, self._meta.get_field(name), original)
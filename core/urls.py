@@ -15,16 +15,31 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+import re
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from app.views import landing_page
 from django.conf import settings
 from django.conf.urls.static import static
+from mediafiles.views import serve_media
+from core.instrumentation import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("users/", include("users.urls")),
     path("", landing_page),
+    path("news/", include("news.urls")),
+    path("pages/", include("pages.urls")),
+    path("search/", include("search.urls")),
     path("ckeditor/", include("ckeditor_uploader.urls")),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-+static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+    path("metrics", metrics_view, name="metrics"),
+]
+urlpatterns += [
+    # ส่งไฟล์แบบ stream รองรับ Range/304 (mediafiles/delivery.py) ใช้ได้ทั้งตอน DEBUG และใช้งานจริง
+    re_path(
+        rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<path>.+)$",
+        serve_media,
+        name="media",
+    ),
+]
+urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
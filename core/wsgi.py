@@ -10,7 +10,11 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 import os
 
 from django.core.wsgi import get_wsgi_application
+from core.rendering import preload_templates
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# คอมไพล์เทมเพลตทั้งหมดไว้ก่อน request แรกของ worker นี้
+preload_templates()
@@ -2,13 +2,27 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from .models import MediaFile
+from django.utils.html import format_html
+from .jobs import latest_job
+from .models import Blob, ImageJob, MediaFile
+
+
+def image_job_status(obj, field_name):
+    """สถานะงานประมวลผลรูปล่าสุดของฟิลด์ สำหรับแสดงในหน้า admin ของโมเดลอื่น"""
+    job = latest_job(obj, field_name) if obj and obj.pk else None
+    if job is None:
+        return "-"
+    if job.status == ImageJob.FAILED:
+        return format_html('<span style="color: #ba2121;">{}</span>', job.get_status_display())
+    return job.get_status_display()
+
 
 @admin.register(MediaFile)
 class MediaFileAdmin(admin.ModelAdmin):
     list_display = ('id','name', 'file', 'uploaded_at')  # ฟิลด์ที่จะแสดงในรายการของแอดมิน
     search_fields = ('name',)  # กำหนดให้สามารถค้นหาได้จากฟิลด์ 'name'
     list_filter = ('uploaded_at',)  # เพิ่มตัวกรองวันที่อัปโหลด
+    readonly_fields = ('image_status',)
 
     # Optional: ปรับการแสดงผลไฟล์ในแอดมินให้แสดงเป็นลิงก์หรือรูปภาพตัวอย่าง (ถ้าเป็นรูป)
     def file_preview(self, obj):
@@ -17,3 +31,48 @@ class MediaFileAdmin(admin.ModelAdmin):
         return f'<a href="{obj.file.url}" download>{obj.file.name}</a>'
     file_preview.allow_tags = True
     file_preview.short_description = 'Preview'
+
+    def image_status(self, obj):
+        return image_job_status(obj, 'file')
+    image_status.short_description = 'สถานะการประมวลผลรูป'
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'model_label', 'object_id', 'file_name', 'status',
+        'attempts', 'created_at', 'finished_at',
+    )
+    list_filter = ('status', 'model_label')
+    search_fields = ('file_name',)
+    date_hierarchy = 'created_at'
+    actions = ['retry_jobs']
+
+    def has_add_permission(self, request):
+        return False  # งานถูกสร้างจากการอัปโหลดเท่านั้น
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='ส่งงานที่เลือกกลับเข้าคิว')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status=ImageJob.RUNNING).update(
+            status=ImageJob.PENDING, attempts=0, error='', finished_at=None
+        )
+        self.message_user(request, f'ส่งกลับเข้าคิวแล้ว {updated} งาน')
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'references', 'created_at')
+    search_fields = ('name',)
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False  # สร้างจากการอัปโหลดเท่านั้น
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False  # ไฟล์ถูกลบเมื่อไม่มีรายการใดอ้างถึงแล้ว
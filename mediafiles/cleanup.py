@@ -0,0 +1,114 @@
+"""
+คิวลบไฟล์สื่อแบบหน่วงเวลา
+
+ไฟล์จะถูกใส่คิวเมื่อ transaction ที่ลบ/เปลี่ยนข้อมูล commit แล้วเท่านั้น
+(``transaction.on_commit``) ถ้า rollback ไฟล์ยังอยู่ครบ จากนั้น worker thread
+เบื้องหลังจะลบไฟล์เป็นชุด ๆ ทำให้ request (เช่น ลบข่าวหลายร้อยรายการจากหน้า admin)
+ไม่ต้องรอ unlink ทีละไฟล์ รูปย่อ (rendition) ของไฟล์ถูกลบไปพร้อมกัน
+
+storage ที่นับการอ้างอิง (``release()`` ของ mediafiles/storage.py) จะถูกปล่อยการอ้างอิง
+ทันทีหลัง commit และลบไฟล์เองเมื่อไม่มีรายการใดใช้แล้ว คิวจึงเหลือเพียงการลบ rendition
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from django.core.files.storage import default_storage
+from django.db import transaction
+from .renditions import discard_renditions
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def delete_file_on_commit(file_field, storage=None, using=None):
+    """
+    ลบไฟล์หลัง transaction ปัจจุบัน commit
+
+    รับได้ทั้ง FieldFile และชื่อไฟล์ (ชื่อไฟล์จะใช้ ``storage`` หรือ default_storage)
+    """
+    if not file_field:
+        return
+    name = getattr(file_field, "name", file_field)
+    storage = storage or getattr(file_field, "storage", default_storage)
+    transaction.on_commit(lambda: release(storage, [name]), using=using)
+
+
+def delete_files_on_commit(names, storage=None, using=None):
+    """ลบไฟล์หลายไฟล์หลัง commit (storage ที่นับการอ้างอิงจะปล่อยทั้งหมดในครั้งเดียว)"""
+    names = [name for name in names if name]
+    if names:
+        storage = storage or default_storage
+        transaction.on_commit(lambda: release(storage, names), using=using)
+
+
+def release(storage, names):
+    """ปล่อยไฟล์ที่ไม่ใช้แล้วทันที (ไม่รอ transaction)"""
+    if not hasattr(storage, "release"):
+        for name in names:
+            enqueue(storage, name)
+        return
+    for name in storage.release(names):
+        enqueue(storage, name, renditions_only=True)
+
+
+def enqueue(storage, name, renditions_only=False):
+    """ใส่ไฟล์ (หรือเฉพาะ rendition ของไฟล์) ลงคิวลบทันที (ไม่รอ transaction)"""
+    _queue.put((storage, name, renditions_only))
+    _ensure_worker()
+
+
+def wait():
+    """รอจนไฟล์ในคิวถูกลบหมด"""
+    _queue.join()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_run_worker, name="media-cleanup", daemon=True
+            )
+            _worker.start()
+
+
+def _run_worker():
+    while True:
+        batch = [_queue.get()]
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        _delete_batch(batch)
+
+
+def _delete_batch(batch):
+    for storage, name, renditions_only in batch:
+        try:
+            if not renditions_only:
+                storage.delete(name)
+            discard_renditions(storage, name)
+        except Exception:  # ไฟล์หนึ่งลบไม่ได้ต้องไม่ทำให้ไฟล์อื่นค้าง
+            logger.exception("ลบไฟล์ %s ไม่สำเร็จ", name)
+        finally:
+            _queue.task_done()
+
+
+@atexit.register
+def _drain():
+    """ลบไฟล์ที่ยังค้างในคิวก่อน process ปิดตัว"""
+    batch = []
+    while True:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    _delete_batch(batch)
@@ -0,0 +1,163 @@
+"""
+ส่งไฟล์ media แบบ stream สำหรับใช้งานจริง (แทน ``django.views.static.serve``)
+
+- อ่านไฟล์ทีละ ``CHUNK_SIZE`` ไม่โหลดทั้งไฟล์เข้าหน่วยความจำ ถ้าส่งทั้งไฟล์ web server
+  ที่รองรับ ``wsgi.file_wrapper`` (เช่น gunicorn) จะใช้ sendfile() ได้เอง
+- รองรับ ``Range: bytes=...`` (206/416) เพื่อให้เล่นวิดีโอแบบเลื่อนได้และดาวน์โหลดต่อได้
+- ตอบ 304 ตาม ``If-None-Match``/``If-Modified-Since``
+- แสดงในหน้าเบราว์เซอร์ (inline) ได้เฉพาะรูป วิดีโอ และเสียง ชนิดอื่น (เช่น HTML, SVG ที่ผู้ใช้
+  อัปโหลดเป็นไฟล์แนบ) ถูกส่งเป็นไฟล์ดาวน์โหลดเสมอพร้อม ``X-Content-Type-Options: nosniff``
+  ไม่ให้กลายเป็นสคริปต์ที่รันบนโดเมนของเว็บ
+- ถ้าตั้ง ``MEDIA_ACCEL_REDIRECT`` จะให้ web server ส่งไฟล์แทน Python::
+
+    MEDIA_ACCEL_REDIRECT = "nginx"  # X-Accel-Redirect (หรือ "apache" = X-Sendfile)
+    MEDIA_ACCEL_PREFIX = "/protected-media/"  # location แบบ internal ที่ชี้ไปยัง MEDIA_ROOT
+"""
+
+import mimetypes
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import (
+    content_disposition_header,
+    http_date,
+    parse_http_date_safe,
+    quote_etag,
+)
+
+CHUNK_SIZE = 64 * 1024
+INLINE_TYPES = ("image/", "video/", "audio/")
+ACTIVE_TYPES = {"image/svg+xml"}  # รูปที่มีสคริปต์ได้
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FileRange:
+    """
+    อ่านไฟล์เฉพาะช่วง ``[start, start + length)``
+
+    ไม่มี ``fileno()`` เพื่อไม่ให้ web server ส่งต่อด้วย sendfile() จนจบไฟล์
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    ช่วง ``(start, end)`` (รวม end) จาก header ``Range`` ที่มีช่วงเดียว
+
+    คืน None ถ้าไม่มีหรือไม่รองรับ (เช่น หลายช่วง) ซึ่งจะส่งทั้งไฟล์แทน
+    และ raise ValueError ถ้าช่วงอยู่นอกไฟล์ (416)
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1  # n ไบต์สุดท้าย
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def is_resumed(request):
+    """request ต่อจากการดาวน์โหลดครั้งก่อน (Range ที่ไม่ได้เริ่มจากไบต์แรก) ใช้ตอนนับยอดดาวน์โหลด"""
+    header = request.headers.get("Range", "")
+    return bool(header) and not header.replace(" ", "").startswith("bytes=0-")
+
+
+def _if_range_matches(request, etag, last_modified):
+    value = request.headers.get("If-Range")
+    if not value:
+        return True
+    if value.startswith(('"', "W/")):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def is_inline_safe(content_type):
+    """ชนิดไฟล์ที่แสดงในหน้าเบราว์เซอร์ได้โดยไม่รันสคริปต์"""
+    return content_type.startswith(INLINE_TYPES) and content_type not in ACTIVE_TYPES
+
+
+def serve(request, storage, name, as_attachment=False, filename=None):
+    """ส่งไฟล์ ``name`` จาก ``storage`` (ดูคำอธิบายของโมดูล)"""
+    try:
+        handle = storage.open(name, "rb")
+    except (FileNotFoundError, IsADirectoryError, PermissionError):
+        raise Http404("ไม่พบไฟล์")
+    size = handle.size
+    last_modified = int(storage.get_modified_time(name).timestamp())
+    etag = quote_etag(f"{last_modified:x}-{size:x}")
+    filename = filename or name.rsplit("/", 1)[-1]
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    as_attachment = as_attachment or not is_inline_safe(content_type)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    accel = getattr(settings, "MEDIA_ACCEL_REDIRECT", None)
+    if response is not None:
+        handle.close()
+    elif accel:
+        handle.close()
+        response = HttpResponse(content_type=content_type)
+        if accel == "nginx":
+            prefix = getattr(settings, "MEDIA_ACCEL_PREFIX", "/protected-media/")
+            response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + quote(name)
+        else:
+            response["X-Sendfile"] = storage.path(name)
+        # web server จัดการ Range และ Content-Length ของไฟล์เอง
+    else:
+        response = _file_response(request, handle, size, etag, last_modified, content_type)
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    response["X-Content-Type-Options"] = "nosniff"
+    if response.status_code in (200, 206):
+        response["Content-Type"] = content_type
+        response["Content-Disposition"] = content_disposition_header(as_attachment, filename)
+    return response
+
+
+def _file_response(request, handle, size, etag, last_modified, content_type):
+    byte_range = None
+    if request.method == "GET" and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except ValueError:
+            handle.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        response = FileResponse(handle, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            FileRange(handle, start, end - start + 1), status=206, content_type=content_type
+        )
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response.block_size = CHUNK_SIZE
+    return response
@@ -0,0 +1,247 @@
+"""
+คิวงานประมวลผลรูปภาพนอก request
+
+เมื่อมีการอัปโหลดรูป โมเดลจะเรียก ``queue_image_job()`` ซึ่งเพิ่มแถว ``ImageJob``
+ใน transaction เดียวกับการบันทึก (rollback แล้วงานหายไปด้วย) จากนั้นคำสั่ง
+``manage.py process_image_jobs`` จะดึงงานไปย่อรูปที่ใหญ่เกิน ``max_width`` และสร้าง
+rendition ทุกขนาด โดยงานที่ใช้ CPU (Pillow) ถูกส่งเข้า process/thread pool ส่วนการอ่าน
+เขียนไฟล์และฐานข้อมูลทำใน process หลัก
+
+ถ้าไฟล์ของรายการถูกเปลี่ยนหรือลบก่อนงานจะได้ทำ งานนั้นจะถูกข้าม (skipped)
+
+worker แก้ฟิลด์ด้วย ``QuerySet.update()`` ซึ่งไม่ส่ง post_save จึงส่ง ``image_processed``
+(sender=โมเดล, ``object_id``, ``field_name``) เมื่อชี้ฟิลด์ไปยังรูปที่ย่อแล้ว และเมื่อสร้าง rendition เสร็จ
+ให้แอปที่ cache HTML ของรายการนั้นล้าง cache เอง (เช่น ``touch_page`` ใน pages/models.py)
+"""
+
+import io
+import logging
+import os
+import traceback
+from datetime import timedelta
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image
+from core.caching import purge_fragments_for
+from .cleanup import delete_file_on_commit
+from .models import ImageJob
+from .renditions import RENDITIONS, is_image_name, render_rendition, store_rendition
+from .storage import is_blob
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+OPTIMIZE_QUALITY = 85
+STALE_AFTER = timedelta(minutes=10)  # งาน running ที่ค้างนานกว่านี้ถือว่า worker ตายไปแล้ว
+
+image_processed = Signal()
+
+
+def queue_image_job(instance, field_name, max_width=None):
+    """เพิ่มงานประมวลผลรูปของฟิลด์ ``field_name`` (ไม่ใช่รูปจะไม่สร้างงาน)"""
+    file_field = getattr(instance, field_name)
+    if not file_field or not is_image_name(file_field.name):
+        return None
+    return ImageJob.objects.create(
+        model_label=instance._meta.label,
+        object_id=instance.pk,
+        field_name=field_name,
+        file_name=file_field.name,
+        max_width=max_width,
+    )
+
+
+def latest_job(instance, field_name):
+    """งานล่าสุดของฟิลด์นี้ (ใช้แสดงสถานะในหน้า admin)"""
+    return (
+        ImageJob.objects.filter(
+            model_label=instance._meta.label,
+            object_id=instance.pk,
+            field_name=field_name,
+        )
+        .order_by("-created_at", "-pk")
+        .first()
+    )
+
+
+def claim_jobs(limit):
+    """
+    จองงานที่รออยู่ไม่เกิน ``limit`` งาน และเปลี่ยนสถานะเป็น running
+
+    ใช้ ``SELECT ... FOR UPDATE SKIP LOCKED`` จึงรัน worker หลายตัวพร้อมกันได้
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            ImageJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ImageJob.PENDING)
+            .order_by("created_at", "pk")[:limit]
+        )
+        if jobs:
+            ImageJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=ImageJob.RUNNING, started_at=now, attempts=F("attempts") + 1
+            )
+    for job in jobs:
+        job.status = ImageJob.RUNNING
+        job.started_at = now
+        job.attempts += 1
+    return jobs
+
+
+def reset_stale_jobs():
+    """คืนงาน running ที่ค้างอยู่ (worker ถูกปิดกลางคัน) กลับเข้าคิว"""
+    return ImageJob.objects.filter(
+        status=ImageJob.RUNNING, started_at__lt=timezone.now() - STALE_AFTER
+    ).update(status=ImageJob.PENDING)
+
+
+def process_image(data, max_width=None):
+    """
+    ย่อรูปจาก bytes และสร้าง rendition ทุกขนาด (ทำงานใน worker pool)
+
+    คืนค่า ``(optimized, renditions)`` โดย optimized เป็น None ถ้าไม่ต้องย่อรูปต้นฉบับ
+    """
+    optimized = None
+    with Image.open(io.BytesIO(data)) as img:
+        if max_width and img.width > max_width:
+            new_height = int((max_width / img.width) * img.height)
+            resized = img.resize((max_width, new_height), Image.LANCZOS)
+            output = io.BytesIO()
+            # ลดคุณภาพเพื่อประหยัดพื้นที่ (คงรูปแบบไฟล์เดิม)
+            resized.save(output, img.format, quality=OPTIMIZE_QUALITY, optimize=True)
+            optimized = output.getvalue()
+    source = optimized or data
+    renditions = {size: render_rendition(io.BytesIO(source), size) for size in RENDITIONS}
+    return optimized, renditions
+
+
+def run_jobs(jobs, executor=None):
+    """
+    ประมวลผลงานที่จองไว้แล้ว ถ้าไม่ระบุ ``executor`` จะทำใน thread ปัจจุบัน
+    """
+    submitted = []
+    for job in jobs:
+        try:
+            data = _read_source(job)
+        except Exception:
+            _fail(job)
+            continue
+        if data is None:
+            _finish(job, ImageJob.SKIPPED)
+        elif executor is None:
+            _complete(job, lambda: process_image(data, job.max_width))
+        else:
+            submitted.append((job, executor.submit(process_image, data, job.max_width)))
+    for job, future in submitted:
+        _complete(job, future.result)
+    return len(jobs)
+
+
+def run_pending(limit=100, executor=None):
+    """จองและประมวลผลงานที่รออยู่หนึ่งรอบ คืนค่าจำนวนงานที่ทำ"""
+    return run_jobs(claim_jobs(limit), executor)
+
+
+def _current_file_name(job):
+    model = apps.get_model(job.model_label)
+    return (
+        model._default_manager.filter(pk=job.object_id)
+        .values_list(job.field_name, flat=True)
+        .first()
+    )
+
+
+def _storage(job):
+    model = apps.get_model(job.model_label)
+    return model._meta.get_field(job.field_name).storage
+
+
+def _read_source(job):
+    """อ่านไฟล์ต้นฉบับ คืน None ถ้ารายการถูกลบหรือเปลี่ยนไฟล์ไปแล้ว"""
+    if _current_file_name(job) != job.file_name:
+        return None
+    with _storage(job).open(job.file_name, "rb") as source:
+        return source.read()
+
+
+def _complete(job, get_result):
+    try:
+        optimized, renditions = get_result()
+        # ไฟล์อาจถูกเปลี่ยนระหว่างประมวลผล ห้ามเขียนทับไฟล์ที่กำลังจะถูกลบ
+        if _current_file_name(job) != job.file_name:
+            _finish(job, ImageJob.SKIPPED)
+            return
+        storage = _storage(job)
+        name = job.file_name
+        if optimized is not None:
+            name = _replace_source(job, storage, optimized)
+            if name is None:
+                _finish(job, ImageJob.SKIPPED)
+                return
+        for size, data in renditions.items():
+            store_rendition(storage, name, size, data, overwrite=True)
+        _send_processed(job)
+    except Image.DecompressionBombError:
+        _fail(job, retry=False)  # รูปใหญ่เกิน Image.MAX_IMAGE_PIXELS ลองใหม่ก็ไม่ผ่าน
+    except Exception:
+        _fail(job)
+    else:
+        _finish(job, ImageJob.DONE)
+
+
+def _replace_source(job, storage, data):
+    """
+    บันทึกรูปที่ย่อแล้วเป็นไฟล์ใหม่ และชี้ฟิลด์ของรายการไปยังไฟล์นั้น (ไม่เขียนทับไฟล์เดิม
+    ซึ่งอาจถูกรายการอื่นใช้ร่วมอยู่ใน storage แบบ content-addressed) คืน None ถ้ารายการถูกเปลี่ยนไปแล้ว
+    """
+    model = apps.get_model(job.model_label)
+    if is_blob(job.file_name):
+        # ชื่อใต้ blobs/ ถูกเก็บตามชื่อเดิม (passthrough) ใช้ชื่อกลางเพื่อให้ storage ทำ hash
+        # เป็น blob ที่นับการอ้างอิง รูปเดียวกันที่ย่อแล้วจึงใช้ไฟล์ร่วมกันได้
+        target = f"resized{os.path.splitext(job.file_name)[1]}"
+    else:
+        target = job.file_name
+    name = storage.save(target, ContentFile(data))
+    with transaction.atomic():
+        updated = model._default_manager.filter(
+            pk=job.object_id, **{job.field_name: job.file_name}
+        ).update(**{job.field_name: name})
+        if updated:
+            purge_fragments_for(model)  # update() ไม่ผ่าน signal ที่ล้าง cache ของหน้าเว็บ
+            # HTML ที่ cache ไว้ยังชี้ไปยังไฟล์เดิมซึ่งจะถูกลบหลัง commit
+            _send_processed(job)
+        delete_file_on_commit(job.file_name if updated else name, storage=storage)
+    return name if updated else None
+
+
+def _send_processed(job):
+    image_processed.send(
+        sender=apps.get_model(job.model_label),
+        object_id=job.object_id,
+        field_name=job.field_name,
+    )
+
+
+def _finish(job, status, error=""):
+    job.status = status
+    job.error = error
+    job.finished_at = timezone.now()
+    ImageJob.objects.filter(pk=job.pk).update(
+        status=status, error=error, finished_at=job.finished_at
+    )
+
+
+def _fail(job, retry=True):
+    """บันทึกข้อผิดพลาด ถ้ายังลองไม่ครบ MAX_ATTEMPTS ให้กลับเข้าคิว"""
+    error = traceback.format_exc()
+    logger.warning("ประมวลผลรูป %s ไม่สำเร็จ (ครั้งที่ %s)", job.file_name, job.attempts)
+    if retry and job.attempts < MAX_ATTEMPTS:
+        job.status = ImageJob.PENDING
+        job.error = error
+        ImageJob.objects.filter(pk=job.pk).update(status=job.status, error=error)
+    else:
+        _finish(job, ImageJob.FAILED, error)
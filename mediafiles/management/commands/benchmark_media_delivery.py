@@ -0,0 +1,109 @@
+import http.client
+import os
+import resource
+import threading
+import time
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from mediafiles.delivery import CHUNK_SIZE
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "ส่งไฟล์ media ขนาดใหญ่ (sparse file) ให้ client หลายรายพร้อมกันผ่าน /media/ "
+        "แล้ววัดอัตราการส่งและหน่วยความจำสูงสุดของ process ไฟล์ทดสอบถูกลบเมื่อจบ"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=1024, help="ขนาดไฟล์ (MB)")
+        parser.add_argument("--clients", type=int, default=50)
+        parser.add_argument(
+            "--range", type=int, default=0, metavar="MB",
+            help="ให้แต่ละ client ขอเฉพาะช่วงขนาดนี้ (0 = ทั้งไฟล์)",
+        )
+
+    def handle(self, *args, **options):
+        size = options["size"] * 1024 * 1024
+        # เขียนตรงลงดิสก์ ไม่ผ่าน storage.save() ซึ่งจะเก็บไฟล์ตามเนื้อหา (ไฟล์ว่าง)
+        name = "benchmark/media-delivery.bin"
+        path = default_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as handle:
+            handle.truncate(size)  # sparse file ไม่กินพื้นที่ดิสก์จริง
+
+        server = make_server(
+            "127.0.0.1", 0, get_wsgi_application(),
+            server_class=ThreadingWSGIServer, handler_class=QuietHandler,
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = settings.MEDIA_URL.rstrip("/") + "/" + name
+        rss_before = _peak_rss_mb()
+        try:
+            results = [None] * options["clients"]
+            threads = [
+                threading.Thread(
+                    target=self.download,
+                    args=(server.server_port, url, size, options["range"], results, i),
+                )
+                for i in range(options["clients"])
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            server.shutdown()
+            os.remove(path)
+
+        failed = [result for result in results if isinstance(result, str)]
+        received = sum(result for result in results if isinstance(result, int))
+        self.stdout.write(
+            f"{options['clients']} clients  {received / 1024 / 1024:10.0f} MB  {elapsed:8.2f}s  "
+            f"{received / 1024 / 1024 / elapsed:8.1f} MB/s  "
+            f"peak RSS {rss_before:.0f} -> {_peak_rss_mb():.0f} MB"
+        )
+        for error in failed:
+            self.stderr.write(error)
+
+    def download(self, port, url, size, range_mb, results, index):
+        headers = {}
+        expected_status, expected = 200, size
+        if range_mb:
+            length = min(range_mb * 1024 * 1024, size)
+            start = (index * length) % (size - length + 1)
+            headers["Range"] = f"bytes={start}-{start + length - 1}"
+            expected_status, expected = 206, length
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+        try:
+            connection.request("GET", url, headers=headers)
+            response = connection.getresponse()
+            received = 0
+            while chunk := response.read(CHUNK_SIZE):
+                received += len(chunk)
+            if response.status != expected_status or received != expected:
+                results[index] = f"client {index}: HTTP {response.status}, {received} ไบต์"
+            else:
+                results[index] = received
+        except OSError as exc:
+            results[index] = f"client {index}: {exc}"
+        finally:
+            connection.close()
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux รายงานเป็น KB
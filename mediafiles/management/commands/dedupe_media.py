@@ -0,0 +1,49 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from core.counters import adjust
+from mediafiles.cleanup import delete_file_on_commit
+from mediafiles.models import Blob
+from mediafiles.storage import ContentAddressedStorage, is_blob
+
+
+class Command(BaseCommand):
+    help = (
+        "ย้ายไฟล์เดิม (ชื่อแบบ uuid) ของทุก FileField ไปเก็บตามเนื้อหาใน ContentAddressedStorage "
+        "ไฟล์ที่เนื้อหาซ้ำกันจะเหลือชุดเดียว"
+    )
+
+    def handle(self, *args, **options):
+        moved = 0
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if isinstance(field, models.FileField) and isinstance(
+                    field.storage, ContentAddressedStorage
+                ):
+                    moved += self.dedupe_field(model, field)
+        self.stdout.write(f"ย้ายแล้ว {moved} รายการ")
+
+    def dedupe_field(self, model, field):
+        storage = field.storage
+        names = (
+            model._base_manager.exclude(**{field.attname: ""})
+            .values_list(field.attname, flat=True)
+            .distinct()
+            .order_by(field.attname)
+        )
+        moved = 0
+        for name in list(names):
+            if is_blob(name) or storage.is_passthrough(name) or not storage.exists(name):
+                continue
+            with storage.open(name, "rb") as source:
+                blob = storage.save(name, source)
+            with transaction.atomic():
+                updated = model._base_manager.filter(**{field.attname: name}).update(
+                    **{field.attname: blob}
+                )
+                # save() นับไว้หนึ่งการอ้างอิง ที่เหลือคือรายการอื่นที่ใช้ไฟล์เดิมร่วมกัน
+                adjust(Blob, "references", {blob: updated - 1})
+                # ไฟล์เดิม (และ rendition ของมัน) ถูกลบหลัง commit ถ้ารายการถูกแก้ไปก่อนก็ทิ้ง blob
+                delete_file_on_commit(name if updated else blob, storage=storage)
+            moved += updated
+        return moved
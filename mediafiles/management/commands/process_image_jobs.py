@@ -0,0 +1,64 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from mediafiles.jobs import claim_jobs, reset_stale_jobs, run_jobs
+
+
+class Command(BaseCommand):
+    help = "ประมวลผลรูปที่อัปโหลด (ย่อขนาดและสร้าง rendition) จากคิวงานในฐานข้อมูล"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="จำนวน worker ที่ประมวลผลรูปพร้อมกัน (ค่าเริ่มต้น: จำนวน CPU)",
+        )
+        parser.add_argument(
+            "--threads",
+            action="store_true",
+            help="ใช้ thread pool แทน process pool",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="จำนวนงานที่จองต่อรอบ (ค่าเริ่มต้น: workers x 4)",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="เวลารอ (วินาที) เมื่อไม่มีงานในคิว",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="ทำงานที่ค้างอยู่จนหมดแล้วจบ (ไม่รอคิวใหม่)",
+        )
+
+    def handle(self, *args, **options):
+        workers = max(options["workers"], 1)
+        batch_size = options["batch_size"] or workers * 4
+        pool_class = ThreadPoolExecutor if options["threads"] else ProcessPoolExecutor
+
+        reset = reset_stale_jobs()
+        if reset:
+            self.stdout.write(f"คืนงานที่ค้างกลับเข้าคิว {reset} งาน")
+
+        processed = 0
+        with pool_class(max_workers=workers) as executor:
+            try:
+                while True:
+                    close_old_connections()
+                    jobs = claim_jobs(batch_size)
+                    if not jobs:
+                        if options["once"]:
+                            break
+                        time.sleep(options["sleep"])
+                        continue
+                    processed += run_jobs(jobs, executor)
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(self.style.SUCCESS(f"ประมวลผลรูปแล้ว {processed} งาน"))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediafiles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100, verbose_name='โมเดล')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID รายการ')),
+                ('field_name', models.CharField(max_length=100, verbose_name='ฟิลด์')),
+                ('file_name', models.CharField(max_length=500, verbose_name='ไฟล์')),
+                ('max_width', models.PositiveIntegerField(blank=True, null=True, verbose_name='ความกว้างสูงสุด')),
+                ('status', models.CharField(choices=[('pending', 'รอดำเนินการ'), ('running', 'กำลังทำงาน'), ('done', 'เสร็จแล้ว'), ('failed', 'ล้มเหลว'), ('skipped', 'ข้าม (ไฟล์ถูกเปลี่ยนหรือลบแล้ว)')], default='pending', max_length=10, verbose_name='สถานะ')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='จำนวนครั้งที่ลอง')),
+                ('error', models.TextField(blank=True, verbose_name='ข้อผิดพลาด')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='วันที่สร้าง')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='เริ่มทำงาน')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='เสร็จเมื่อ')),
+            ],
+            options={
+                'verbose_name': 'งานประมวลผลรูป',
+                'verbose_name_plural': 'งานประมวลผลรูป',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='mediafiles__status_fd0b66_idx'), models.Index(fields=['model_label', 'object_id'], name='mediafiles__model_l_217128_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediafiles', '0002_imagejob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mediafile',
+            index=models.Index(fields=['name'], name='mediafiles__name_580645_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediafiles', '0003_mediafile_name_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='ไฟล์')),
+                ('size', models.PositiveBigIntegerField(verbose_name='ขนาด (ไบต์)')),
+                ('references', models.PositiveIntegerField(default=1, verbose_name='จำนวนการอ้างอิง')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='วันที่สร้าง')),
+            ],
+            options={
+                'verbose_name': 'ไฟล์ที่เก็บ',
+                'verbose_name_plural': 'ไฟล์ที่เก็บ',
+            },
+        ),
+    ]
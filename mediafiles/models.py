@@ -1,29 +1,104 @@
 from django.db import models
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
-from django.core.files.storage import default_storage
+from core.tracking import FieldTrackingMixin
+from .cleanup import delete_file_on_commit
 
 # Create your models here.
-class MediaFile(models.Model):
+class MediaFile(FieldTrackingMixin, models.Model):
     name = models.CharField(max_length=255)
     file = models.FileField(upload_to='mediafiles/')  # หรือใช้ ImageField หากเป็นไฟล์รูปภาพ
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    tracked_fields = ("file",)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["name"]),  # โลโก้บนหน้าแรกค้นจากชื่อ
+        ]
+
     def __str__(self):
         return self.name
     
     def save(self, *args, **kwargs):       
          
-        # ตรวจสอบว่ามีการเปลี่ยนรูปภาพใหม่หรือไม่
-        if self.pk:  # ถ้าโมเดลมีอยู่แล้ว (ไม่ใช่โมเดลใหม่)
-            old_file = MediaFile.objects.get(pk=self.pk)  # ดึงโมเดลเดิม
-            if old_file.file != self.file:  # ถ้ารูปภาพเปลี่ยน
-                if old_file.file:  # ถ้ามีรูปภาพเดิม
-                    default_storage.delete(old_file.file.name)  # ลบรูปภาพเดิม
+        # ตรวจสอบว่ามีการเปลี่ยนรูปภาพใหม่หรือไม่ (เทียบกับชื่อไฟล์ที่จำไว้ตอนโหลด)
+        # ถ้ารูปภาพเปลี่ยนและมีรูปภาพเดิม ลบรูปภาพเดิมหลัง commit
+        delete_file_on_commit(self.replaced_file("file"))
+        file_changed = self._state.adding or self.has_changed("file")
         super().save(*args, **kwargs)  # บันทึกโมเดล
+
+        # สร้าง rendition ของรูปนอก request (ไฟล์ที่ไม่ใช่รูปจะไม่มีงาน)
+        if self.file and file_changed:
+            from .jobs import queue_image_job
+
+            queue_image_job(self, "file")
     
 # สัญญาณสำหรับลบไฟล์เมื่อข้อมูลถูกลบ
 @receiver(post_delete, sender=MediaFile)
 def delete_file_on_record_delete(sender, instance, **kwargs):
-    if instance.file:
-        instance.file.delete(save=False)  # ลบไฟล์จริงในระบบไฟล์
\ No newline at end of file
+    delete_file_on_commit(instance.file)  # ลบไฟล์จริงในระบบไฟล์ (หลัง commit)
+
+class Blob(models.Model):
+    """
+    ไฟล์หนึ่งชุดใน ContentAddressedStorage (mediafiles/storage.py)
+    และจำนวนฟิลด์ไฟล์ที่อ้างถึง
+    """
+
+    name = models.CharField(max_length=100, primary_key=True, verbose_name="ไฟล์")
+    size = models.PositiveBigIntegerField(verbose_name="ขนาด (ไบต์)")
+    references = models.PositiveIntegerField(default=1, verbose_name="จำนวนการอ้างอิง")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="วันที่สร้าง")
+
+    class Meta:
+        verbose_name = "ไฟล์ที่เก็บ"
+        verbose_name_plural = "ไฟล์ที่เก็บ"
+
+    def __str__(self):
+        return self.name
+
+
+class ImageJob(models.Model):
+    """
+    งานประมวลผลรูปที่อัปโหลด (ย่อขนาด + สร้าง rendition) ซึ่งทำนอก request
+    โดยคำสั่ง ``manage.py process_image_jobs``
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+    STATUS_CHOICES = [
+        (PENDING, "รอดำเนินการ"),
+        (RUNNING, "กำลังทำงาน"),
+        (DONE, "เสร็จแล้ว"),
+        (FAILED, "ล้มเหลว"),
+        (SKIPPED, "ข้าม (ไฟล์ถูกเปลี่ยนหรือลบแล้ว)"),
+    ]
+
+    model_label = models.CharField(max_length=100, verbose_name="โมเดล")  # เช่น "app.Slide"
+    object_id = models.PositiveBigIntegerField(verbose_name="ID รายการ")
+    field_name = models.CharField(max_length=100, verbose_name="ฟิลด์")
+    file_name = models.CharField(max_length=500, verbose_name="ไฟล์")
+    max_width = models.PositiveIntegerField(null=True, blank=True, verbose_name="ความกว้างสูงสุด")
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name="สถานะ"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="จำนวนครั้งที่ลอง")
+    error = models.TextField(blank=True, verbose_name="ข้อผิดพลาด")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="วันที่สร้าง")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="เริ่มทำงาน")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="เสร็จเมื่อ")
+
+    class Meta:
+        verbose_name = "งานประมวลผลรูป"
+        verbose_name_plural = "งานประมวลผลรูป"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["model_label", "object_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.model_label}#{self.object_id} {self.file_name} ({self.status})"
@@ -0,0 +1,155 @@
+"""
+รูปย่อ (rendition) ขนาดมาตรฐานของรูปภาพที่อัปโหลด
+
+แต่ละขนาดถูกเก็บเป็น WebP ข้างไฟล์ต้นฉบับด้วยชื่อที่คาดเดาได้ เช่น
+``app/slides/<uuid>.jpg`` -> ``app/slides/<uuid>.hero.webp`` ซึ่งงานย่อรูป (mediafiles/jobs.py)
+สร้างไว้นอก request ระหว่างที่ยังไม่มีไฟล์ เทมเพลตจะได้ URL ของไฟล์ต้นฉบับแทน (ไม่ย่อรูประหว่าง
+render) การตรวจว่ามีไฟล์แล้วหรือยังถูกจำไว้ใน cache จึงไม่ต้องเรียก storage.exists() ทุกครั้งที่ render
+
+ใช้งานในเทมเพลต::
+
+    {% load renditions %}
+    <img src="{{ slide.image|rendition:'hero' }}">
+    <img src="{{ slide.renditions.thumb }}">
+"""
+
+import io
+import os
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# ชื่อขนาด -> (กว้าง, สูง, ครอปให้พอดีกรอบหรือไม่)
+RENDITIONS = {
+    "thumb": (200, 200, True),
+    "card": (640, 480, False),
+    "hero": (1920, 1080, False),
+}
+RENDITION_FORMAT = "WEBP"
+RENDITION_EXTENSION = "webp"
+RENDITION_QUALITY = 80
+RENDITION_CACHE_TIMEOUT = 60 * 60 * 24  # วินาที (cache แบบไฟล์มีจำนวนรายการจำกัด ห้ามเก็บตลอดไป)
+MISSING = "missing"
+MISSING_RECHECK_AFTER = 60 * 5  # วินาที
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tif", ".tiff"}
+
+
+def is_image_name(name):
+    return os.path.splitext(name or "")[1].lower() in IMAGE_EXTENSIONS
+
+
+def rendition_name(name, size):
+    """ชื่อไฟล์ของ rendition ข้างไฟล์ต้นฉบับ"""
+    stem = os.path.splitext(name)[0]
+    return f"{stem}.{size}.{RENDITION_EXTENSION}"
+
+
+def rendition_names(name):
+    """ชื่อไฟล์ rendition ทุกขนาดของไฟล์ต้นฉบับ (ใช้ตอนลบไฟล์)"""
+    if not is_image_name(name):
+        return []
+    return [rendition_name(name, size) for size in RENDITIONS]
+
+
+def _cache_key(name, size):
+    return f"mediafiles:rendition:{size}:{name}"
+
+
+def render_rendition(source, size):
+    """ย่อรูปจาก file object ``source`` คืนค่าเป็น bytes ของ WebP"""
+    width, height, crop = RENDITIONS[size]
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        if crop:
+            img = ImageOps.fit(img, (width, height), Image.LANCZOS)
+        else:
+            img.thumbnail((width, height), Image.LANCZOS)
+        output = io.BytesIO()
+        img.save(output, RENDITION_FORMAT, quality=RENDITION_QUALITY, method=4)
+    return output.getvalue()
+
+
+def generate_rendition(storage, name, size, overwrite=False):
+    """สร้าง rendition หนึ่งขนาด (ถ้ายังไม่มี) คืนค่าชื่อไฟล์ของ rendition"""
+    target = rendition_name(name, size)
+    if overwrite:
+        storage.delete(target)
+    elif storage.exists(target):
+        cache.set(_cache_key(name, size), True, RENDITION_CACHE_TIMEOUT)
+        return target
+
+    with storage.open(name, "rb") as source:
+        data = render_rendition(source, size)
+    return store_rendition(storage, name, size, data)
+
+
+def store_rendition(storage, name, size, data, overwrite=False):
+    """บันทึก bytes ของ rendition ที่ย่อไว้แล้วลง storage คืนค่าชื่อไฟล์ของ rendition"""
+    target = rendition_name(name, size)
+    if overwrite:
+        storage.delete(target)
+    saved = storage.save(target, ContentFile(data))
+    if saved != target:
+        # อีก process สร้างไฟล์เดียวกันไปก่อนแล้ว ใช้ของเดิมและทิ้งสำเนานี้
+        storage.delete(saved)
+    cache.set(_cache_key(name, size), True, RENDITION_CACHE_TIMEOUT)
+    return target
+
+
+def generate_renditions(file_field, sizes=None, overwrite=False):
+    """สร้าง rendition ทุกขนาด (หรือเฉพาะ ``sizes``) ของ FieldFile"""
+    if not file_field or not is_image_name(file_field.name):
+        return []
+    return [
+        generate_rendition(file_field.storage, file_field.name, size, overwrite)
+        for size in (sizes or RENDITIONS)
+    ]
+
+
+def discard_renditions(storage, name):
+    """ลบ rendition ทุกขนาดของไฟล์ต้นฉบับ"""
+    for size in RENDITIONS if is_image_name(name) else ():
+        storage.delete(rendition_name(name, size))
+        cache.delete(_cache_key(name, size))
+
+
+def rendition_url(file_field, size):
+    """
+    URL ของ rendition ขนาด ``size``
+
+    ถ้ายังไม่มีไฟล์ (ไม่ใช่รูป, งานย่อรูปยังไม่เสร็จหรือล้มเหลว) จะคืน URL ของไฟล์ต้นฉบับแทน
+    และตรวจใหม่ทุก ``MISSING_RECHECK_AFTER`` วินาที
+    """
+    if not file_field:
+        return ""
+    if size not in RENDITIONS:
+        raise ValueError(f"ไม่รู้จักขนาด rendition: {size}")
+    name = file_field.name
+    storage = file_field.storage
+    if not is_image_name(name):
+        return file_field.url
+    key = _cache_key(name, size)
+    state = cache.get(key)
+    if state is None:
+        state = storage.exists(rendition_name(name, size)) or MISSING
+        cache.set(key, state, RENDITION_CACHE_TIMEOUT if state is True else MISSING_RECHECK_AFTER)
+    if state is not True:
+        return file_field.url
+    return storage.url(rendition_name(name, size))
+
+
+class Renditions:
+    """เข้าถึง URL ของ rendition แบบ attribute เช่น ``slide.renditions.hero``"""
+
+    def __init__(self, file_field):
+        self.file_field = file_field
+
+    def __getattr__(self, size):
+        if size not in RENDITIONS:
+            raise AttributeError(size)
+        return rendition_url(self.file_field, size)
+
+    def __getitem__(self, size):
+        return rendition_url(self.file_field, size)
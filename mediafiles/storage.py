@@ -0,0 +1,139 @@
+"""
+storage ที่เก็บไฟล์ตามเนื้อหา (content-addressed) ไฟล์เนื้อหาเดียวกันเก็บครั้งเดียว
+
+ตอนอัปโหลด ไฟล์ถูกคำนวณ SHA-256 ระหว่างเขียนลงไฟล์ชั่วคราว แล้วย้ายไปไว้ที่
+``blobs/ab/cd/<sha256>.<ext>`` ชื่อนี้คือค่าที่ถูกบันทึกใน FileField (ชื่อจาก upload_to ใช้เพียงนามสกุล)
+ถ้ามีไฟล์นั้นอยู่แล้วจะเพิ่มแค่จำนวนการอ้างอิงในตาราง ``Blob``
+
+การลบไฟล์ (``delete()`` หรือ ``release()``) ลดจำนวนการอ้างอิง และลบไฟล์จริงเมื่อไม่มีรายการใดใช้แล้ว
+ชื่อที่อยู่ใต้ ``blobs/`` อยู่แล้ว (เช่น rendition) และชื่อที่ขึ้นต้นด้วย ``passthrough``
+ถูกเก็บตามชื่อเดิมแบบ FileSystemStorage::
+
+    STORAGES = {
+        "default": {
+            "BACKEND": "mediafiles.storage.ContentAddressedStorage",
+            "OPTIONS": {"passthrough": ["uploads/"]},
+        },
+        ...
+    }
+"""
+
+import collections
+import hashlib
+import os
+import re
+import tempfile
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.utils import timezone
+from core.counters import adjust
+from .models import Blob
+
+BLOB_DIR = "blobs"
+
+_BLOB_RE = re.compile(rf"^{BLOB_DIR}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(\.[a-z0-9]{{1,10}})?$")
+_EXTENSION_RE = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+def blob_name(digest, extension=""):
+    return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def is_blob(name):
+    return bool(_BLOB_RE.match(name or ""))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, *args, passthrough=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.passthrough = (f"{BLOB_DIR}/", *passthrough)
+
+    def is_passthrough(self, name):
+        return name.replace("\\", "/").startswith(self.passthrough)
+
+    def get_available_name(self, name, max_length=None):
+        if self.is_passthrough(name):
+            return super().get_available_name(name, max_length)
+        return name  # ชื่อจริงได้จากเนื้อหาใน _save()
+
+    def _save(self, name, content):
+        if self.is_passthrough(name):
+            return super()._save(name, content)
+
+        extension = os.path.splitext(name)[1].lower()
+        temp_path, digest, size = self._spool(content)
+        name = blob_name(digest, extension if _EXTENSION_RE.match(extension) else "")
+        try:
+            self._add_reference(name, size)
+            # การอ้างอิงนี้ถูกนับแล้ว release() จะไม่ลบไฟล์ระหว่างนี้
+            path = self.path(name)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(path, self.file_permissions_mode)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+    def _spool(self, content):
+        """เขียนเนื้อหาลงไฟล์ชั่วคราว (ใน filesystem เดียวกัน) พร้อมคำนวณ SHA-256"""
+        directory = self.path(f"{BLOB_DIR}/tmp")
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as temp:
+            for chunk in content.chunks():
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                digest.update(chunk)
+                temp.write(chunk)
+                size += len(chunk)
+        return temp.name, digest.hexdigest(), size
+
+    def _add_reference(self, name, size):
+        """เพิ่มแถวของ blob หรือเพิ่มจำนวนการอ้างอิงถ้ามีอยู่แล้ว ด้วย upsert query เดียว"""
+        quote = connection.ops.quote_name
+        table = quote(Blob._meta.db_table)
+        references = quote("references")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({quote('name')}, {quote('size')}, {references}, "
+                f"{quote('created_at')}) VALUES (%s, %s, 1, %s) "
+                f"ON CONFLICT ({quote('name')}) "
+                f"DO UPDATE SET {references} = {table}.{references} + 1",
+                [name, size, timezone.now()],
+            )
+
+    def release(self, names):
+        """
+        ปล่อยการอ้างอิงของไฟล์ใน ``names`` (ชื่อซ้ำ = หลายการอ้างอิง) ด้วย query ชุดเดียว
+        ลบไฟล์ที่ไม่มีรายการใดใช้แล้ว และคืนชื่อของไฟล์ที่ถูกลบ
+        """
+        blobs = collections.Counter(name for name in names if is_blob(name))
+        removed = list(dict.fromkeys(name for name in names if not is_blob(name)))
+        for name in removed:
+            super().delete(name)
+        if not blobs:
+            return removed
+        with transaction.atomic():
+            references = dict(
+                Blob.objects.select_for_update()
+                .filter(name__in=blobs)
+                .values_list("name", "references")
+            )
+            gone = [name for name, count in blobs.items() if references.get(name, 0) <= count]
+            adjust(
+                Blob,
+                "references",
+                {name: -count for name, count in blobs.items() if name not in gone},
+            )
+            Blob.objects.filter(name__in=gone).delete()
+            # ลบไฟล์ขณะที่ยังล็อกแถวอยู่ อัปโหลดเนื้อหาเดียวกันที่เข้ามาพร้อมกันจะรอแล้วเขียนไฟล์ใหม่
+            for name in gone:
+                super().delete(name)
+        return removed + gone
+
+    def delete(self, name):
+        self.release([name])
@@ -0,0 +1,10 @@
+from django import template
+from mediafiles.renditions import rendition_url
+
+register = template.Library()
+
+
+@register.filter
+def rendition(file_field, size):
+    """URL ของรูปย่อขนาดที่กำหนด เช่น ``{{ slide.image|rendition:"hero" }}``"""
+    return rendition_url(file_field, size)
@@ -1,3 +1,445 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.db import IntegrityError, connection, transaction
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from core.testing import QueryBudgetTestMixin, changelist_url
+from . import cleanup, delivery, jobs, renditions, storage
+from .models import Blob, ImageJob, MediaFile
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
 
 # Create your tests here.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaFileSaveTests(TestCase):
+    def setUp(self):
+        MediaFile.objects.create(
+            name="logo", file=SimpleUploadedFile("logo.webp", b"old")
+        )
+        self.media_file = MediaFile.objects.get(name="logo")
+
+    def test_save_runs_single_update(self):
+        self.media_file.name = "social_logo"
+        with CaptureQueriesContext(connection) as queries:
+            self.media_file.save()
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]["sql"].startswith("UPDATE"))
+
+    def test_replacing_file_removes_old_file(self):
+        old_path = self.media_file.file.path
+        self.media_file.file = SimpleUploadedFile("new.webp", b"new")
+        with self.captureOnCommitCallbacks(execute=True):
+            # upsert ไฟล์ใน storage + UPDATE + INSERT งานประมวลผลรูป
+            with self.assertNumQueries(3):
+                self.media_file.save()
+        cleanup.wait()
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(self.media_file.file.path))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DeferredFileDeletionTests(TestCase):
+    def setUp(self):
+        self.media_file = MediaFile.objects.create(
+            name="logo", file=SimpleUploadedFile("logo.webp", b"logo")
+        )
+        self.path = self.media_file.file.path
+
+    def test_file_is_removed_only_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.media_file.delete()
+            self.assertTrue(os.path.exists(self.path))
+        cleanup.wait()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_rolled_back_delete_keeps_file(self):
+        pk = self.media_file.pk
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.media_file.delete()
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+        cleanup.wait()
+        self.assertEqual(callbacks, [])
+        self.assertTrue(os.path.exists(self.path))
+        self.assertTrue(MediaFile.objects.filter(pk=pk).exists())
+
+
+def make_image(name="photo.jpg", size=(2400, 1200)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "teal").save(buffer, format="JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RenditionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_file = MediaFile.objects.create(name="photo", file=make_image())
+        self.name = self.media_file.file.name
+
+    def open_rendition(self, size):
+        return Image.open(
+            os.path.join(MEDIA_ROOT, renditions.rendition_name(self.name, size))
+        )
+
+    def test_rendition_name_is_deterministic_and_beside_original(self):
+        stem = os.path.splitext(self.name)[0]
+        self.assertEqual(
+            renditions.rendition_name(self.name, "hero"), f"{stem}.hero.webp"
+        )
+
+    def test_sizes_and_format(self):
+        renditions.generate_renditions(self.media_file.file)
+        with self.open_rendition("hero") as hero:
+            self.assertEqual((hero.format, hero.size), ("WEBP", (1920, 960)))
+        with self.open_rendition("card") as card:
+            self.assertEqual(card.size, (640, 320))
+        with self.open_rendition("thumb") as thumb:
+            self.assertEqual(thumb.size, (200, 200))
+
+    def test_template_filter_falls_back_to_original_until_generated(self):
+        # ขนาดไม่ซ้ำกับเทสต์อื่น ไฟล์จึงไม่ใช่ blob เดียวกับที่มี rendition แล้ว
+        self.media_file = MediaFile.objects.create(name="new", file=make_image(size=(2400, 1198)))
+        self.name = self.media_file.file.name
+        template = Template('{% load renditions %}{{ file|rendition:"card" }}')
+        context = Context({"file": self.media_file.file})
+        # ไม่ย่อรูประหว่าง render ใช้ไฟล์ต้นฉบับจนกว่างานย่อรูปจะสร้าง rendition
+        with mock.patch.object(renditions, "render_rendition", side_effect=AssertionError):
+            self.assertEqual(template.render(context), self.media_file.file.url)
+
+        renditions.generate_renditions(self.media_file.file)
+        stem = os.path.splitext(self.name)[0]
+        url = template.render(context)
+        self.assertEqual(url, f"/media/{stem}.card.webp")
+
+        # ครั้งต่อไปใช้ผลที่จำไว้ใน cache ไม่ต้องตรวจ storage
+        with mock.patch.object(
+            self.media_file.file.storage, "exists", side_effect=AssertionError
+        ):
+            self.assertEqual(
+                renditions.rendition_url(self.media_file.file, "card"), url
+            )
+
+    def test_non_image_falls_back_to_original(self):
+        document = MediaFile.objects.create(
+            name="doc", file=SimpleUploadedFile("doc.pdf", b"%PDF")
+        )
+        self.assertEqual(
+            renditions.rendition_url(document.file, "thumb"), document.file.url
+        )
+
+    def test_renditions_are_removed_with_original(self):
+        renditions.generate_renditions(self.media_file.file)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.media_file.delete()
+        cleanup.wait()
+        for size in renditions.RENDITIONS:
+            path = os.path.join(MEDIA_ROOT, renditions.rendition_name(self.name, size))
+            self.assertFalse(os.path.exists(path), size)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_upload_queues_job_without_processing(self):
+        # ขนาดไม่ซ้ำกับเทสต์อื่น ไฟล์จึงไม่ใช่ blob เดียวกับที่มี rendition แล้ว
+        media_file = MediaFile.objects.create(name="photo", file=make_image(size=(2400, 1199)))
+        job = ImageJob.objects.get()
+        self.assertEqual(
+            (job.model_label, job.object_id, job.file_name, job.status),
+            ("mediafiles.MediaFile", media_file.pk, media_file.file.name, ImageJob.PENDING),
+        )
+        name = renditions.rendition_name(media_file.file.name, "hero")
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, name)))
+
+    def test_non_image_and_unchanged_file_do_not_queue(self):
+        document = MediaFile.objects.create(
+            name="doc", file=SimpleUploadedFile("doc.pdf", b"%PDF")
+        )
+        photo = MediaFile.objects.create(name="photo", file=make_image())
+        photo = MediaFile.objects.get(pk=photo.pk)
+        photo.name = "renamed"
+        photo.save()
+        self.assertFalse(ImageJob.objects.filter(object_id=document.pk).exists())
+        self.assertEqual(ImageJob.objects.count(), 1)
+
+    def test_worker_resizes_and_generates_renditions(self):
+        media_file = MediaFile.objects.create(name="photo", file=make_image())
+        job = ImageJob.objects.get()
+        job.max_width = 1000
+        job.save()
+
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.DONE)
+        self.assertEqual(job.attempts, 1)
+        media_file.refresh_from_db()  # รูปที่ย่อแล้วเป็นไฟล์ใหม่ ไม่เขียนทับไฟล์เดิม
+        self.assertNotEqual(media_file.file.name, job.file_name)
+        self.assertTrue(storage.is_blob(media_file.file.name))
+        with Image.open(media_file.file.path) as img:
+            self.assertEqual(img.size, (1000, 500))
+        name = renditions.rendition_name(media_file.file.name, "card")
+        with Image.open(os.path.join(MEDIA_ROOT, name)) as card:
+            self.assertEqual(card.size, (640, 320))
+
+    def test_resized_copies_of_same_image_share_one_blob(self):
+        media_files = [
+            MediaFile.objects.create(name=f"photo {i}", file=make_image(size=(2000, 1000)))
+            for i in range(2)
+        ]
+        ImageJob.objects.update(max_width=1000)
+        self.assertEqual(jobs.run_pending(), 2)
+        names = {MediaFile.objects.get(pk=media_file.pk).file.name for media_file in media_files}
+        self.assertEqual(len(names), 1)
+        self.assertEqual(Blob.objects.get(name=names.pop()).references, 2)
+
+    def test_replaced_file_job_is_skipped(self):
+        media_file = MediaFile.objects.create(name="photo", file=make_image())
+        old_job = ImageJob.objects.get()
+        media_file.file = make_image("new.jpg", size=(1200, 600))
+        media_file.save()
+
+        jobs.run_pending()
+        old_job.refresh_from_db()
+        self.assertEqual(old_job.status, ImageJob.SKIPPED)
+        self.assertEqual(
+            ImageJob.objects.exclude(pk=old_job.pk).get().status, ImageJob.DONE
+        )
+
+    def test_broken_image_is_retried_then_failed(self):
+        MediaFile.objects.create(
+            name="broken", file=SimpleUploadedFile("broken.jpg", b"not an image")
+        )
+        for _ in range(jobs.MAX_ATTEMPTS):
+            self.assertEqual(jobs.run_pending(), 1)
+        job = ImageJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (ImageJob.FAILED, jobs.MAX_ATTEMPTS))
+        self.assertIn("UnidentifiedImageError", job.error)
+        self.assertEqual(jobs.run_pending(), 0)
+
+    def test_decompression_bomb_fails_without_retry(self):
+        MediaFile.objects.create(name="bomb", file=make_image(size=(400, 200)))
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 100):
+            self.assertEqual(jobs.run_pending(), 1)
+        job = ImageJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (ImageJob.FAILED, 1))
+        self.assertIn("DecompressionBombError", job.error)
+
+    def test_command_processes_queue_with_pool(self):
+        MediaFile.objects.create(name="photo", file=make_image())
+        call_command(
+            "process_image_jobs", "--once", "--threads", "--workers=2", stdout=io.StringIO()
+        )
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.DONE)
+
+
+class MediaAdminQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.login_admin()
+
+    def test_media_file_changelist(self):
+        self.assertConstantQueries(
+            changelist_url(MediaFile),
+            lambda count: MediaFile.objects.bulk_create(
+                MediaFile(name="ไฟล์", file="mediafiles/x.pdf") for _ in range(count)
+            ),
+        )
+
+    def test_image_job_changelist(self):
+        self.assertConstantQueries(
+            changelist_url(ImageJob),
+            lambda count: ImageJob.objects.bulk_create(
+                ImageJob(model_label="app.Slide", object_id=i, field_name="image", file_name="x.jpg")
+                for i in range(count)
+            ),
+        )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaDeliveryTests(TestCase):
+    body = bytes(range(256)) * 4  # 1024 ไบต์
+
+    def setUp(self):
+        self.name = default_storage.save("delivery/clip.mp4", ContentFile(self.body))
+        self.url = f"/media/{self.name}"
+
+    def tearDown(self):
+        default_storage.delete(self.name)
+
+    def get(self, **headers):
+        return self.client.get(self.url, headers=headers)
+
+    def test_full_file_is_streamed(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b"".join(response.streaming_content), self.body)
+        self.assertEqual(response["Content-Type"], "video/mp4")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("max-age=3600", response["Cache-Control"])
+
+    def test_range_returns_partial_content(self):
+        for header, expected, content_range in [
+            ("bytes=100-199", self.body[100:200], "bytes 100-199/1024"),
+            ("bytes=1000-", self.body[1000:], "bytes 1000-1023/1024"),
+            ("bytes=-24", self.body[-24:], "bytes 1000-1023/1024"),
+            ("bytes=1000-5000", self.body[1000:], "bytes 1000-1023/1024"),
+        ]:
+            with self.subTest(header):
+                response = self.get(Range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(b"".join(response.streaming_content), expected)
+                self.assertEqual(response["Content-Range"], content_range)
+                self.assertEqual(int(response["Content-Length"]), len(expected))
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range="bytes=2000-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+    def test_multiple_ranges_fall_back_to_full_file(self):
+        response = self.get(Range="bytes=0-1,5-6")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.body)
+
+    def test_not_modified(self):
+        etag = self.get()["ETag"]
+        response = self.get(If_None_Match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_if_range_mismatch_sends_full_file(self):
+        response = self.get(Range="bytes=0-9", If_Range='"stale"')
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertEqual(self.get(Range="bytes=0-9", If_Range=etag).status_code, 206)
+
+    def test_missing_file(self):
+        self.assertEqual(self.client.get("/media/delivery/missing.mp4").status_code, 404)
+
+    def test_active_content_is_downloaded(self):
+        self.assertTrue(self.get()["Content-Disposition"].startswith("inline"))
+        for filename in ("page.html", "logo.svg", "script.js", "notes"):
+            with self.subTest(filename):
+                name = default_storage.save(f"delivery/{filename}", ContentFile(b"<script>"))
+                self.addCleanup(default_storage.delete, name)
+                response = self.client.get(f"/media/{name}")
+                self.assertTrue(response["Content-Disposition"].startswith("attachment"))
+                self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+
+    @override_settings(MEDIA_ACCEL_REDIRECT="nginx", MEDIA_ACCEL_PREFIX="/protected/")
+    def test_nginx_accel_redirect(self):
+        response = self.get(Range="bytes=0-9")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected/{self.name}")
+        self.assertEqual(response.content, b"")
+
+    @override_settings(MEDIA_ACCEL_REDIRECT="apache")
+    def test_x_sendfile(self):
+        response = self.get()
+        self.assertEqual(response["X-Sendfile"], default_storage.path(self.name))
+
+    def test_parse_range(self):
+        self.assertIsNone(delivery.parse_range("", 10))
+        self.assertIsNone(delivery.parse_range("bytes=-", 10))
+        self.assertIsNone(delivery.parse_range("items=0-1", 10))
+        self.assertEqual(delivery.parse_range("bytes=-20", 10), (0, 9))
+        with self.assertRaises(ValueError):
+            delivery.parse_range("bytes=5-2", 10)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    def upload(self, content, name="report.pdf"):
+        return MediaFile.objects.create(name="ไฟล์", file=SimpleUploadedFile(name, content))
+
+    def delete(self, *instances):
+        with self.captureOnCommitCallbacks(execute=True):
+            for instance in instances:
+                instance.delete()
+        cleanup.wait()
+
+    def test_same_content_is_stored_once(self):
+        first, second = self.upload(b"same pdf"), self.upload(b"same pdf", "copy.PDF")
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertTrue(storage.is_blob(first.file.name))
+        self.assertTrue(first.file.name.endswith(".pdf"))
+        self.assertEqual(Blob.objects.get(name=first.file.name).references, 2)
+        self.assertNotEqual(self.upload(b"other pdf").file.name, first.file.name)
+
+    def test_file_is_removed_with_last_reference(self):
+        first, second = self.upload(b"shared"), self.upload(b"shared")
+        path = first.file.path
+        self.delete(first)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(Blob.objects.get(name=second.file.name).references, 1)
+        self.delete(second)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_reuploading_same_content_keeps_file(self):
+        media_file = self.upload(b"logo")
+        media_file = MediaFile.objects.get(pk=media_file.pk)
+        media_file.file = SimpleUploadedFile("logo-again.pdf", b"logo")
+        with self.captureOnCommitCallbacks(execute=True):
+            media_file.save()
+        cleanup.wait()
+        self.assertTrue(os.path.exists(media_file.file.path))
+        self.assertEqual(Blob.objects.get().references, 1)
+
+    def test_release_many_uses_constant_queries(self):
+        files = [self.upload(b"a"), self.upload(b"a"), self.upload(b"b"), self.upload(b"c")]
+        names = [media_file.file.name for media_file in files]
+        # savepoint, SELECT ... FOR UPDATE, UPDATE จำนวนอ้างอิง, DELETE, release
+        with self.assertNumQueries(5):
+            removed = default_storage.release(names[1:])
+        self.assertCountEqual(removed, names[2:])
+        self.assertEqual(Blob.objects.get().references, 1)
+        self.assertTrue(os.path.exists(files[0].file.path))
+
+    def test_passthrough_names_are_kept(self):
+        for name in ("uploads/2025/01/editor.png", "blobs/ab/cd/derived.thumb.webp"):
+            with self.subTest(name):
+                saved = default_storage.save(name, ContentFile(b"plain"))
+                self.assertEqual(saved, name)
+                default_storage.delete(saved)
+                self.assertFalse(default_storage.exists(saved))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_dedupe_media_moves_legacy_files(self):
+        os.makedirs(default_storage.path("mediafiles"), exist_ok=True)
+        for legacy in ("mediafiles/a.pdf", "mediafiles/b.pdf"):
+            with open(default_storage.path(legacy), "wb") as handle:
+                handle.write(b"legacy")
+        MediaFile.objects.bulk_create(
+            MediaFile(name="ไฟล์", file=legacy)
+            for legacy in ("mediafiles/a.pdf", "mediafiles/a.pdf", "mediafiles/b.pdf")
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("dedupe_media", stdout=io.StringIO())
+        names = set(MediaFile.objects.values_list("file", flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(Blob.objects.get(name=names.pop()).references, 3)
+        cleanup.wait()
+        for legacy in ("mediafiles/a.pdf", "mediafiles/b.pdf"):
+            self.assertFalse(default_storage.exists(legacy))
@@ -1,3 +1,12 @@
-from django.shortcuts import render
+from django.core.files.storage import default_storage
+from django.utils.cache import patch_cache_control
+from .delivery import serve
 
-# Create your views here.
+CACHE_MAX_AGE = 60 * 60  # วินาที
+
+
+def serve_media(request, path):
+    """ไฟล์ใน MEDIA_ROOT (ใช้แทน django.views.static.serve ซึ่งใช้ได้เฉพาะตอน DEBUG)"""
+    response = serve(request, default_storage, path)
+    patch_cache_control(response, public=True, max_age=CACHE_MAX_AGE)
+    return response
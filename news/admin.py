@@ -1,24 +1,39 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Category, Tag, Article, ArticleImage, ArticleAttachment
+from mediafiles.admin import image_job_status
+from search.admin import IndexedSearchMixin
+from .models import (
+    Category,
+    Tag,
+    Article,
+    ArticleImage,
+    ArticleAttachment,
+    bulk_delete_articles,
+)
 
 
 # Register your models here.
 class ArticleImageInline(admin.TabularInline):
     model = ArticleImage
     extra = 1
-    fields = ("image", "caption", "preview")
-    readonly_fields = ("preview",)
+    fields = ("image", "caption", "preview", "image_status")
+    readonly_fields = ("preview", "image_status")
 
     def preview(self, obj):
         if obj.image:
             return format_html(
-                '<img src="{}" style="width: 100px; height: auto;" />', obj.image.url
+                '<img src="{}" style="width: 100px; height: auto;" />',
+                obj.renditions.thumb,
             )
         return "-"
 
     preview.short_description = "Preview"
 
+    def image_status(self, obj):
+        return image_job_status(obj, "image")
+
+    image_status.short_description = "สถานะการประมวลผลรูป"
+
 
 class ArticleAttachmentInline(admin.TabularInline):
     model = ArticleAttachment
@@ -38,32 +53,23 @@ class ArticleAttachmentInline(admin.TabularInline):
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ("name", "slug", "article_count")
-    serch_fields = ("name",)
+    list_display = ("name", "slug", "published_articles_count")
+    search_fields = ("name",)
     prepopulated_fields = {"slug": ("name",)}
 
-    def article_count(self, obj):
-        return obj.articles.count()
-
-    article_count.short_description = "จำนวนข่าว"
-
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    list_display = ("name", "slug", "article_count")
+    list_display = ("name", "slug", "published_articles_count")
     search_fields = ("name",)
     prepopulated_fields = {"slug": ("name",)}
 
-    def article_count(self, obj):
-        return obj.articles.count()
-
-    article_count.short_description = "จำนวนข่าว"
-
 
 @admin.register(Article)
-class ArticleAdmin(admin.ModelAdmin):
+class ArticleAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ("title", "category", "author_username", "status", "created_at")
-    search_fields = ("title", "content")
+    list_select_related = ("category", "author")
+    search_fields = ("title",)  # ค้นหาเนื้อหาผ่านดัชนีค้นหา (IndexedSearchMixin)
     list_filter = ("status", "category", "tags", "publish_date")
     prepopulated_fields = {"slug": ("title",)}
     date_hierarchy = "publish_date"
@@ -100,14 +106,14 @@ class ArticleAdmin(admin.ModelAdmin):
         if obj.cover_image:
             return format_html(
                 '<img src="{}" style="width: 100px; height: auto;" />',
-                obj.cover_image.url,
+                obj.cover_renditions.thumb,
             )
         return "-"
 
     cover_preview.short_description = "ภาพปก"
 
     def view_count(self, obj):
-        return obj.views
+        return obj.total_views
 
     view_count.short_description = "จำนวนการเข้าชม"
 
@@ -122,10 +128,15 @@ class ArticleAdmin(admin.ModelAdmin):
             obj.author = request.user
         super().save_model(request, obj, form, change)
 
+    def delete_queryset(self, request, queryset):
+        """"ลบที่เลือก" แบบ set-based แทนการลบทีละข่าว"""
+        bulk_delete_articles(queryset)
+
 
 @admin.register(ArticleImage)
 class ArticleImageAdmin(admin.ModelAdmin):
     list_display = ("article", "image_preview", "caption")
+    list_select_related = ("article",)
     list_filter = ("article__category",)
     search_fields = ("article__title", "caption")
     readonly_fields = ("image_preview",)
@@ -133,7 +144,8 @@ class ArticleImageAdmin(admin.ModelAdmin):
     def image_preview(self, obj):
         if obj.image:
             return format_html(
-                '<img src="{}" style="width: 100px; height: auto;" />', obj.image.url
+                '<img src="{}" style="width: 100px; height: auto;" />',
+                obj.renditions.thumb,
             )
         return "-"
 
@@ -143,6 +155,7 @@ class ArticleImageAdmin(admin.ModelAdmin):
 @admin.register(ArticleAttachment)
 class ArticleAttachmentAdmin(admin.ModelAdmin):
     list_display = ("article", "file_name", "file_type", "download_link")
+    list_select_related = ("article",)
     list_filter = (
         "file_type",
         "article__category",
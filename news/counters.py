@@ -0,0 +1,116 @@
+"""
+ตัวนับยอดเข้าชมข่าวแบบบัฟเฟอร์ในหน่วยความจำ (แยกต่อ process)
+
+การเข้าชมแต่ละครั้งถูกสะสมไว้ใน Counter แล้วเขียนลงฐานข้อมูลเป็นชุดด้วย
+``UPDATE ... SET views = views + n`` (F expression) แทนการ save() ทีละครั้ง
+จึงไม่ล็อกแถวทุกครั้งที่มีคนเปิดข่าว และไม่เรียก signal ``article_update``
+
+บัฟเฟอร์ถูก flush เมื่อครบ FLUSH_INTERVAL วินาทีนับจากครั้งก่อน, เมื่อมียอดค้าง
+ถึง FLUSH_THRESHOLD ครั้ง หรือเมื่อ process ปิดตัว ถ้าเขียนไม่สำเร็จ ยอดจะค้างในบัฟเฟอร์
+รอรอบถัดไปโดยไม่ทำให้หน้าข่าว error
+
+เมื่อบัฟเฟอร์มียอดค้าง จะมี timer (daemon thread) flush ภายใน FLUSH_INTERVAL วินาที แม้ไม่มี
+request เข้ามาอีก ส่วน ``atexit`` ไม่ทำงานเมื่อ process ถูก SIGKILL/OOM ยอดที่ค้างอยู่ตอนนั้นจะหายไป
+(ไม่เกิน FLUSH_INTERVAL วินาที) ถ้าต้องการ flush ตอน deploy ให้เรียก ``manage.py flush_view_counts``
+จาก hook ที่ทำงานใน process ของ worker (เช่น ``worker_exit`` ของ gunicorn)
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from django.db import connections, transaction
+from django.db.models import F
+
+FLUSH_INTERVAL = 30  # วินาที
+FLUSH_THRESHOLD = 500  # จำนวนการเข้าชมที่ค้างอยู่
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+_timer = None
+
+
+def record_view(article_id):
+    """บันทึกการเข้าชมหนึ่งครั้ง (ไม่แตะฐานข้อมูล เว้นแต่ถึงรอบ flush)"""
+    with _lock:
+        _pending[article_id] += 1
+        due = (
+            _pending.total() >= FLUSH_THRESHOLD
+            or time.monotonic() - _last_flush >= FLUSH_INTERVAL
+        )
+        _schedule_flush()
+    if due:
+        _flush_quietly()
+
+
+def pending_views(article_id):
+    """ยอดเข้าชมที่ยังไม่ได้เขียนลงฐานข้อมูล"""
+    with _lock:
+        return _pending.get(article_id, 0)
+
+
+def flush_views():
+    """เขียนยอดที่ค้างทั้งหมดลงฐานข้อมูล คืนค่าจำนวนการเข้าชมที่เขียน"""
+    global _last_flush
+    from .models import Article
+
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not batch:
+        return 0
+
+    # รวมข่าวที่มียอดเพิ่มเท่ากันไว้ใน UPDATE เดียว
+    by_increment = defaultdict(list)
+    for article_id, count in batch.items():
+        by_increment[count].append(article_id)
+    try:
+        with transaction.atomic():
+            for count, article_ids in by_increment.items():
+                Article.objects.filter(pk__in=article_ids).update(
+                    views=F("views") + count
+                )
+    except Exception:
+        # เขียนไม่สำเร็จ: คืนยอดกลับเข้าบัฟเฟอร์เพื่อลองใหม่รอบหน้า
+        with _lock:
+            _pending.update(batch)
+        raise
+    return sum(batch.values())
+
+
+def _flush_quietly():
+    """flush โดยไม่ส่ง error ต่อ (ใช้ใน request และตอนปิด process) ยอดยังค้างอยู่ในบัฟเฟอร์"""
+    try:
+        flush_views()
+    except Exception:
+        logger.exception("เขียนยอดเข้าชมข่าวไม่สำเร็จ จะลองใหม่รอบหน้า")
+
+
+def _schedule_flush():
+    """เริ่ม timer ที่จะ flush ภายใน FLUSH_INTERVAL วินาที (ถ้ายังไม่มี) ต้องถือ ``_lock`` อยู่"""
+    global _timer
+    if _timer is None:
+        _timer = threading.Timer(FLUSH_INTERVAL, _flush_on_timer)
+        _timer.daemon = True
+        _timer.start()
+
+
+def _flush_on_timer():
+    global _timer
+    with _lock:
+        _timer = None
+    try:
+        _flush_quietly()
+    finally:
+        connections.close_all()  # connection ของ thread นี้ ไม่มี request cycle มาปิดให้
+    with _lock:
+        if _pending:
+            _schedule_flush()  # เขียนไม่สำเร็จ ลองใหม่รอบหน้า
+
+
+atexit.register(_flush_quietly)
@@ -0,0 +1,55 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from news.models import Article, ArticleImage, bulk_delete_articles
+
+
+class Command(BaseCommand):
+    help = (
+        "เปรียบเทียบเวลาและจำนวน query ระหว่างการลบข่าวทีละแถว (queryset.delete) "
+        "กับ bulk_delete_articles ข้อมูลทดสอบทั้งหมดถูก rollback"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--articles", type=int, default=1000)
+        parser.add_argument("--images", type=int, default=10, help="จำนวนภาพต่อข่าว")
+
+    def handle(self, *args, **options):
+        for label, delete in (
+            ("per-row (queryset.delete)", lambda qs: qs.delete()),
+            ("bulk_delete_articles", bulk_delete_articles),
+        ):
+            with transaction.atomic():
+                queryset = self.seed(options["articles"], options["images"])
+                queries = []
+
+                def count_query(execute, sql, *args):
+                    queries.append(sql)
+                    return execute(sql, *args)
+
+                with connection.execute_wrapper(count_query):
+                    started = time.perf_counter()
+                    delete(queryset)
+                    elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f"{label:<28} {elapsed:8.3f}s {len(queries):>8} queries"
+            )
+
+    def seed(self, article_count, images_per_article):
+        prefix = f"bench-{time.time_ns()}"
+        articles = Article.objects.bulk_create(
+            Article(
+                title=f"{prefix} {i}",
+                slug=f"{prefix}-{i}",
+                content="benchmark",
+                cover_image=f"news/covers/{prefix}-{i}.jpg",
+            )
+            for i in range(article_count)
+        )
+        ArticleImage.objects.bulk_create(
+            ArticleImage(article=article, image=f"news/images/{prefix}-{article.pk}-{n}.jpg")
+            for article in articles
+            for n in range(images_per_article)
+        )
+        return Article.objects.filter(slug__startswith=prefix)
@@ -0,0 +1,88 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from core.pagination import encode_cursor, keyset_paginate
+from news.models import Article
+from news.views import ARTICLES_PER_PAGE, published_now
+
+ORDERING = ("-publish_date", "-id")
+
+
+class Command(BaseCommand):
+    help = (
+        "เปรียบเทียบเวลาเปิดหน้ารายการข่าวหน้าแรกกับหน้าลึก ระหว่าง OFFSET กับ keyset pagination "
+        "ข้อมูลทดสอบทั้งหมดถูก rollback"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--articles", type=int, default=200_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options["articles"])
+            queryset = (
+                Article.objects.filter(status=Article.PUBLISHED)
+                .select_related("category", "author")
+                .defer("content")
+            )
+            last_page = options["articles"] // ARTICLES_PER_PAGE - 1
+            for page_number in (0, last_page // 2, last_page):
+                offset = page_number * ARTICLES_PER_PAGE
+                cursor = None
+                if offset:
+                    previous = queryset.filter(published_now()).order_by(*ORDERING)[offset - 1]
+                    fields = [Article._meta.get_field("publish_date"), Article._meta.pk]
+                    cursor = encode_cursor(fields, previous)
+
+                def by_offset():
+                    return list(
+                        queryset.filter(published_now()).order_by(*ORDERING)[
+                            offset : offset + ARTICLES_PER_PAGE
+                        ]
+                    )
+
+                def by_keyset():
+                    return keyset_paginate(
+                        queryset, ORDERING, cursor, ARTICLES_PER_PAGE, bounds=published_now()
+                    ).items
+
+                self.assertSame(by_offset(), by_keyset())
+                self.stdout.write(
+                    f"page {page_number + 1:>7}: OFFSET {self.time(by_offset, options['repeat']):8.2f}ms"
+                    f"   keyset {self.time(by_keyset, options['repeat']):8.2f}ms"
+                )
+            transaction.set_rollback(True)
+
+    def assertSame(self, expected, actual):
+        if [a.pk for a in expected] != [a.pk for a in actual]:
+            raise AssertionError("keyset และ OFFSET ให้ผลไม่ตรงกัน")
+
+    def time(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000
+
+    def seed(self, article_count):
+        now = timezone.now() - timedelta(days=1)
+        prefix = f"bench-{time.time_ns()}"
+        for start in range(0, article_count, 10_000):
+            Article.objects.bulk_create(
+                Article(
+                    title=f"{prefix} {i}",
+                    slug=f"{prefix}-{i}",
+                    content="benchmark",
+                    status=Article.PUBLISHED,
+                    # ทุก 4 ข่าวใช้เวลาเดียวกัน ให้ id เป็นตัวตัดสินลำดับ
+                    publish_date=now - timedelta(minutes=i // 4),
+                )
+                for i in range(start, min(start + 10_000, article_count))
+            )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE news_article")
@@ -0,0 +1,47 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from news.models import Article, bulk_delete_articles
+
+
+class Command(BaseCommand):
+    help = "ลบข่าวจำนวนมากแบบ set-based พร้อมภาพประกอบและไฟล์แนบ"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--status",
+            choices=[choice for choice, _ in Article.STATUS_CHOICES],
+            help="ลบเฉพาะข่าวที่มีสถานะนี้",
+        )
+        parser.add_argument(
+            "--before",
+            help="ลบเฉพาะข่าวที่เผยแพร่ก่อนวันที่นี้ (YYYY-MM-DD)",
+        )
+        parser.add_argument("--category", help="ลบเฉพาะข่าวในหมวดหมู่ (slug)")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="แสดงจำนวนข่าวที่จะถูกลบโดยไม่ลบจริง",
+        )
+
+    def handle(self, *args, **options):
+        queryset = Article.objects.all()
+        if options["status"]:
+            queryset = queryset.filter(status=options["status"])
+        if options["before"]:
+            try:
+                before = datetime.strptime(options["before"], "%Y-%m-%d")
+            except ValueError:
+                raise CommandError("--before ต้องอยู่ในรูปแบบ YYYY-MM-DD")
+            queryset = queryset.filter(
+                publish_date__lt=timezone.make_aware(before)
+            )
+        if options["category"]:
+            queryset = queryset.filter(category__slug=options["category"])
+
+        if options["dry_run"]:
+            self.stdout.write(f"จะลบข่าว {queryset.count()} รายการ")
+            return
+
+        deleted = bulk_delete_articles(queryset)
+        self.stdout.write(self.style.SUCCESS(f"ลบข่าวแล้ว {deleted} รายการ"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from news.counters import flush_views
+
+
+class Command(BaseCommand):
+    help = (
+        "เขียนยอดเข้าชมข่าวที่ค้างในบัฟเฟอร์ของ process นี้ลงฐานข้อมูล "
+        "(บัฟเฟอร์แยกต่อ process จึงต้องเรียกจาก hook ที่ทำงานใน worker เช่น "
+        'call_command("flush_view_counts") ใน worker_exit ของ gunicorn)'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"เขียนยอดเข้าชม {flush_views()} ครั้ง")
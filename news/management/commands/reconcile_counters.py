@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.counters import COUNTERS, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "คำนวณตัวนับ denormalized ใหม่ (จำนวนข่าว/หน้าที่เผยแพร่ของหมวดหมู่และแท็ก) "
+        "และแก้แถวที่ค่าคลาด"
+    )
+
+    def handle(self, *args, **options):
+        for counter in COUNTERS:
+            with transaction.atomic():
+                fixed = reconcile(counter)
+            self.stdout.write(f"{counter}: แก้ {fixed} แถว")
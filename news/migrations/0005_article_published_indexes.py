@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_alter_article_cover_image_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['status', '-publish_date', '-id'], name='news_article_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['category', 'status', '-publish_date', '-id'], name='news_article_category_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_article_published_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='article',
+            name='news_article_published_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='article',
+            name='news_article_category_idx',
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['-publish_date', '-id'], name='news_article_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['category', '-publish_date', '-id'], name='news_article_category_idx'),
+        ),
+    ]
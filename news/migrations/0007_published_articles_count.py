@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:22
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_published_articles(apps, schema_editor):
+    Article = apps.get_model("news", "Article")
+    published = Article.objects.filter(status="published").order_by()
+    for model_name, lookup in (("Category", "category"), ("Tag", "tags")):
+        model = apps.get_model("news", model_name)
+        counts = published.values(lookup).annotate(total=Count("pk")).values_list(lookup, "total")
+        for pk, total in counts:
+            if pk is not None:
+                model.objects.filter(pk=pk).update(published_articles_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_article_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='published_articles_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='จำนวนข่าวที่เผยแพร่'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='published_articles_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='จำนวนข่าวที่เผยแพร่'),
+        ),
+        migrations.RunPython(count_published_articles, migrations.RunPython.noop),
+    ]
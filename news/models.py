@@ -1,12 +1,25 @@
 import os
 import uuid
-from django.db import models
-from django.contrib.auth.models import User
+from django.db import models, transaction
+from django.conf import settings
 from django.utils import timezone
 from django.urls import reverse
 from django.utils.text import slugify
 from django.dispatch import receiver
-from django.db.models.signals import pre_save, pre_delete
+from django.db.models.signals import (
+    m2m_changed,
+    pre_save,
+    post_save,
+    pre_delete,
+    post_delete,
+)
+from core import counters
+from core.tracking import FieldTrackingMixin
+from mediafiles.cleanup import delete_file_on_commit, delete_files_on_commit
+from mediafiles.jobs import queue_image_job
+from mediafiles.renditions import Renditions
+from search.indexing import schedule_index
+from .counters import pending_views
 
 
 # Create your models here.
@@ -24,13 +37,9 @@ def get_file_upload_path(instance, filename):
     return os.path.join("news", new_filename)
 
 
-def delete_file_if_exists(file_path):
-    """ลบไฟล์ถ้ามีอยู่ในระบบ"""
-    if file_path and os.path.isfile(file_path):
-        try:
-            os.remove(file_path)
-        except:
-            pass
+def delete_file_if_exists(file_field):
+    """ลบไฟล์ถ้ามีอยู่ในระบบ (หลัง transaction commit โดย worker เบื้องหลัง)"""
+    delete_file_on_commit(file_field)
 
 
 class Category(models.Model):
@@ -39,6 +48,10 @@ class Category(models.Model):
         max_length=100, unique=True, blank=True, null=True, verbose_name="Slug"
     )
     description = models.TextField(blank=True, verbose_name="คำอธิบายหมวดหมู่")
+    # ปรับโดย signal ของ Article (ดู core/counters.py)
+    published_articles_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="จำนวนข่าวที่เผยแพร่"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="วันที่สร้าง")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="วันที่แก้ไขล่าสุด")
 
@@ -56,7 +69,7 @@ class Category(models.Model):
         super().save(*args, **kwargs)
 
     def get_absolute_url(self):
-        return reverse("news:category_detail", args={self.slug})
+        return reverse("news:category_detail", args=[self.slug])
 
 
 class Tag(models.Model):
@@ -64,6 +77,9 @@ class Tag(models.Model):
     slug = models.SlugField(
         max_length=100, unique=True, blank=True, null=True, verbose_name="Slug"
     )
+    published_articles_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="จำนวนข่าวที่เผยแพร่"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="วันที่สร้าง")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="วันที่แก้ไขล่าสุด")
 
@@ -80,8 +96,11 @@ class Tag(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
+    def get_absolute_url(self):
+        return reverse("news:tag_detail", args=[self.slug])
+
 
-class Article(models.Model):
+class Article(FieldTrackingMixin, models.Model):
     DRAFT = "draft"
     PUBLISHED = "published"
     ARCHIVED = "archived"
@@ -111,7 +130,7 @@ class Article(models.Model):
 
     # relationships
     author = models.ForeignKey(
-        User,
+        settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
         null=True,
         related_name="news_articles",
@@ -128,33 +147,60 @@ class Article(models.Model):
         Tag, blank=True, related_name="articles", verbose_name="แท็ก"
     )
 
+    tracked_fields = ("cover_image", "status", "category")
+
     class Meta:
         verbose_name = "ข่าว"
         verbose_name_plural = "ข่าวทั้งหมด"
         ordering = ["-publish_date"]
-        indexes = [models.Index(fields=["-publish_date"])]
+        indexes = [
+            models.Index(fields=["-publish_date"]),
+            # หน้ารายการข่าว: WHERE status = 'published' ORDER BY publish_date DESC, id DESC
+            # เป็น partial index เฉพาะข่าวที่เผยแพร่แล้ว (ฉบับร่างไม่ทำให้ index ใหญ่ขึ้น)
+            models.Index(
+                fields=["-publish_date", "-id"],
+                condition=models.Q(status="published"),
+                name="news_article_published_idx",
+            ),
+            models.Index(
+                fields=["category", "-publish_date", "-id"],
+                condition=models.Q(status="published"),
+                name="news_article_category_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
-    def delete(self, *args, **kwargs):
-        """Override delete method to remove cover image file."""
-        if self.cover_image:
-            delete_file_if_exists(self.cover_image.path)
-
-        # Remove all related images
-        super().delete(*args, **kwargs)
-
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
         super().save(*args, **kwargs)
 
+    @property
+    def cover_renditions(self):
+        """รูปย่อของภาพปก เช่น ``article.cover_renditions.card``"""
+        return Renditions(self.cover_image)
+
+    @property
+    def total_views(self):
+        """จำนวนการเข้าชมที่บันทึกแล้ว รวมกับยอดที่ยังค้างอยู่ในบัฟเฟอร์ (news/counters.py)"""
+        return self.views + pending_views(self.pk)
+
+    def search_document(self):
+        """ข้อมูลสำหรับดัชนีค้นหา (search/indexing.py)"""
+        return {
+            "title": self.title,
+            "body": f"{self.excerpt}\n{self.content}",
+            "is_public": self.status == self.PUBLISHED,
+            "published_at": self.publish_date,
+        }
+
     def get_absolute_url(self):
         return reverse(
             "news:article_detail",
             args=[
-                self.publisth_date.year,
+                self.publish_date.year,
                 self.publish_date.month,
                 self.publish_date.day,
                 self.slug,
@@ -162,7 +208,7 @@ class Article(models.Model):
         )
 
 
-class ArticleImage(models.Model):
+class ArticleImage(FieldTrackingMixin, models.Model):
     article = models.ForeignKey(
         Article,
         on_delete=models.CASCADE,
@@ -173,6 +219,8 @@ class ArticleImage(models.Model):
     caption = models.CharField(max_length=255, blank=True, verbose_name="คำบรรยายภาพ")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="วันที่สร้าง")
 
+    tracked_fields = ("image",)
+
     class Meta:
         verbose_name = "ภาพข่าว"
         verbose_name_plural = "ภาพข่าว"
@@ -181,14 +229,19 @@ class ArticleImage(models.Model):
     def __str__(self):
         return f"ภาพประกอบสำหรับ {self.article.title}"
 
+    @property
+    def renditions(self):
+        """รูปย่อของภาพประกอบ เช่น ``image.renditions.card``"""
+        return Renditions(self.image)
+
     def delete(self, *args, **kwargs):
         """Override delete method to remove image file."""
         if self.image:
-            delete_file_if_exists(self.image.path)
+            delete_file_if_exists(self.image)
         super().delete(*args, **kwargs)
 
 
-class ArticleAttachment(models.Model):
+class ArticleAttachment(FieldTrackingMixin, models.Model):
     ARCICLE_FILE = "file"
     ARCICLE_VIDEO = "video"
     ARCTICLE_AUDIO = "audio"
@@ -217,6 +270,8 @@ class ArticleAttachment(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="วันที่สร้าง")
 
+    tracked_fields = ("file",)
+
     class Meta:
         verbose_name = "ไฟล์แนบ"
         verbose_name_plural = "ไฟล์แนบ"
@@ -228,7 +283,7 @@ class ArticleAttachment(models.Model):
     def delete(self, *args, **kwargs):
         """Override delete method to remove file."""
         if self.file:
-            delete_file_if_exists(self.file.path)
+            delete_file_if_exists(self.file)
         super().delete(*args, **kwargs)
 
     def save(self, *args, **kwargs):
@@ -241,9 +296,9 @@ class ArticleAttachment(models.Model):
 @receiver(pre_delete, sender=Article)
 def article_delete(sender, instance, **kwargs):
     """Signal สำหรับลบไฟล์เมื่อมีการลบ Article"""
-    # ลบไฟล์ภาพปก
+    # ลบไฟล์ภาพปก (ที่เดียว ไม่ซ้ำใน Article.delete() เพราะ storage นับการอ้างอิงของไฟล์)
     if instance.cover_image:
-        delete_file_if_exists(instance.cover_image.path)
+        delete_file_if_exists(instance.cover_image)
 
     # ลบรูปที่เกี่ยวจข้อง
     for image in instance.images.all():
@@ -257,49 +312,199 @@ def article_delete(sender, instance, **kwargs):
 @receiver(pre_save, sender=Article)
 def article_update(sender, instance, **kwargs):
     """Signal สำหรับลบไฟล์เมื่อมีการอัปเดต Article"""
-    # ตรวจสอบว่ามีการเปลี่ยนแปลง cover_image หรือไม่
-    if not instance.pk:
-        return False
+    # ตรวจสอบว่ามีการเปลี่ยนแปลง cover_image หรือไม่ (เทียบกับค่าที่จำไว้ตอนโหลด)
+    old_cover = instance.replaced_file("cover_image")
+    if old_cover:
+        delete_file_if_exists(old_cover)
+
 
-    try:
-        old_cover = Article.objects.get(pk=instance.pk).cover_image
-    except Article.DoesNotExist:
-        return False
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def article_search_index(sender, instance, **kwargs):
+    """ปรับดัชนีค้นหาของข่าวหลัง commit"""
+    schedule_index(sender, instance.pk)
 
-    new_cover = instance.cover_image
-    if old_cover and old_cover != new_cover:
-        delete_file_if_exists(old_cover.path)
+
+category_articles_counter = counters.register_counter(
+    Category,
+    "published_articles_count",
+    Article.objects.filter(status=Article.PUBLISHED),
+    "category",
+)
+tag_articles_counter = counters.register_counter(
+    Tag,
+    "published_articles_count",
+    Article.objects.filter(status=Article.PUBLISHED),
+    "tags",
+)
+
+# ฟิลด์ที่มีผลกับตัวนับ (save() ของ instance ที่มีฟิลด์ถูก defer ส่ง update_fields เป็นชื่อคอลัมน์)
+COUNTED_FIELDS = {"status", "category", "category_id"}
+
+
+@receiver(pre_save, sender=Article)
+def article_counters_pre_save(sender, instance, using, update_fields=None, **kwargs):
+    """อ่านสถานะ/หมวดหมู่เดิมของแถวนี้ถ้าไม่ได้จำไว้ตอนโหลด (ไม่ต้องคำนวณตัวนับใหม่ทั้งตาราง)"""
+    if update_fields is not None and not COUNTED_FIELDS & set(update_fields):
+        return
+    instance.load_originals("status", "category", using=using)
+
+
+@receiver(post_save, sender=Article)
+def article_counters(sender, instance, created, update_fields=None, **kwargs):
+    """ปรับจำนวนข่าวที่เผยแพร่ของหมวดหมู่และแท็กเมื่อสถานะหรือหมวดหมู่ของข่าวเปลี่ยน"""
+    if update_fields is not None and not COUNTED_FIELDS & set(update_fields):
+        return
+    published = instance.status == Article.PUBLISHED
+    if created:
+        was_published, old_category = False, None
+    else:
+        # ค่าที่จำไว้ตอนโหลด หรือที่ article_counters_pre_save อ่านมา
+        was_published = instance.get_original("status") == Article.PUBLISHED
+        old_category = instance.get_original("category")
+
+    if published != was_published or instance.category_id != old_category:
+        deltas = {}
+        if was_published:
+            deltas[old_category] = deltas.get(old_category, 0) - 1
+        if published:
+            deltas[instance.category_id] = deltas.get(instance.category_id, 0) + 1
+        counters.adjust(Category, "published_articles_count", deltas)
+    if published != was_published and not created:
+        tag_ids = instance.tags.values_list("pk", flat=True)
+        counters.adjust(
+            Tag, "published_articles_count", {pk: 1 if published else -1 for pk in tag_ids}
+        )
+
+
+@receiver(pre_delete, sender=Article)
+def article_counters_pre_delete(sender, instance, **kwargs):
+    """จำแท็กของข่าวไว้ก่อนแถวในตารางเชื่อมถูกลบไปพร้อมข่าว"""
+    if instance.get_original("status", instance.status) == Article.PUBLISHED:
+        instance._counted_tag_ids = list(instance.tags.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Article)
+def article_counters_post_delete(sender, instance, **kwargs):
+    if not hasattr(instance, "_counted_tag_ids"):
+        return
+    category_id = instance.get_original("category", instance.category_id)
+    counters.adjust(Category, "published_articles_count", {category_id: -1})
+    counters.adjust(
+        Tag, "published_articles_count", {pk: -1 for pk in instance._counted_tag_ids}
+    )
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def article_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """ปรับจำนวนข่าวที่เผยแพร่ของแท็กเมื่อเพิ่ม/ลบแท็กของข่าว (ทั้งจากฝั่งข่าวและฝั่งแท็ก)"""
+    if action == "pre_clear":
+        if reverse:
+            instance._cleared_articles = instance.articles.filter(
+                status=Article.PUBLISHED
+            ).count()
+        elif instance.status == Article.PUBLISHED:
+            instance._cleared_tag_ids = list(instance.tags.values_list("pk", flat=True))
+        return
+    if action == "post_clear":
+        if reverse:
+            deltas = {instance.pk: -getattr(instance, "_cleared_articles", 0)}
+        else:
+            deltas = {pk: -1 for pk in getattr(instance, "_cleared_tag_ids", ())}
+    elif action in ("post_add", "post_remove") and pk_set:
+        sign = 1 if action == "post_add" else -1
+        if reverse:
+            published = Article.objects.filter(pk__in=pk_set, status=Article.PUBLISHED)
+            deltas = {instance.pk: sign * published.count()}
+        elif instance.status == Article.PUBLISHED:
+            deltas = {pk: sign for pk in pk_set}
+        else:
+            return
+    else:
+        return
+    counters.adjust(Tag, "published_articles_count", deltas)
 
 
 @receiver(pre_save, sender=ArticleImage)
 def article_image_update(sender, instance, **kwargs):
     """Signal สำหรับลบไฟล์เมื่อมีการอัปเดต ArticleImage"""
-    # ตรวจสอบว่ามีการเปลี่ยนแปลง image หรือไม่
-    if not instance.pk:
-        return False
+    # ตรวจสอบว่ามีการเปลี่ยนแปลง image หรือไม่ (เทียบกับค่าที่จำไว้ตอนโหลด)
+    old_image = instance.replaced_file("image")
+    if old_image:
+        delete_file_if_exists(old_image)
 
-    try:
-        old_image = ArticleImage.objects.get(pk=instance.pk).image
-    except ArticleImage.DoesNotExist:
-        return False
 
-    new_image = instance.image
-    if old_image and old_image != new_image:
-        delete_file_if_exists(old_image.path)
+@receiver(post_save, sender=ArticleImage)
+def article_image_saved(sender, instance, created, **kwargs):
+    """ส่งภาพประกอบที่อัปโหลดใหม่ไปย่อขนาดและสร้าง rendition นอก request"""
+    if created or instance.has_changed("image"):
+        queue_image_job(instance, "image", max_width=1920)
 
 
 @receiver(pre_save, sender=ArticleAttachment)
 def article_attachment_update(sender, instance, **kwargs):
     """Signal สำหรับลบไฟล์เมื่อมีการอัปเดต ArticleAttachment"""
-    # ตรวจสอบว่ามีการเปลี่ยนแปลง file หรือไม่
-    if not instance.pk:
-        return False
-
-    try:
-        old_file = ArticleAttachment.objects.get(pk=instance.pk).file
-    except ArticleAttachment.DoesNotExist:
-        return False
-
-    new_file = instance.file
-    if old_file and old_file != new_file:
-        delete_file_if_exists(old_file.path)
+    # ตรวจสอบว่ามีการเปลี่ยนแปลง file หรือไม่ (เทียบกับค่าที่จำไว้ตอนโหลด)
+    old_file = instance.replaced_file("file")
+    if old_file:
+        delete_file_if_exists(old_file)
+
+
+def bulk_delete_articles(queryset):
+    """
+    ลบข่าวหลายรายการแบบ set-based (ใช้กับ "ลบที่เลือก" ในหน้า admin และคำสั่ง delete_articles)
+
+    - ดึงชื่อไฟล์ทั้งหมดด้วย 2 query: ภาพปกของข่าว และภาพประกอบ + ไฟล์แนบ (UNION)
+    - ลบแถวด้วย DELETE ... WHERE article_id IN (...) ทีละตาราง แทนการลบทีละแถว
+      ผ่าน signal ``article_delete``
+    - ลบไฟล์หลัง transaction commit (ดู mediafiles/cleanup.py)
+    - ลดจำนวนข่าวที่เผยแพร่ของหมวดหมู่และแท็กด้วย UPDATE ตารางละครั้ง
+
+    คืนค่าจำนวนข่าวที่ถูกลบ
+    """
+    with transaction.atomic(using=queryset.db):
+        articles = list(queryset.values_list("pk", "cover_image", "status", "category"))
+        article_ids = [pk for pk, *_ in articles]
+        if not article_ids:
+            return 0
+
+        # จำนวนข่าวที่เผยแพร่ที่หายไปของแต่ละหมวดหมู่/แท็ก
+        category_deltas, tag_deltas = {}, {}
+        published_ids = []
+        for pk, _, status, category_id in articles:
+            if status == Article.PUBLISHED:
+                published_ids.append(pk)
+                category_deltas[category_id] = category_deltas.get(category_id, 0) - 1
+        if published_ids:
+            for tag_id in Article.tags.through.objects.filter(
+                article_id__in=published_ids
+            ).values_list("tag_id", flat=True):
+                tag_deltas[tag_id] = tag_deltas.get(tag_id, 0) - 1
+
+        child_files = (
+            ArticleImage.objects.filter(article_id__in=article_ids)
+            .order_by()
+            .values_list("image")
+            .union(
+                ArticleAttachment.objects.filter(article_id__in=article_ids)
+                .order_by()
+                .values_list("file"),
+                all=True,
+            )
+        )
+        file_names = [name for _, name, *_ in articles if name]
+        file_names += [name for (name,) in child_files if name]
+
+        Article.tags.through.objects.filter(article_id__in=article_ids).delete()
+        ArticleImage.objects.filter(article_id__in=article_ids).delete()
+        ArticleAttachment.objects.filter(article_id__in=article_ids).delete()
+        # _raw_delete ข้าม pre_delete ต่อแถว (article_delete) ซึ่งงานของมันทำไว้ข้างบนแล้ว
+        deleted = Article.objects.filter(pk__in=article_ids)._raw_delete(queryset.db)
+        counters.adjust(Category, "published_articles_count", category_deltas)
+        counters.adjust(Tag, "published_articles_count", tag_deltas)
+
+        delete_files_on_commit(
+            file_names, storage=Article._meta.get_field("cover_image").storage, using=queryset.db
+        )
+        schedule_index(Article, *article_ids)
+    return deleted
@@ -1,3 +1,680 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from core.routers import PIN_COOKIE
+from core.testing import (
+    QueryBudgetTestMixin,
+    QueryPlanTestMixin,
+    ReplicaTestMixin,
+    changelist_url,
+)
+from mediafiles import cleanup
+from core import counters as counters_module
+from . import counters
+from .models import (
+    Article,
+    ArticleAttachment,
+    Category,
+    ArticleImage,
+    Tag,
+    bulk_delete_articles,
+)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+    # ยอดเข้าชมจากการทดสอบหน้าข่าว ไม่ให้ atexit/timer flush หลังฐานข้อมูลทดสอบถูกลบไปแล้ว
+    counters._pending.clear()
+    if counters._timer:
+        counters._timer.cancel()
+
 
 # Create your tests here.
+class ArticleViewCounterTests(TestCase):
+    def setUp(self):
+        counters._pending.clear()
+        counters._last_flush = time.monotonic()
+        if counters._timer:
+            counters._timer.cancel()
+            counters._timer = None
+        self.article = Article.objects.create(
+            title="ข่าว", slug="news", content="เนื้อหา", views=10
+        )
+        self.other = Article.objects.create(
+            title="ข่าวอื่น", slug="other", content="เนื้อหา"
+        )
+
+    def test_record_view_does_not_touch_database(self):
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                counters.record_view(self.article.pk)
+        self.assertEqual(counters.pending_views(self.article.pk), 3)
+        self.assertEqual(self.article.total_views, 13)
+
+    def test_flush_writes_batches_with_f_expressions(self):
+        for article in (self.article, self.other):
+            for _ in range(2):
+                counters.record_view(article.pk)
+        counters.record_view(self.article.pk)
+
+        # ยอดเพิ่ม 3 และ 2 => UPDATE 2 คำสั่ง ภายใน savepoint ไม่มี SELECT
+        with self.assertNumQueries(4):
+            self.assertEqual(counters.flush_views(), 5)
+
+        self.article.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.article.views, 13)
+        self.assertEqual(self.other.views, 2)
+        self.assertEqual(counters.pending_views(self.article.pk), 0)
+
+    def test_threshold_triggers_flush(self):
+        with mock.patch.object(counters, "FLUSH_THRESHOLD", 2):
+            counters.record_view(self.other.pk)
+            counters.record_view(self.other.pk)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.views, 2)
+
+    def test_failed_flush_keeps_pending_views(self):
+        counters.record_view(self.article.pk)
+        with mock.patch.object(
+            Article.objects, "filter", side_effect=RuntimeError("db down")
+        ):
+            with self.assertRaises(RuntimeError):
+                counters.flush_views()
+        self.assertEqual(counters.pending_views(self.article.pk), 1)
+
+    def test_failed_flush_does_not_fail_record_view(self):
+        with mock.patch.object(counters, "FLUSH_THRESHOLD", 2), mock.patch.object(
+            Article.objects, "filter", side_effect=RuntimeError("db down")
+        ), self.assertLogs("news.counters", "ERROR"):
+            counters.record_view(self.article.pk)
+            counters.record_view(self.article.pk)
+        self.assertEqual(counters.pending_views(self.article.pk), 2)
+
+    def wait_for_timer(self):
+        while (timer := counters._timer) is not None:
+            timer.join(5)
+
+    def test_idle_worker_flushes_on_timer(self):
+        counters._last_flush = time.monotonic() + 60  # ไม่ให้ record_view flush เอง
+        with mock.patch.object(counters, "FLUSH_INTERVAL", 0.01), mock.patch.object(
+            counters, "flush_views", side_effect=counters._pending.clear
+        ) as flush:
+            counters.record_view(self.article.pk)
+            counters.record_view(self.other.pk)
+            self.wait_for_timer()
+        flush.assert_called_once_with()
+        self.assertEqual(counters.pending_views(self.article.pk), 0)
+
+    def test_failed_timer_flush_is_retried(self):
+        counters._last_flush = time.monotonic() + 60
+        results = iter([RuntimeError("db down"), None])
+
+        def flush_views():
+            result = next(results)
+            if result:
+                raise result
+            counters._pending.clear()
+
+        with mock.patch.object(counters, "FLUSH_INTERVAL", 0.01), mock.patch.object(
+            counters, "flush_views", side_effect=flush_views
+        ) as flush, self.assertLogs("news.counters", "ERROR"):
+            counters.record_view(self.article.pk)
+            self.wait_for_timer()
+        self.assertEqual(flush.call_count, 2)
+
+    def test_flush_view_counts_command(self):
+        counters.record_view(self.article.pk)
+        out = io.StringIO()
+        call_command("flush_view_counts", stdout=out)
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.views, 11)
+        self.assertIn("เขียนยอดเข้าชม 1 ครั้ง", out.getvalue())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class FileReplacementSaveTests(TestCase):
+    def setUp(self):
+        article = Article.objects.create(
+            title="ข่าว",
+            slug="news",
+            content="เนื้อหา",
+            cover_image=SimpleUploadedFile("cover.jpg", b"cover"),
+        )
+        ArticleImage.objects.create(
+            article=article, image=SimpleUploadedFile("image.jpg", b"image")
+        )
+        ArticleAttachment.objects.create(
+            article=article, file=SimpleUploadedFile("file.pdf", b"file")
+        )
+        self.article = Article.objects.get(pk=article.pk)
+        self.image = ArticleImage.objects.get(article=article)
+        self.attachment = ArticleAttachment.objects.get(article=article)
+
+    def assertSingleUpdate(self, instance, stored_file=False, queued_job=False):
+        with CaptureQueriesContext(connection) as queries:
+            instance.save()
+        sql = [q["sql"] for q in queries]
+        if stored_file:
+            # ไฟล์ใหม่ถูกนับใน storage แบบ content-addressed ด้วย upsert หนึ่ง query
+            self.assertIn("mediafiles_blob", sql.pop(0))
+        if queued_job:
+            # รูปใหม่ได้งานประมวลผลรูปเพิ่มอีกหนึ่ง INSERT
+            self.assertIn("mediafiles_imagejob", sql.pop())
+        self.assertEqual(len(sql), 1, sql)
+        self.assertTrue(sql[0].startswith("UPDATE"))
+
+    def test_save_without_file_change_runs_single_update(self):
+        self.article.title = "ข่าวใหม่"
+        self.image.caption = "คำบรรยาย"
+        self.attachment.name = "เอกสาร.pdf"
+        for instance in (self.article, self.image, self.attachment):
+            self.assertSingleUpdate(instance)
+
+    def test_replacing_files_removes_old_files(self):
+        replacements = [
+            (self.article, "cover_image", "new-cover.jpg"),
+            (self.image, "image", "new-image.jpg"),
+            (self.attachment, "file", "new-file.pdf"),
+        ]
+        for instance, field, filename in replacements:
+            old_path = getattr(instance, field).path
+            setattr(instance, field, SimpleUploadedFile(filename, b"new"))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertSingleUpdate(
+                    instance, stored_file=True, queued_job=field == "image"
+                )
+            cleanup.wait()
+            self.assertFalse(os.path.exists(old_path), field)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BulkDeleteArticlesTests(TestCase):
+    def create_articles(self, count, prefix):
+        tag = Tag.objects.create(name=prefix)
+        for i in range(count):
+            article = Article.objects.create(
+                title=f"{prefix} {i}",
+                slug=f"{prefix}-{i}",
+                content="เนื้อหา",
+                cover_image=SimpleUploadedFile("cover.jpg", b"cover"),
+            )
+            article.tags.add(tag)
+            for _ in range(2):
+                ArticleImage.objects.create(
+                    article=article, image=SimpleUploadedFile("image.jpg", b"image")
+                )
+            ArticleAttachment.objects.create(
+                article=article, file=SimpleUploadedFile("file.pdf", b"file")
+            )
+        return Article.objects.filter(slug__startswith=prefix)
+
+    def test_query_count_does_not_depend_on_article_count(self):
+        small = self.create_articles(2, "small")
+        large = self.create_articles(6, "large")
+        # savepoint, ข่าว+ภาพปก, ภาพ+ไฟล์แนบ, ลบ 4 ตาราง, release
+        with self.assertNumQueries(8):
+            self.assertEqual(bulk_delete_articles(small), 2)
+        with self.assertNumQueries(8):
+            self.assertEqual(bulk_delete_articles(large), 6)
+
+        self.assertFalse(Article.objects.exists())
+        self.assertFalse(ArticleImage.objects.exists())
+        self.assertFalse(ArticleAttachment.objects.exists())
+        self.assertFalse(Article.tags.through.objects.exists())
+
+    def test_files_are_removed_after_commit(self):
+        articles = self.create_articles(2, "files")
+        paths = [article.cover_image.path for article in articles]
+        paths += [image.image.path for image in ArticleImage.objects.all()]
+        paths += [item.file.path for item in ArticleAttachment.objects.all()]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_delete_articles(articles)
+            self.assertTrue(all(os.path.exists(path) for path in paths))
+        cleanup.wait()
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_empty_queryset(self):
+        with self.assertNumQueries(3):
+            self.assertEqual(bulk_delete_articles(Article.objects.filter(slug="missing")), 0)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AttachmentDownloadTests(TestCase):
+    def setUp(self):
+        self.article = Article.objects.create(
+            title="ข่าว", slug="news", content="-", status=Article.PUBLISHED
+        )
+
+    def attach(self, name, file_type):
+        attachment = ArticleAttachment.objects.create(
+            article=self.article,
+            file=SimpleUploadedFile(name, b"0123456789"),
+            file_type=file_type,
+        )
+        return reverse("news:attachment_download", args=[attachment.pk])
+
+    def test_document_is_downloaded(self):
+        response = self.client.get(self.attach("report.pdf", ArticleAttachment.ARCICLE_FILE))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Disposition"].startswith("attachment"))
+
+    def test_video_plays_inline_with_range(self):
+        url = self.attach("clip.mp4", ArticleAttachment.ARCICLE_VIDEO)
+        response = self.client.get(url, headers={"Range": "bytes=2-4"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), b"234")
+        self.assertTrue(response["Content-Disposition"].startswith("inline"))
+
+    def test_draft_article_attachment_is_hidden(self):
+        url = self.attach("report.pdf", ArticleAttachment.ARCICLE_FILE)
+        Article.objects.filter(pk=self.article.pk).update(status=Article.DRAFT)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class NewsListViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Activities", slug="activities")
+        cls.tag = Tag.objects.create(name="Sport", slug="sport")
+        base = timezone.make_aware(datetime(2024, 6, 1, 12))
+        # ข่าวหลายข่าวเผยแพร่เวลาเดียวกัน เพื่อทดสอบการต่อหน้าด้วย id
+        cls.articles = Article.objects.bulk_create(
+            Article(
+                title=f"ข่าว {i}",
+                slug=f"news-{i}",
+                content="เนื้อหา",
+                status=Article.PUBLISHED,
+                publish_date=base - timedelta(days=i // 3),
+                category=cls.category if i % 2 else None,
+            )
+            for i in range(30)
+        )
+        cls.tag.articles.add(*cls.articles[:5])
+        Article.objects.create(title="ร่าง", slug="draft", content="-")
+        Article.objects.create(
+            title="อนาคต",
+            slug="future",
+            content="-",
+            status=Article.PUBLISHED,
+            publish_date=timezone.now() + timedelta(days=1),
+        )
+
+    def expected_titles(self, queryset):
+        return list(queryset.order_by("-publish_date", "-id").values_list("title", flat=True))
+
+    def walk(self, url):
+        titles, cursor = [], None
+        while True:
+            response = self.client.get(url, {"after": cursor} if cursor else {})
+            self.assertEqual(response.status_code, 200)
+            titles += [article.title for article in response.context["articles"]]
+            cursor = response.context["next_cursor"]
+            if not cursor:
+                return titles
+
+    def test_keyset_pages_cover_every_published_article_once(self):
+        titles = self.walk(reverse("news:article_list"))
+        self.assertEqual(
+            titles, self.expected_titles(Article.objects.filter(slug__startswith="news-"))
+        )
+
+    def test_deep_page_costs_the_same_as_first_page(self):
+        url = reverse("news:article_list")
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(url)
+        with CaptureQueriesContext(connection) as second:
+            self.client.get(url, {"after": response.context["next_cursor"]})
+        # ข่าว (พร้อม category/author) + แท็ก และไม่มี OFFSET
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 2)
+        self.assertNotIn("OFFSET", second[0]["sql"])
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse("news:article_list"), {"after": "nope"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_get(self):
+        url = reverse("news:article_list")
+        response = self.client.get(url)
+        self.assertIn("Last-Modified", response)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(2):  # ข่าว + แท็ก (อยู่ใน ETag) ไม่ render เมื่อตอบ 304
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Article.objects.filter(slug="news-0").update(updated_at=timezone.now())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_renamed_category_or_tag_changes_etag(self):
+        url = reverse("news:article_list")
+        for obj, name in ((self.category, "กิจกรรม"), (self.tag, "กีฬา")):
+            with self.subTest(obj._meta.model_name):
+                response = self.client.get(url)
+                obj.name = name
+                obj.save()
+                response = self.client.get(
+                    url,
+                    HTTP_IF_NONE_MATCH=response["ETag"],
+                    HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, name)
+
+    def test_category_tag_and_archive(self):
+        published = Article.objects.filter(slug__startswith="news-")
+        self.assertEqual(
+            self.walk(reverse("news:category_detail", args=["activities"])),
+            self.expected_titles(published.filter(category=self.category)),
+        )
+        self.assertEqual(
+            self.walk(reverse("news:tag_detail", args=["sport"])),
+            self.expected_titles(published.filter(tags=self.tag)),
+        )
+        self.assertEqual(
+            self.walk(reverse("news:article_archive_month", args=[2024, 5])),
+            self.expected_titles(published.filter(publish_date__month=5)),
+        )
+        response = self.client.get(reverse("news:article_archive_month", args=[2024, 13]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_detail_counts_view_and_supports_304(self):
+        counters._pending.clear()
+        counters._last_flush = time.monotonic()
+        article = Article.objects.get(slug="news-4")
+        url = article.get_absolute_url()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, article.title)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(counters.pending_views(article.pk), 2)
+
+        draft = Article.objects.get(slug="draft")
+        self.assertEqual(self.client.get(draft.get_absolute_url()).status_code, 404)
+
+    def test_detail_validator_follows_flushed_views(self):
+        counters._pending.clear()
+        counters._last_flush = time.monotonic()
+        url = Article.objects.get(slug="news-4").get_absolute_url()
+        response = self.client.get(url)
+        self.assertNotIn("Last-Modified", response)
+        etag = response["ETag"]
+
+        counters.flush_views()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "เข้าชม 2 ครั้ง")
+        self.assertNotEqual(response["ETag"], etag)
+        counters._pending.clear()
+
+    async def test_views_run_under_asgi(self):
+        article = await Article.objects.aget(slug="news-4")
+        for url in ("/news/", article.get_absolute_url()):
+            with self.subTest(url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, article.title)
+
+
+class ReplicaRoutingTests(ReplicaTestMixin, TransactionTestCase):
+    def setUp(self):
+        self.article = Article.objects.create(
+            title="ข่าวจาก replica",
+            slug="replica",
+            content="-",
+            status=Article.PUBLISHED,
+            publish_date=timezone.now() - timedelta(hours=1),
+        )
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as primary, self.captureReplicaQueries() as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        news = [q["sql"] for q in primary if "news_" in q["sql"]]
+        return response, news, len(replica)
+
+    def test_public_reads_go_to_replica(self):
+        for url in ("/news/", self.article.get_absolute_url()):
+            with self.subTest(url):
+                response, primary, replica = self.get(url)
+                self.assertContains(response, self.article.title)
+                self.assertEqual(primary, [])
+                self.assertGreater(replica, 0)
+        self.assertEqual(Article.objects.all().db, "default")  # นอก request อ่านจาก primary
+
+    async def test_async_views_read_from_replica(self):
+        # CaptureQueriesContext ใช้ใน async ไม่ได้ จึงตรวจที่การเลือก replica ของ router แทน
+        with mock.patch("core.routers.random.choice", return_value="replica") as choice:
+            response = await self.async_client.get("/news/")
+        self.assertContains(response, self.article.title)
+        self.assertTrue(choice.called)
+
+    def test_admin_and_recent_writers_read_from_primary(self):
+        get_user_model().objects.create_superuser("admin", "admin@example.com", "x")
+        response = self.client.post(
+            reverse("admin:login"), {"username": "admin", "password": "x"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.cookies[PIN_COOKIE]["max-age"], 10)
+
+        _, primary, replica = self.get(changelist_url(Article))
+        self.assertTrue(primary)
+        self.assertEqual(replica, 0)
+        _, primary, replica = self.get("/news/")  # ยังอยู่ในช่วงที่ถูกตรึงไว้กับ primary
+        self.assertTrue(primary)
+        self.assertEqual(replica, 0)
+
+        del self.client.cookies[PIN_COOKIE]
+        _, primary, replica = self.get("/news/")
+        self.assertEqual(primary, [])
+        self.assertGreater(replica, 0)
+
+
+class NewsQueryPlanTests(QueryPlanTestMixin, TestCase):
+    """query ของหน้าข่าวสาธารณะต้องใช้ index ไม่อ่านทั้งตาราง (EXPLAIN)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Activities", slug="activities")
+        cls.tag = Tag.objects.create(name="Sport", slug="sport")
+        base = timezone.make_aware(datetime(2024, 6, 1, 12))
+        cls.articles = Article.objects.bulk_create(
+            Article(
+                title=f"ข่าว {i}",
+                slug=f"news-{i}",
+                content="เนื้อหา",
+                status=Article.PUBLISHED,
+                publish_date=base - timedelta(days=i),
+                category=cls.category,
+            )
+            for i in range(15)
+        )
+        cls.tag.articles.add(*cls.articles)
+
+    def test_list_pages(self):
+        for url in (
+            reverse("news:article_list"),
+            reverse("news:category_detail", args=["activities"]),
+            reverse("news:article_archive_month", args=[2024, 5]),
+        ):
+            with self.subTest(url=url), self.assertNoSequentialScans():
+                response = self.client.get(url)
+            cursor = response.context["next_cursor"]
+            if cursor:
+                with self.subTest(url=url, page=2), self.assertNoSequentialScans():
+                    self.client.get(url, {"after": cursor})
+
+    def test_tag_page(self):
+        # หน้าแท็กเริ่มจากแถวของแท็กในตารางเชื่อม (ไม่ได้ไล่ index ของ publish_date)
+        with self.assertNoSequentialScans():
+            self.client.get(reverse("news:tag_detail", args=["sport"]))
+
+    def test_detail(self):
+        with self.assertNoSequentialScans():
+            response = self.client.get(self.articles[3].get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+
+
+class NewsAdminQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """หน้ารายการใน admin ต้องใช้จำนวน query คงที่ ไม่ว่าจะมีกี่แถว"""
+
+    def setUp(self):
+        self.user = self.login_admin()
+        self.created = 0
+
+    def next_range(self, count):
+        start, self.created = self.created, self.created + count
+        return range(start, start + count)
+
+    def create_articles(self, count):
+        n = self.created
+        category = Category.objects.create(name=f"หมวดของข่าว {n}", slug=f"news-category-{n}")
+        tag = Tag.objects.create(name=f"แท็กของข่าว {n}", slug=f"news-tag-{n}")
+        articles = Article.objects.bulk_create(
+            Article(
+                title=f"ข่าว {i}", slug=f"news-{i}", content="-", author=self.user, category=category
+            )
+            for i in self.next_range(count)
+        )
+        tag.articles.add(*articles)
+        return articles
+
+    def create_categories(self, count):
+        numbers = self.next_range(count)
+        categories = Category.objects.bulk_create(
+            Category(name=f"หมวด {i}", slug=f"category-{i}") for i in numbers
+        )
+        tags = Tag.objects.bulk_create(Tag(name=f"แท็ก {i}", slug=f"tag-{i}") for i in numbers)
+        articles = Article.objects.bulk_create(
+            Article(title="-", slug=f"in-{c.slug}", content="-", category=c) for c in categories
+        )
+        articles[0].tags.add(*tags)
+
+    def create_files(self, count):
+        # ชื่อไฟล์ที่ไม่ใช่รูป หน้ารายการจึงไม่ต้องสร้าง rendition ของไฟล์ที่ไม่มีอยู่จริง
+        articles = self.create_articles(count)
+        ArticleImage.objects.bulk_create(
+            ArticleImage(article=article, image=f"news/{article.pk}.bin") for article in articles
+        )
+        ArticleAttachment.objects.bulk_create(
+            ArticleAttachment(article=article, file=f"news/{article.pk}.pdf")
+            for article in articles
+        )
+
+    def test_article_changelist(self):
+        self.assertConstantQueries(changelist_url(Article), self.create_articles)
+
+    def test_category_changelist(self):
+        self.assertConstantQueries(changelist_url(Category), self.create_categories)
+
+    def test_tag_changelist(self):
+        self.assertConstantQueries(changelist_url(Tag), self.create_categories)
+
+    def test_image_changelist(self):
+        self.assertConstantQueries(changelist_url(ArticleImage), self.create_files)
+
+    def test_attachment_changelist(self):
+        self.assertConstantQueries(changelist_url(ArticleAttachment), self.create_files)
+
+
+class PublishedArticlesCountTests(TestCase):
+    def setUp(self):
+        self.news = Category.objects.create(name="ข่าว", slug="news")
+        self.events = Category.objects.create(name="กิจกรรม", slug="events")
+        self.sport, self.music = Tag.objects.bulk_create(
+            [Tag(name="กีฬา", slug="sport"), Tag(name="ดนตรี", slug="music")]
+        )
+
+    def create_article(self, slug, **kwargs):
+        kwargs.setdefault("status", Article.PUBLISHED)
+        return Article.objects.create(title=slug, slug=slug, content="-", **kwargs)
+
+    def assertCounts(self, categories, tags):
+        self.assertEqual(
+            dict(Category.objects.values_list("slug", "published_articles_count")), categories
+        )
+        self.assertEqual(dict(Tag.objects.values_list("slug", "published_articles_count")), tags)
+
+    def test_status_and_category_changes(self):
+        article = self.create_article("a", category=self.news)
+        article.tags.add(self.sport, self.music)
+        self.create_article("draft", category=self.news, status=Article.DRAFT).tags.add(
+            self.sport
+        )
+        self.assertCounts({"news": 1, "events": 0}, {"sport": 1, "music": 1})
+
+        article = Article.objects.get(pk=article.pk)
+        article.category = self.events
+        article.save()
+        self.assertCounts({"news": 0, "events": 1}, {"sport": 1, "music": 1})
+
+        article.status = Article.ARCHIVED
+        article.save()
+        self.assertCounts({"news": 0, "events": 0}, {"sport": 0, "music": 0})
+
+        article.status = Article.PUBLISHED
+        article.save()
+        article.delete()
+        self.assertCounts({"news": 0, "events": 0}, {"sport": 0, "music": 0})
+
+    def test_tag_changes_from_both_sides(self):
+        first = self.create_article("a")
+        second = self.create_article("b")
+        draft = self.create_article("c", status=Article.DRAFT)
+
+        first.tags.set([self.sport, self.music])
+        self.sport.articles.add(second, draft)
+        self.assertCounts({"news": 0, "events": 0}, {"sport": 2, "music": 1})
+
+        first.tags.remove(self.music)
+        self.sport.articles.remove(second)
+        self.assertCounts({"news": 0, "events": 0}, {"sport": 1, "music": 0})
+
+        second.tags.add(self.music)
+        self.sport.articles.clear()
+        second.tags.clear()
+        self.assertCounts({"news": 0, "events": 0}, {"sport": 0, "music": 0})
+
+    def test_bulk_delete(self):
+        for slug in ("a", "b"):
+            self.create_article(slug, category=self.news).tags.add(self.sport)
+        self.create_article("c", category=self.events)
+        bulk_delete_articles(Article.objects.filter(slug__in=["a", "c"]))
+        self.assertCounts({"news": 1, "events": 0}, {"sport": 1, "music": 0})
+
+    def test_save_with_deferred_fields_adjusts_without_reconcile(self):
+        article = self.create_article("a", category=self.news)
+        article.tags.add(self.sport)
+        article = Article.objects.defer("status", "category").get(pk=article.pk)
+        article.status = Article.DRAFT
+        with mock.patch.object(counters_module, "reconcile", side_effect=AssertionError):
+            article.save()
+        self.assertCounts({"news": 0, "events": 0}, {"sport": 0, "music": 0})
+
+    def test_reconcile_command(self):
+        self.create_article("a", category=self.news).tags.add(self.sport)
+        Article.objects.update(status=Article.DRAFT)  # ไม่ผ่าน signal
+        Tag.objects.filter(slug="music").update(published_articles_count=7)
+        out = io.StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("news.Tag.published_articles_count: แก้ 2 แถว", out.getvalue())
+        self.assertCounts({"news": 0, "events": 0}, {"sport": 0, "music": 0})
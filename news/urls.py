@@ -0,0 +1,18 @@
+from django.urls import path
+from . import views
+
+app_name = "news"
+
+urlpatterns = [
+    path("", views.article_list, name="article_list"),
+    path("category/<slug:slug>/", views.category_detail, name="category_detail"),
+    path("tag/<slug:slug>/", views.tag_detail, name="tag_detail"),
+    path("<int:year>/", views.article_archive, name="article_archive_year"),
+    path("<int:year>/<int:month>/", views.article_archive, name="article_archive_month"),
+    path(
+        "<int:year>/<int:month>/<int:day>/<slug:slug>/",
+        views.article_detail,
+        name="article_detail",
+    ),
+    path("attachments/<int:pk>/", views.attachment_download, name="attachment_download"),
+]
@@ -1,3 +1,207 @@
-from django.shortcuts import render
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from asgiref.sync import sync_to_async
+from django.db.models import Q, aprefetch_related_objects
+from django.http import Http404
+from django.shortcuts import aget_object_or_404, get_object_or_404, render
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from core.pagination import InvalidCursor, akeyset_paginate
+from mediafiles.delivery import serve
+from .counters import record_view
+from .models import Article, ArticleAttachment, Category, Tag
+
+ARTICLES_PER_PAGE = 12
+CACHE_MAX_AGE = 60  # วินาที
+
+
+def published_articles():
+    """ข่าวที่เผยแพร่แล้ว ไม่รวมข่าวที่ตั้งเวลาเผยแพร่ไว้ในอนาคต"""
+    return Article.objects.filter(published_now(), status=Article.PUBLISHED)
+
+
+def published_now():
+    return Q(publish_date__lte=timezone.now())
+
+
+async def conditional_render(request, template_name, context, etag, last_modified):
+    """
+    ตอบ 304 ถ้า ETag/Last-Modified ของ client ยังตรงกับข้อมูลปัจจุบัน มิฉะนั้น render เทมเพลต
+
+    ``context`` เป็น coroutine function จึงไม่ต้องโหลดข้อมูลที่ใช้เฉพาะตอน render (เช่น รูปและไฟล์แนบ)
+    เมื่อตอบ 304 ส่วนการ render ทำใน thread เพราะเทมเพลตอาจแตะฐานข้อมูล (เช่น ``user``)
+    """
+    etag = quote_etag(etag)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = await sync_to_async(render)(request, template_name, await context())
+    response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=CACHE_MAX_AGE)
+    return response
+
+
+async def article_list_response(request, queryset, heading, extra_context=None, bounds=None):
+    """
+    หน้ารายการข่าวที่เผยแพร่แล้วใน ``queryset`` แบบ keyset pagination (``?after=<cursor>``)
+    ใช้ index ``news_article_published_idx`` (หรือ ``news_article_category_idx``)
+
+    เงื่อนไขช่วงของ publish_date (ไม่เกินเวลาปัจจุบัน และ ``bounds``) ถูกส่งให้
+    keyset_paginate ต่อท้ายเงื่อนไขของ cursor
+
+    ETag คำนวณจาก id และ updated_at ของข่าวในหน้า รวมถึงหมวดหมู่และแท็กที่แสดง จึงเปลี่ยนทันที
+    เมื่อข่าวในหน้าถูกแก้ไข เพิ่ม ลบ เลิกเผยแพร่ หรือหมวดหมู่/แท็กถูกเปลี่ยนชื่อหรือเปลี่ยนแท็กของข่าว
+    """
+    cursor = request.GET.get("after")
+    try:
+        page = await akeyset_paginate(
+            queryset.filter(status=Article.PUBLISHED)
+            .select_related("category", "author")
+            .defer("content"),
+            ("-publish_date", "-id"),
+            cursor,
+            per_page=ARTICLES_PER_PAGE,
+            bounds=published_now() & (bounds or Q()),
+        )
+    except InvalidCursor:
+        raise Http404("ไม่พบหน้าที่ต้องการ")
+
+    # หมวดหมู่และแท็กที่แสดงในรายการ (ชื่อ/คำอธิบาย) ต้องอยู่ใน ETag ด้วย แท็กจึงถูกโหลดก่อนตอบ 304
+    await aprefetch_related_objects(page.items, "tags")
+    shown = [*page.items, (extra_context or {}).get("category")]
+    for article in page.items:
+        shown += [article.category, *article.tags.all()]
+    shown = [obj for obj in shown if obj is not None]
+    fingerprint = hashlib.md5(
+        "|".join(
+            [heading, cursor or "", page.next_cursor or ""]
+            + [
+                f"{obj._meta.model_name}:{obj.pk}:{obj.updated_at.isoformat()}"
+                for obj in shown
+            ]
+        ).encode()
+    ).hexdigest()
+    last_modified = max((obj.updated_at for obj in shown), default=None)
+
+    async def context():
+        return {
+            "articles": page.items,
+            "heading": heading,
+            "next_cursor": page.next_cursor,
+            "is_first_page": not cursor,
+            **(extra_context or {}),
+        }
+
+    return await conditional_render(
+        request, "news/article_list.html", context, fingerprint, last_modified
+    )
+
 
 # Create your views here.
+async def article_list(request):
+    return await article_list_response(request, Article.objects.all(), "ข่าวสารทั้งหมด")
+
+
+async def category_detail(request, slug):
+    category = await aget_object_or_404(Category, slug=slug)
+    return await article_list_response(
+        request,
+        Article.objects.filter(category=category),
+        f"หมวดหมู่: {category.name}",
+        {"category": category},
+    )
+
+
+async def tag_detail(request, slug):
+    tag = await aget_object_or_404(Tag, slug=slug)
+    return await article_list_response(
+        request,
+        Article.objects.filter(tags=tag),
+        f"แท็ก: {tag.name}",
+        {"tag": tag},
+    )
+
+
+def _aware(year, month=1, day=1):
+    try:
+        return timezone.make_aware(datetime(year, month, day))
+    except ValueError:
+        raise Http404("วันที่ไม่ถูกต้อง")
+
+
+async def article_archive(request, year, month=None):
+    """ข่าวตามปี หรือปี/เดือน (กรองเป็นช่วงเวลาเพื่อให้ใช้ index ของ publish_date ได้)"""
+    if month is None:
+        start, end = _aware(year), _aware(year + 1)
+        heading = f"ข่าวปี {year}"
+    else:
+        start = _aware(year, month)
+        end = _aware(year + 1) if month == 12 else _aware(year, month + 1)
+        heading = f"ข่าวเดือน {month}/{year}"
+    return await article_list_response(
+        request,
+        Article.objects.all(),
+        heading,
+        {"year": year, "month": month},
+        bounds=Q(publish_date__gte=start, publish_date__lt=end),
+    )
+
+
+async def article_detail(request, year, month, day, slug):
+    start = _aware(year, month, day)
+    article = await aget_object_or_404(
+        published_articles().select_related("category", "author"),
+        slug=slug,
+        publish_date__gte=start,
+        publish_date__lt=start + timedelta(days=1),
+    )
+    await sync_to_async(record_view)(article.pk)  # อาจ flush ยอดเข้าชมลงฐานข้อมูล
+
+    async def context():
+        tags, images, attachments = await asyncio.gather(
+            _alist(article.tags.all()),
+            _alist(article.images.all()),
+            _alist(article.attachments.all()),
+        )
+        return {
+            "article": article,
+            "tags": tags,
+            "images": images,
+            "attachments": attachments,
+        }
+
+    # หน้าข่าวแสดงยอดเข้าชม ETag จึงรวมยอดที่ flush แล้ว (เปลี่ยนอย่างน้อยทุก FLUSH_INTERVAL
+    # เมื่อมีคนเข้าชม) และไม่ส่ง Last-Modified เพราะ updated_at ไม่เปลี่ยนตามยอดเข้าชม
+    # client ที่ส่งแค่ If-Modified-Since จะได้ 304 พร้อมยอดเก่าไปตลอด
+    return await conditional_render(
+        request,
+        "news/article_detail.html",
+        context,
+        f"{article.pk}-{article.updated_at.timestamp()}-{article.views}",
+        None,
+    )
+
+
+async def _alist(queryset):
+    return [item async for item in queryset]
+
+
+def attachment_download(request, pk):
+    """ไฟล์แนบของข่าวที่เผยแพร่แล้ว วิดีโอและเสียงเปิดในหน้าเว็บ (เล่นแบบเลื่อนได้ด้วย Range)"""
+    attachment = get_object_or_404(
+        ArticleAttachment.objects.only("file", "name", "file_type"),
+        pk=pk,
+        article__in=published_articles(),
+    )
+    return serve(
+        request,
+        attachment.file.storage,
+        attachment.file.name,
+        as_attachment=attachment.file_type
+        not in (ArticleAttachment.ARCICLE_VIDEO, ArticleAttachment.ARCTICLE_AUDIO),
+        filename=attachment.name or None,
+    )
@@ -1,5 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from mediafiles.admin import image_job_status
+from search.admin import IndexedSearchMixin
 from django.contrib.auth.models import Group
 from .models import Category, Page, ContentSection, PageImage, PageFile
 
@@ -21,8 +23,8 @@ class ContentSectionInline(admin.TabularInline):
 class PageImageInline(admin.TabularInline):
     model = PageImage
     extra = 1
-    fields = ("order", "image_preview", "image", "caption")
-    readonly_fields = ("image_preview",)
+    fields = ("order", "image_preview", "image", "caption", "image_status")
+    readonly_fields = ("image_preview", "image_status")
     ordering = ("order",)
 
     def get_queryset(self, request):
@@ -35,12 +37,17 @@ class PageImageInline(admin.TabularInline):
         if obj.image:
             return format_html(
                 '<img src="{}" style="max-width: 100px; max-height: 100px;" />',
-                obj.image.url,
+                obj.renditions.thumb,
             )
         return "-"
 
     image_preview.short_description = "Preview"
 
+    def image_status(self, obj):
+        return image_job_status(obj, "image")
+
+    image_status.short_description = "สถานะการประมวลผลรูป"
+
 
 class PageFileInline(admin.TabularInline):
     model = PageFile
@@ -59,7 +66,7 @@ class CategoryAdmin(admin.ModelAdmin):
     list_display = (
         "name",
         "slug",
-        "page_count",
+        "published_pages_count",
     )
     search_fields = ("name",)
     prepopulated_fields = {"slug": ("name",)}
@@ -67,16 +74,9 @@ class CategoryAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         if not request.user.is_superuser:
-            qs = qs.filter(page__author=request.user).distinct()
+            qs = qs.filter(pages__author=request.user).distinct()
         return qs
 
-    def page_count(self, obj):
-        if not hasattr(obj, "page_count"):
-            obj._page_count = obj.pages.count()
-        return obj._page_count
-
-    page_count.short_description = "จำนวนหน้า"
-
     def save_model(self, request, obj, form, change):
         if not obj.created_by_id:
             obj.created_by = request.user
@@ -122,13 +122,14 @@ class CategoryAdmin(admin.ModelAdmin):
     author_display.short_description = "ผู้สร้าง"
 
 
-class PageAdmin(admin.ModelAdmin):
+class PageAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ("title", "get_category", "author", "is_published", "created_at")
+    list_select_related = ("category", "author")
     list_filter = ("category", "is_published", "created_at")
     search_fields = (
         "title",
-        "content_sections__content",
-    )  # ค้นหาจากเนื้อหาใน ContentSection
+        "sections__content",
+    )  # ค้นหาจากเนื้อหาใน ContentSection ผ่านดัชนีค้นหา (IndexedSearchMixin)
     prepopulated_fields = {"slug": ("title",)}
     readonly_fields = ("created_at", "updated_at", "author_display")
     inlines = [ContentSectionInline, PageImageInline, PageFileInline]
@@ -167,8 +168,7 @@ class PageAdmin(admin.ModelAdmin):
     def get_category(self, obj):
         return obj.category.name if obj.category else "-"
 
-    get_category.admin_order_field = "หมวดหมู่"
-
+    get_category.admin_order_field = "category__name"
     get_category.short_description = "หมวดหมู่"
 
     def get_queryset(self, request):
@@ -197,6 +197,7 @@ class PageAdmin(admin.ModelAdmin):
 
 class ContentSectionAdmin(admin.ModelAdmin):
     list_display = ("title", "page", "order")
+    list_select_related = ("page",)
     list_filter = ("page",)
     search_fields = ("title", "content")
     ordering = ("page", "order")
@@ -210,7 +211,8 @@ class ContentSectionAdmin(admin.ModelAdmin):
 
 class PageImageAdmin(admin.ModelAdmin):
     list_display = ("page", "order", "caption")
-    search_fields = ("page__category",)
+    list_select_related = ("page",)
+    search_fields = ("page__title", "caption")
     ordering = ("page", "order")
 
     def get_queryset(self, request):
@@ -222,6 +224,7 @@ class PageImageAdmin(admin.ModelAdmin):
 
 class PageFileAdmin(admin.ModelAdmin):
     list_display = ("title", "page", "file", "file_type", "download_link")
+    list_select_related = ("page",)
     list_filter = ("page__category",)
 
     def get_queryset(self, request):
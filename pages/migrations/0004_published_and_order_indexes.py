@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0003_contentsection_images'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contentsection',
+            index=models.Index(fields=['page', 'order'], name='pages_section_page_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-created_at'], name='pages_page_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['category'], name='pages_page_published_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagefile',
+            index=models.Index(fields=['page', 'order'], name='pages_file_page_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pageimage',
+            index=models.Index(fields=['page', 'order'], name='pages_image_page_order_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:22
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_published_pages(apps, schema_editor):
+    Category = apps.get_model("pages", "Category")
+    Page = apps.get_model("pages", "Page")
+    counts = (
+        Page.objects.filter(is_published=True, category__isnull=False)
+        .order_by()
+        .values("category")
+        .annotate(total=Count("pk"))
+        .values_list("category", "total")
+    )
+    for pk, total in counts:
+        Category.objects.filter(pk=pk).update(published_pages_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0004_published_and_order_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='published_pages_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='จำนวนหน้าที่เผยแพร่'),
+        ),
+        migrations.RunPython(count_published_pages, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,21 @@
 import os
 import uuid
 from django.db import models
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.text import slugify
 from django.dispatch import receiver
-from django.db.models.signals import pre_save, post_delete
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete
 from django.conf import settings
-from django.core.files.storage import default_storage
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from core import counters
+from core.oncommit import OnCommitBatch
+from core.tracking import FieldTrackingMixin
+from mediafiles.cleanup import delete_file_on_commit
+from mediafiles.jobs import image_processed, queue_image_job
+from mediafiles.renditions import Renditions
+from search.indexing import schedule_index
 
 User = get_user_model()
 
@@ -23,6 +31,10 @@ class Category(models.Model):
         max_length=100, unique=True, blank=True, verbose_name="Slug"
     )
     description = models.TextField(blank=True, null=True, verbose_name="คำอธิบาย")
+    # ปรับโดย signal ของ Page (ดู core/counters.py)
+    published_pages_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="จำนวนหน้าที่เผยแพร่"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="วันที่สร้าง")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="วันที่แก้ไข")
     created_by = models.ForeignKey(
@@ -49,12 +61,8 @@ class Category(models.Model):
     def get_absolute_url(self):
         return reverse("page_list_by_category", kwargs={"category_slug": self.slug})
 
-    @property
-    def published_pages_count(self):
-        return self.pages.filter(is_published=True).count()
-
 
-class Page(models.Model):
+class Page(FieldTrackingMixin, models.Model):
     """
     โมเดลสำหรับหน้าเนื้อหา
     """
@@ -88,10 +96,25 @@ class Page(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="วันที่สร้าง")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="วันที่แก้ไข")
 
+    tracked_fields = ("is_published", "category")
+
     class Meta:
         verbose_name = "หน้า"
         verbose_name_plural = "หน้า"
         ordering = ["-created_at"]
+        indexes = [
+            # หน้าที่เผยแพร่แล้ว (ล่าสุดก่อน) และจำนวนหน้าที่เผยแพร่ของแต่ละหมวดหมู่
+            models.Index(
+                fields=["-created_at"],
+                condition=models.Q(is_published=True),
+                name="pages_page_published_idx",
+            ),
+            models.Index(
+                fields=["category"],
+                condition=models.Q(is_published=True),
+                name="pages_page_published_cat_idx",
+            ),
+        ]
         permissions = [
             ("can_publish_page", "สามารถเผยแพร่หน้าได้"),
             ("can_edit_page", "สามารถแก้ไขหน้าได้"),
@@ -108,9 +131,29 @@ class Page(models.Model):
     def get_absolute_url(self):
         return reverse("page_detail", kwargs={"page_slug": self.slug})
 
-    @property
+    # โหลดส่วนเนื้อหามาพร้อมกันตอนทำดัชนีค้นหาหลายหน้า
+    search_prefetch = ("sections",)
+
+    def search_document(self):
+        """ข้อมูลสำหรับดัชนีค้นหา (search/indexing.py) รวมเนื้อหาทุกส่วนของหน้า"""
+        body = [self.meta_description or ""]
+        for section in self.sections.all():
+            body += [section.title or "", section.content or ""]
+        return {
+            "title": self.title,
+            "body": "\n".join(body),
+            "is_public": self.is_published,
+            "published_at": self.created_at,
+        }
+
+    @cached_property
     def main_image(self):
-        """รูปภาพหลักของหน้า (รูปแรกที่ถูกอัปโหลด)"""
+        """
+        รูปภาพหลักของหน้า (รูปแรกตามลำดับ) ใช้รูปที่โหลดไว้แล้วถ้ามี
+        (``Prefetch("images", ..., to_attr="main_images")`` หรือ prefetch ``images`` ทั้งหมด)
+        """
+        if hasattr(self, "main_images"):
+            return self.main_images[0] if self.main_images else None
         return self.images.first()
 
 
@@ -122,7 +165,7 @@ def get_upload_path(instance, filename):
     ext = os.path.splitext(filename)[1].lower()
     original_filename = os.path.splitext(filename)[0]
     new_filename = f"{uuid.uuid4()}_{original_filename}{ext}"
-    return f"pages/{instance.page.id}/{instance.file_type}/{new_filename}"
+    return f"pages/{instance.page_id}/{instance.file_type}/{new_filename}"
 
 
 class ContentSection(models.Model):
@@ -151,12 +194,15 @@ class ContentSection(models.Model):
         ordering = ["order"]
         verbose_name = "ส่วนเนื้อหา"
         verbose_name_plural = "ส่วนเนื้อหา"
+        indexes = [
+            models.Index(fields=["page", "order"], name="pages_section_page_order_idx"),
+        ]
 
     def __str__(self):
         return f"{self.page.title} - ส่วนที่ {self.order}"
 
 
-class PageImage(models.Model):
+class PageImage(FieldTrackingMixin, models.Model):
     """
     รูปภาพที่เกี่ยวข้องกับหน้า
     """
@@ -179,32 +225,36 @@ class PageImage(models.Model):
         max_length=50, default="image", editable=False, verbose_name="ประเภทไฟล์"
     )
 
+    tracked_fields = ("image",)
+
     class Meta:
         verbose_name = "รูปภาพหน้า"
         verbose_name_plural = "รูปภาพหน้า"
         ordering = ["order"]
+        indexes = [
+            models.Index(fields=["page", "order"], name="pages_image_page_order_idx"),
+        ]
 
     def __str__(self):
         return f"ภาพสำหรับ {self.page.title} - {self.caption or 'ไม่มีคำบรรยาย'}"
 
     def save(self, *args, **kwargs):
         # บันทึกชื่อไฟล์เดิมเมื่อสร้าง หรือ อัปเดตรูปภาพ
-        if self.image and not self.original_filename:
+        if self.image and (not self.original_filename or self.has_changed("image")):
             self.original_filename = os.path.basename(self.image.name)
 
-        # ตรวจสอบว่ามีการเปลี่ยนแปลงไฟล์หรือไม่
-        if self.pk:
-            old_instance = PageImage.objects.get(pk=self.pk)
-            if old_instance.image != self.image:
-                self.delete_file(old_instance.image)
-
+        # การลบไฟล์เดิมเมื่อเปลี่ยนรูปอยู่ใน page_image_pre_save
         self.file_type = "image"
         super().save(*args, **kwargs)
 
     def delete_file(self, file_field):
-        """ลบไฟล์ออกจากระบบไฟล์"""
-        if file_field and default_storage.exists(file_field.name):
-            default_storage.delete(file_field.name)
+        """ลบไฟล์ออกจากระบบไฟล์ (หลัง transaction commit)"""
+        delete_file_on_commit(file_field)
+
+    @property
+    def renditions(self):
+        """รูปย่อของรูปภาพ เช่น ``image.renditions.card``"""
+        return Renditions(self.image)
 
     @property
     def filename(self):
@@ -219,7 +269,7 @@ class PageImage(models.Model):
         return os.path.basename(self.image.name)
 
 
-class PageFile(models.Model):
+class PageFile(FieldTrackingMixin, models.Model):
     """
     ไฟล์แนบของหน้า (สำหรับดาวน์โหลด)
     """
@@ -246,32 +296,31 @@ class PageFile(models.Model):
         max_length=50, default="file", editable=False, verbose_name="ประเภทไฟล์"
     )
 
+    tracked_fields = ("file",)
+
     class Meta:
         verbose_name = "ไฟล์ดาว์นโหลด"
         verbose_name_plural = "ไฟล์ดาว์นโหลด"
         ordering = ["order"]
+        indexes = [
+            models.Index(fields=["page", "order"], name="pages_file_page_order_idx"),
+        ]
 
     def __str__(self):
         return f"{self.page.title} - {self.title or 'ไม่มีชื่อไฟล์'}"
 
     def save(self, *args, **kwargs):
         # บันทึกชื่อไฟล์เดิมเมื่อสร้าง หรือ อัปเดตไฟล์
-        if self.file and not self.original_filename:
+        if self.file and (not self.original_filename or self.has_changed("file")):
             self.original_filename = os.path.basename(self.file.name)
 
-        # ตรวจสอบว่ามีการเปลี่ยนแปลงไฟล์หรือไม่
-        if self.pk:
-            old_instance = PageFile.objects.get(pk=self.pk)
-            if old_instance.file != self.file:
-                self.delete_file(old_instance.file)
-
+        # การลบไฟล์เดิมเมื่อเปลี่ยนไฟล์อยู่ใน page_file_pre_save
         self.file_type = "file"
         super().save(*args, **kwargs)
 
     def delete_file(self, file_field):
-        """ลบไฟล์ออกจากระบบไฟล์"""
-        if file_field and default_storage.exists(file_field.name):
-            default_storage.delete(file_field.name)
+        """ลบไฟล์ออกจากระบบไฟล์ (หลัง transaction commit)"""
+        delete_file_on_commit(file_field)
 
     def get_file_extension(self):
         """ดึงนามสกุลไฟล์"""
@@ -290,9 +339,15 @@ class PageFile(models.Model):
         return os.path.basename(self.file.name)
 
     def increment_download_count(self):
-        """เพิ่มจำนวนดาวน์โหลดเมื่อมีการดาวน์โหลดไฟล์"""
-        self.download_count += 1
-        self.save(update_fields=["download_count"])
+        """
+        เพิ่มจำนวนดาวน์โหลดเมื่อมีการดาวน์โหลดไฟล์
+
+        ใช้ UPDATE ... SET download_count = download_count + 1 โดยตรง จึงไม่เสียยอด
+        เมื่อดาวน์โหลดพร้อมกัน และไม่ผ่าน save()/pre_save ที่ตรวจการเปลี่ยนไฟล์
+        """
+        PageFile.objects.filter(pk=self.pk).update(
+            download_count=models.F("download_count") + 1
+        )
 
 
 # Signal handlers to delete files when model instances are deleted
@@ -303,13 +358,19 @@ def page_image_pre_save(sender, instance, **kwargs):
     """
     ตรวจสอบการเปลี่ยนไฟล์รูปก่อนบันทึก PageImage
     """
-    if instance.pk:
-        try:
-            old_instance = PageImage.objects.get(pk=instance.pk)
-            if old_instance.image != instance.image:
-                old_instance.delete_file(old_instance.image)
-        except PageImage.DoesNotExist:
-            pass
+    # เทียบกับชื่อไฟล์ที่จำไว้ตอนโหลด จึงไม่ต้อง SELECT instance เดิม
+    old_image = instance.replaced_file("image")
+    if old_image:
+        instance.delete_file(old_image)
+
+
+@receiver(post_save, sender=PageImage)
+def page_image_post_save(sender, instance, created, **kwargs):
+    """
+    ส่งรูปที่อัปโหลดใหม่ไปย่อขนาดและสร้าง rendition นอก request
+    """
+    if created or instance.has_changed("image"):
+        queue_image_job(instance, "image", max_width=1920)
 
 
 @receiver(pre_save, sender=PageFile)
@@ -317,13 +378,10 @@ def page_file_pre_save(sender, instance, **kwargs):
     """
     ตรวจสอบการเปลี่ยนไฟล์ก่อนบันทึก PageFile
     """
-    if instance.pk:
-        try:
-            old_instance = PageFile.objects.get(pk=instance.pk)
-            if old_instance.file != instance.file:
-                old_instance.delete_file(old_instance.file)
-        except PageFile.DoesNotExist:
-            pass
+    # เทียบกับชื่อไฟล์ที่จำไว้ตอนโหลด จึงไม่ต้อง SELECT instance เดิม
+    old_file = instance.replaced_file("file")
+    if old_file:
+        instance.delete_file(old_file)
 
 
 @receiver(post_delete, sender=PageImage)
@@ -342,11 +400,114 @@ def page_file_post_delete(sender, instance, **kwargs):
     instance.delete_file(instance.file)
 
 
+@receiver(post_save, sender=Page)
+def page_post_save(sender, instance, **kwargs):
+    """
+    ปรับดัชนีค้นหาเมื่อ Page ถูกบันทึก
+    """
+    schedule_index(sender, instance.pk)
+
+
+category_pages_counter = counters.register_counter(
+    Category, "published_pages_count", Page.objects.filter(is_published=True), "category"
+)
+
+# ฟิลด์ที่มีผลกับตัวนับ (save() ของ instance ที่มีฟิลด์ถูก defer ส่ง update_fields เป็นชื่อคอลัมน์)
+COUNTED_FIELDS = {"is_published", "category", "category_id"}
+
+
+@receiver(pre_save, sender=Page)
+def page_counters_pre_save(sender, instance, using, update_fields=None, **kwargs):
+    """
+    อ่านสถานะ/หมวดหมู่เดิมของแถวนี้ถ้าไม่ได้จำไว้ตอนโหลด (ไม่ต้องคำนวณตัวนับใหม่ทั้งตาราง)
+    """
+    if update_fields is not None and not COUNTED_FIELDS & set(update_fields):
+        return
+    instance.load_originals("is_published", "category", using=using)
+
+
+@receiver(post_save, sender=Page)
+def page_counters(sender, instance, created, update_fields=None, **kwargs):
+    """
+    ปรับจำนวนหน้าที่เผยแพร่ของหมวดหมู่เมื่อสถานะหรือหมวดหมู่ของหน้าเปลี่ยน
+    """
+    if update_fields is not None and not COUNTED_FIELDS & set(update_fields):
+        return
+    if created:
+        was_published, old_category = False, None
+    else:
+        # ค่าที่จำไว้ตอนโหลด หรือที่ page_counters_pre_save อ่านมา
+        was_published = instance.get_original("is_published", False)
+        old_category = instance.get_original("category")
+    deltas = {}
+    if was_published:
+        deltas[old_category] = deltas.get(old_category, 0) - 1
+    if instance.is_published:
+        deltas[instance.category_id] = deltas.get(instance.category_id, 0) + 1
+    counters.adjust(Category, "published_pages_count", deltas)
+
+
+@receiver(post_save, sender=ContentSection)
+@receiver(post_delete, sender=ContentSection)
+def content_section_changed(sender, instance, **kwargs):
+    """
+    เนื้อหาส่วนย่อยเป็นส่วนหนึ่งของเอกสารค้นหาของหน้า
+    """
+    schedule_index(Page, instance.page_id)
+
+
+_touched = OnCommitBatch(
+    lambda page_ids: Page.objects.filter(pk__in=page_ids).update(updated_at=timezone.now())
+)
+
+
+def touch_page(page_id):
+    """
+    เลื่อน ``updated_at`` ของหน้าหลัง transaction commit (cache ของหน้าเว็บใช้ค่านี้เป็น key
+    ดู pages/views.py) หลายส่วนของหน้าเดียวกันใน transaction เดียวทำครั้งเดียว
+    """
+    _touched.add(page_id)
+
+
+@receiver(post_save, sender=ContentSection)
+@receiver(post_delete, sender=ContentSection)
+@receiver(post_save, sender=PageImage)
+@receiver(post_delete, sender=PageImage)
+@receiver(post_save, sender=PageFile)
+@receiver(post_delete, sender=PageFile)
+def page_part_changed(sender, instance, **kwargs):
+    """
+    ส่วนเนื้อหา รูป และไฟล์แสดงอยู่ในหน้าเว็บของหน้า
+    """
+    touch_page(instance.page_id)
+
+
+@receiver(image_processed, sender=PageImage)
+def page_image_processed(sender, object_id, **kwargs):
+    """
+    งานย่อรูปเปลี่ยนไฟล์ของรูป (ด้วย update() ที่ไม่ส่ง post_save) หรือสร้าง rendition เสร็จ
+    """
+    touch_page(PageImage.objects.filter(pk=object_id).values_list("page_id", flat=True).first())
+
+
+@receiver(m2m_changed, sender=ContentSection.images.through)
+def section_images_changed(sender, instance, action, **kwargs):
+    """
+    รูปประกอบของส่วนเนื้อหาเปลี่ยน (ทั้งจากฝั่งส่วนเนื้อหาและฝั่งรูป อยู่ในหน้าเดียวกัน)
+    """
+    if action in ("post_add", "post_remove", "post_clear"):
+        touch_page(instance.page_id)
+
+
 @receiver(post_delete, sender=Page)
 def page_post_delete(sender, instance, **kwargs):
     """
-    ลบไฟล์และรูปภาพที่เกี่ยวข้องเมื่อ Page ถูกลบ
+    ลบไฟล์และรูปภาพที่เกี่ยวข้องเมื่อ Page ถูกลบ และลดจำนวนหน้าที่เผยแพร่ของหมวดหมู่
     """
+    if instance.get_original("is_published", instance.is_published):
+        category_id = instance.get_original("category", instance.category_id)
+        counters.adjust(Category, "published_pages_count", {category_id: -1})
+    schedule_index(sender, instance.pk)
     # ลบรูปภาพที่เกี่ยวข้อง
     for image in instance.images.all():
         image.delete_file(image.image)
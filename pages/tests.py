@@ -1,3 +1,368 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.http import Http404
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+from core.counters import reconcile
+from core.testing import QueryBudgetTestMixin, QueryPlanTestMixin, changelist_url
+from mediafiles import cleanup
+from mediafiles.jobs import run_pending
+from .models import Category, ContentSection, Page, PageFile, PageImage, category_pages_counter
+from .views import download_file
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
 
 # Create your tests here.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PageFileDownloadTests(TestCase):
+    def setUp(self):
+        self.page = Page.objects.create(title="หน้า", slug="page")
+        self.page_file = PageFile.objects.create(
+            page=self.page,
+            title="เอกสาร",
+            file=SimpleUploadedFile("report.pdf", b"%PDF-1.4 test"),
+        )
+
+    def get(self, pk, **headers):
+        request = RequestFactory().get(f"/pages/files/{pk}/download/", headers=headers)
+        return download_file(request, pk)
+
+    def test_download_streams_file_and_counts(self):
+        # SELECT ไฟล์ + UPDATE ตัวนับ โดยไม่มี SELECT ซ้ำจาก save()/pre_save
+        with self.assertNumQueries(2):
+            response = self.get(self.page_file.pk)
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.4 test")
+        self.assertIn("report.pdf", response["Content-Disposition"])
+        self.page_file.refresh_from_db()
+        self.assertEqual(self.page_file.download_count, 1)
+
+    def test_resumed_download_is_not_counted_again(self):
+        response = self.get(self.page_file.pk, Range="bytes=5-")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), b"1.4 test")
+        self.assertEqual(self.get(self.page_file.pk, Range="bytes=0-").status_code, 206)
+        self.page_file.refresh_from_db()
+        self.assertEqual(self.page_file.download_count, 1)
+
+    def test_unpublished_page_is_not_served(self):
+        Page.objects.filter(pk=self.page.pk).update(is_published=False)
+        with self.assertRaises(Http404):
+            self.get(self.page_file.pk)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class FileReplacementSaveTests(TestCase):
+    def setUp(self):
+        page = Page.objects.create(title="หน้า", slug="page")
+        PageImage.objects.create(
+            page=page, image=SimpleUploadedFile("image.jpg", b"image")
+        )
+        PageFile.objects.create(
+            page=page, title="ไฟล์", file=SimpleUploadedFile("file.pdf", b"file")
+        )
+        self.image = PageImage.objects.get(page=page)
+        self.page_file = PageFile.objects.get(page=page)
+
+    def assertSingleUpdate(self, instance, stored_file=False, queued_job=False):
+        with CaptureQueriesContext(connection) as queries:
+            instance.save()
+        sql = [q["sql"] for q in queries]
+        if stored_file:
+            # ไฟล์ใหม่ถูกนับใน storage แบบ content-addressed ด้วย upsert หนึ่ง query
+            self.assertIn("mediafiles_blob", sql.pop(0))
+        if queued_job:
+            # รูปใหม่ได้งานประมวลผลรูปเพิ่มอีกหนึ่ง INSERT
+            self.assertIn("mediafiles_imagejob", sql.pop())
+        self.assertEqual(len(sql), 1, sql)
+        self.assertTrue(sql[0].startswith("UPDATE"))
+
+    def test_save_without_file_change_runs_single_update(self):
+        self.image.caption = "คำบรรยาย"
+        self.page_file.title = "ไฟล์ใหม่"
+        self.assertSingleUpdate(self.image)
+        self.assertSingleUpdate(self.page_file)
+
+    def test_replacing_files_removes_old_files(self):
+        for instance, field, filename in [
+            (self.image, "image", "new.jpg"),
+            (self.page_file, "file", "new.pdf"),
+        ]:
+            old_path = getattr(instance, field).path
+            setattr(instance, field, SimpleUploadedFile(filename, b"new"))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertSingleUpdate(
+                    instance, stored_file=True, queued_job=field == "image"
+                )
+            cleanup.wait()
+            self.assertFalse(os.path.exists(old_path), field)
+            self.assertEqual(instance.original_filename, filename)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+@skipUnlessDBFeature("test_db_allows_multiple_connections")
+class PageFileConcurrentDownloadTests(TransactionTestCase):
+    DOWNLOADS = 50
+
+    def test_concurrent_downloads_are_counted_exactly(self):
+        page = Page.objects.create(title="หน้า", slug="page")
+        page_file = PageFile.objects.create(
+            page=page,
+            title="เอกสาร",
+            file=SimpleUploadedFile("report.pdf", b"%PDF-1.4 test"),
+        )
+
+        def download(_):
+            try:
+                response = download_file(RequestFactory().get("/"), page_file.pk)
+                response.close()
+                return response.status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            statuses = list(pool.map(download, range(self.DOWNLOADS)))
+
+        self.assertEqual(statuses, [200] * self.DOWNLOADS)
+        page_file.refresh_from_db()
+        self.assertEqual(page_file.download_count, self.DOWNLOADS)
+
+
+class PageQueryPlanTests(QueryPlanTestMixin, TestCase):
+    """query ของหน้าเนื้อหาสาธารณะต้องใช้ index ไม่อ่านทั้งตาราง (EXPLAIN)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="หลักสูตร", slug="courses")
+        cls.page = Page.objects.create(title="หน้า", slug="page", category=cls.category)
+        Page.objects.create(title="ร่าง", slug="draft", is_published=False)
+        ContentSection.objects.bulk_create(
+            ContentSection(page=cls.page, title=f"ส่วน {i}", order=i) for i in range(3)
+        )
+
+    def test_published_pages(self):
+        self.assertQueryUsesIndex(Page.objects.filter(is_published=True)[:10])
+        self.assertQueryUsesIndex(self.category.pages.filter(is_published=True))
+
+    def test_page_children_in_order(self):
+        with self.assertNoSequentialScans():
+            Page.objects.get(slug="page")
+            self.page.main_image
+            list(self.page.sections.all())
+            list(self.page.files.all())
+
+
+class PageAdminQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """หน้ารายการใน admin ต้องใช้จำนวน query คงที่ ไม่ว่าจะมีกี่แถว"""
+
+    def setUp(self):
+        self.user = self.login_admin()
+        self.created = 0
+
+    def create_pages(self, count):
+        start, self.created = self.created, self.created + count
+        categories = Category.objects.bulk_create(
+            Category(name=f"หมวด {i}", slug=f"category-{i}") for i in range(start, start + count)
+        )
+        pages = Page.objects.bulk_create(
+            Page(title=f"หน้า {i}", slug=f"page-{i}", category=category, author=self.user)
+            for i, category in enumerate(categories, start)
+        )
+        ContentSection.objects.bulk_create(ContentSection(page=page, title="ส่วน") for page in pages)
+        # ชื่อไฟล์ที่ไม่ใช่รูป หน้ารายการจึงไม่ต้องสร้าง rendition ของไฟล์ที่ไม่มีอยู่จริง
+        PageImage.objects.bulk_create(PageImage(page=page, image="pages/x.bin") for page in pages)
+        PageFile.objects.bulk_create(PageFile(page=page, file="pages/x.pdf") for page in pages)
+
+    def test_category_changelist(self):
+        self.assertConstantQueries(changelist_url(Category), self.create_pages)
+
+    def test_page_changelist(self):
+        self.assertConstantQueries(changelist_url(Page), self.create_pages)
+
+    def test_section_changelist(self):
+        self.assertConstantQueries(changelist_url(ContentSection), self.create_pages)
+
+    def test_image_changelist(self):
+        self.assertConstantQueries(changelist_url(PageImage), self.create_pages)
+
+    def test_file_changelist(self):
+        self.assertConstantQueries(changelist_url(PageFile), self.create_pages)
+
+
+class PublishedPagesCountTests(TestCase):
+    def setUp(self):
+        self.news, self.events = Category.objects.bulk_create(
+            [Category(name="ข่าว", slug="news"), Category(name="กิจกรรม", slug="events")]
+        )
+
+    def assertCounts(self, news, events):
+        counts = dict(Category.objects.values_list("slug", "published_pages_count"))
+        self.assertEqual(counts, {"news": news, "events": events})
+
+    def test_counter_follows_status_category_and_delete(self):
+        page = Page.objects.create(title="หน้า 1", slug="p1", category=self.news)
+        Page.objects.create(title="ร่าง", slug="p2", category=self.news, is_published=False)
+        self.assertCounts(1, 0)
+
+        page.category = self.events
+        page.save()
+        self.assertCounts(0, 1)
+
+        page = Page.objects.get(pk=page.pk)
+        page.is_published = False
+        page.save()
+        self.assertCounts(0, 0)
+
+        page.is_published = True
+        page.save()
+        page.delete()
+        self.assertCounts(0, 0)
+
+    def test_save_of_unloaded_instance_reads_only_its_row(self):
+        page = Page.objects.create(title="หน้า", slug="p", category=self.news)
+        page = Page.objects.defer("is_published", "category").get(pk=page.pk)
+        page.category = self.events
+        with CaptureQueriesContext(connection) as queries:
+            page.save()
+        self.assertCounts(0, 1)
+        # อ่านค่าเดิมของแถวนี้แถวเดียว ไม่คำนวณตัวนับใหม่ทั้งตาราง (GROUP BY)
+        self.assertFalse(any("GROUP BY" in q["sql"] for q in queries))
+
+    def test_save_without_change_does_not_update_counter(self):
+        page = Page.objects.create(title="หน้า", slug="p", category=self.news)
+        page.title = "หน้าใหม่"
+        with CaptureQueriesContext(connection) as queries:
+            page.save()
+        self.assertFalse(any("pages_category" in q["sql"] for q in queries))
+
+    def test_reconcile_fixes_drift(self):
+        Page.objects.create(title="หน้า", slug="p", category=self.news)
+        Page.objects.filter(slug="p").update(category=self.events)  # ไม่ผ่าน signal
+        self.assertCounts(1, 0)
+        with self.assertNumQueries(3):  # นับแบบ GROUP BY, อ่านตัวนับ, bulk_update
+            self.assertEqual(reconcile(category_pages_counter), 2)
+        self.assertCounts(0, 1)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PageViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="หลักสูตร", slug="courses")
+        cls.page = Page.objects.create(title="หลักสูตรใหม่", slug="new-course", category=cls.category)
+        Page.objects.create(title="ร่าง", slug="draft", category=cls.category, is_published=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def add_sections(self, page, count):
+        # ชื่อไฟล์ที่ไม่ใช่รูป จึงไม่ต้องสร้าง rendition ของไฟล์ที่ไม่มีอยู่จริง
+        start = page.sections.count()
+        sections = ContentSection.objects.bulk_create(
+            ContentSection(page=page, title=f"ส่วนที่ {i}", content=f"<p>เนื้อหา {i}</p>", order=i)
+            for i in range(start, start + count)
+        )
+        images = PageImage.objects.bulk_create(
+            PageImage(page=page, image=f"pages/{i}.bin", caption=f"รูป {i}", order=i)
+            for i in range(start, start + count)
+        )
+        ContentSection.images.through.objects.bulk_create(
+            ContentSection.images.through(contentsection=section, pageimage=image)
+            for section, image in zip(sections, images)
+        )
+        PageFile.objects.bulk_create(
+            PageFile(page=page, file=f"pages/{i}.pdf", title=f"ไฟล์ {i}", order=i)
+            for i in range(start, start + count)
+        )
+
+    def test_detail_uses_at_most_five_queries_for_any_number_of_sections(self):
+        url = self.page.get_absolute_url()
+        counts = []
+        for sections in (1, 20):
+            self.add_sections(self.page, sections)
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            counts.append(len(queries))
+        self.assertLessEqual(max(counts), 5)
+        self.assertEqual(counts[0], counts[1])
+        self.assertContains(response, "ส่วนที่ 20")
+        self.assertContains(response, "รูป 20")
+        self.assertContains(response, reverse("page_file_download", args=[self.page.files.last().pk]))
+
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_detail_cache_follows_page_parts(self):
+        self.add_sections(self.page, 1)
+        url = self.page.get_absolute_url()
+        self.assertContains(self.client.get(url), "เนื้อหา 0")
+        section = self.page.sections.get()
+        section.content = "<p>แก้แล้ว</p>"
+        with self.captureOnCommitCallbacks(execute=True):
+            section.save()
+        self.assertContains(self.client.get(url), "แก้แล้ว")
+
+        image = PageImage.objects.get(page=self.page)
+        self.assertContains(self.client.get(url), "pages/0.bin\" loading")
+        with self.captureOnCommitCallbacks(execute=True):
+            section.images.remove(image)
+        self.assertNotContains(self.client.get(url), "pages/0.bin\" loading")
+
+    def test_detail_cache_follows_image_worker(self):
+        url = self.page.get_absolute_url()
+        buffer = io.BytesIO()
+        Image.new("RGB", (2400, 600), "teal").save(buffer, format="JPEG")
+        with self.captureOnCommitCallbacks(execute=True):
+            image = PageImage.objects.create(
+                page=self.page, image=SimpleUploadedFile("wide.jpg", buffer.getvalue())
+            )
+        old_stem = os.path.splitext(image.image.name)[0]
+        self.assertContains(self.client.get(url), old_stem)
+
+        # worker ชี้ฟิลด์ไปยังรูปที่ย่อแล้วด้วย update() และลบไฟล์เดิมหลัง commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(run_pending(), 1)
+        image.refresh_from_db()
+        new_stem = os.path.splitext(image.image.name)[0]
+        response = self.client.get(url)
+        self.assertNotContains(response, old_stem)
+        self.assertContains(response, f"{new_stem}.hero.webp")
+
+    def test_unpublished_and_unknown_pages_are_not_found(self):
+        self.assertEqual(self.client.get(reverse("page_detail", args=["draft"])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("page_detail", args=["missing"])).status_code, 404)
+
+    def test_category_list_loads_main_images_in_one_query(self):
+        for i in range(5):
+            page = Page.objects.create(title=f"หน้า {i}", slug=f"page-{i}", category=self.category)
+            PageImage.objects.bulk_create(
+                PageImage(page=page, image=f"pages/{i}-{order}.bin", order=order)
+                for order in (2, 1)
+            )
+        url = self.category.get_absolute_url()
+        with self.assertNumQueries(3):  # หมวดหมู่ หน้า และรูปหลัก
+            response = self.client.get(url)
+        self.assertContains(response, "pages/4-1.bin")
+        self.assertNotContains(response, "pages/4-2.bin")
+        self.assertNotContains(response, "ร่าง")
+        with self.assertNumQueries(2):
+            self.client.get(url)
@@ -0,0 +1,16 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path(
+        "files/<int:pk>/download/",
+        views.download_file,
+        name="page_file_download",
+    ),
+    path(
+        "category/<slug:category_slug>/",
+        views.page_list_by_category,
+        name="page_list_by_category",
+    ),
+    path("<slug:page_slug>/", views.page_detail, name="page_detail"),
+]
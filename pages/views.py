@@ -1,3 +1,140 @@
-from django.shortcuts import render
+import hashlib
+from django.core.cache import cache
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import Http404
+from django.shortcuts import get_object_or_404, render
+from django.template.loader import render_to_string
+from core.pagination import InvalidCursor, keyset_paginate
+from mediafiles.delivery import is_resumed, serve
+from .models import Category, ContentSection, Page, PageFile, PageImage
+
+PAGES_PER_PAGE = 12
+RENDER_CACHE_TIMEOUT = 60 * 60 * 24  # key เปลี่ยนเองเมื่อหน้าถูกแก้ไข ค่านี้แค่เก็บกวาด key เก่า
+
+
+def page_prefetches():
+    """ส่วนเนื้อหา (พร้อมรูปของแต่ละส่วน) รูป และไฟล์ของหน้า ตามลำดับที่แสดง ทั้งหมด 4 query"""
+    images = PageImage.objects.order_by("order", "pk")
+    return [
+        Prefetch(
+            "sections",
+            queryset=ContentSection.objects.order_by("order", "pk").prefetch_related(
+                Prefetch("images", queryset=images)
+            ),
+        ),
+        Prefetch("images", queryset=images),
+        Prefetch("files", queryset=PageFile.objects.order_by("order", "pk")),
+    ]
+
+
+def cached_render(key, template_name, context, load):
+    """
+    HTML ของ ``template_name`` จาก cache ถ้าไม่มีเรียก ``load()`` (โหลดข้อมูลที่ใช้เฉพาะตอน render)
+    แล้ว render และเก็บไว้ เทมเพลตต้องไม่ขึ้นกับผู้ใช้หรือ request
+    """
+    html = cache.get(key)
+    if html is None:
+        load()
+        html = render_to_string(template_name, context)
+        cache.set(key, html, RENDER_CACHE_TIMEOUT)
+    return html
+
 
 # Create your views here.
+def page_detail(request, page_slug):
+    """
+    หน้าเนื้อหาที่เผยแพร่แล้ว
+
+    เนื้อหาที่ render แล้วถูก cache ตาม ``updated_at`` ของหน้าและหมวดหมู่ (ส่วนเนื้อหา รูป และไฟล์
+    ที่เปลี่ยนจะเลื่อน ``updated_at`` ของหน้า ดู ``touch_page``) cache hit ใช้ 1 query
+    cache miss ใช้ไม่เกิน 5 query ไม่ว่าหน้าจะมีกี่ส่วน
+    """
+    page = get_object_or_404(
+        Page.objects.filter(is_published=True).select_related("category", "author"),
+        slug=page_slug,
+    )
+    key = ":".join(
+        [
+            "pages:page",
+            str(page.pk),
+            page.updated_at.isoformat(),
+            page.category.updated_at.isoformat() if page.category else "",
+        ]
+    )
+    content = cached_render(
+        key,
+        "pages/page_content.html",
+        {"page": page},
+        lambda: prefetch_related_objects([page], *page_prefetches()),
+    )
+    return render(request, "pages/page_detail.html", {"page": page, "content": content})
+
+
+def page_list_by_category(request, category_slug):
+    """
+    หน้าที่เผยแพร่แล้วในหมวดหมู่ (ล่าสุดก่อน) แบบ keyset pagination (``?after=<cursor>``)
+
+    รายการที่ render แล้วถูก cache ตาม id/``updated_at`` ของหน้าในรายการและของหมวดหมู่
+    รูปหลักของทุกหน้าโหลดใน query เดียว (Prefetch แบบตัดเหลือรูปแรกของแต่ละหน้า)
+    """
+    category = get_object_or_404(Category, slug=category_slug)
+    cursor = request.GET.get("after")
+    try:
+        listing = keyset_paginate(
+            category.pages.filter(is_published=True),
+            ("-created_at", "-id"),
+            cursor,
+            per_page=PAGES_PER_PAGE,
+        )
+    except InvalidCursor:
+        raise Http404("ไม่พบหน้าที่ต้องการ")
+    fingerprint = hashlib.md5(
+        "|".join(
+            [category.updated_at.isoformat(), cursor or "", listing.next_cursor or ""]
+            + [f"{page.pk}:{page.updated_at.isoformat()}" for page in listing.items]
+        ).encode()
+    ).hexdigest()
+    content = cached_render(
+        f"pages:category:{category.pk}:{fingerprint}",
+        "pages/page_list_content.html",
+        {
+            "category": category,
+            "pages": listing.items,
+            "next_cursor": listing.next_cursor,
+            "is_first_page": not cursor,
+        },
+        lambda: prefetch_related_objects(
+            listing.items,
+            Prefetch(
+                "images",
+                queryset=PageImage.objects.order_by("order", "pk")[:1],
+                to_attr="main_images",
+            ),
+        ),
+    )
+    return render(
+        request, "pages/page_list.html", {"category": category, "content": content}
+    )
+
+
+def download_file(request, pk):
+    """
+    ส่งไฟล์แนบของหน้าที่เผยแพร่แล้ว และนับจำนวนดาวน์โหลด
+
+    รองรับ Range และ 304 (mediafiles/delivery.py) โดยนับเฉพาะการดาวน์โหลดที่เริ่มจากไบต์แรก
+    """
+    page_file = get_object_or_404(
+        PageFile.objects.only("file", "original_filename"),
+        pk=pk,
+        page__is_published=True,
+    )
+    response = serve(
+        request,
+        page_file.file.storage,
+        page_file.file.name,
+        as_attachment=True,
+        filename=page_file.display_name,
+    )
+    if response.status_code in (200, 206) and not is_resumed(request):
+        page_file.increment_download_count()
+    return response
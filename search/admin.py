@@ -0,0 +1,15 @@
+from .query import query_terms, search_object_ids
+
+
+class IndexedSearchMixin:
+    """
+    ให้ช่องค้นหาของ ModelAdmin ใช้ดัชนีค้นหาแทน ``ILIKE '%term%'`` บน search_fields
+
+    ใช้กับโมเดลที่อยู่ในดัชนี (มี ``search_document()``) ถ้าคำค้นไม่มี term ที่ใช้ได้
+    (เช่น มีแต่เครื่องหมาย) จะกลับไปใช้ search_fields ตามปกติ
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        if not query_terms(search_term):
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=search_object_ids(self.model, search_term)), False
@@ -0,0 +1,148 @@
+"""
+ปรับปรุงดัชนีค้นหาแบบทีละรายการ
+
+โมเดลที่ค้นหาได้ต้องมีเมธอด ``search_document()`` ซึ่งคืน dict ที่มี
+``title``, ``body``, ``is_public`` และ ``published_at`` แล้วให้ signal ของโมเดลเรียก
+``schedule_index(Model, pk)`` ทุกครั้งที่บันทึกหรือลบ ดัชนีจะถูกปรับหลัง transaction
+commit (รายการเดียวกันที่ถูกบันทึกหลายครั้งใน transaction เดียวทำดัชนีครั้งเดียว)
+ถ้ารายการถูกลบไปแล้ว เอกสารของมันจะถูกลบออกจากดัชนี
+"""
+
+from collections import defaultdict
+from itertools import islice
+from django.apps import apps
+from django.db import connections, router, transaction
+from django.urls import NoReverseMatch
+from core.oncommit import OnCommitBatch
+from .models import SearchDocument, SearchTerm
+from .tokenizer import normalize, term_frequencies
+
+TITLE_WEIGHT = 3  # term ในหัวข้อนับเป็น 3 เท่าของ term ในเนื้อหา
+SNIPPET_LENGTH = 200
+BATCH_SIZE = 500
+INSERT_BATCH_SIZE = 5000
+
+def _index_pending(keys):
+    by_label = defaultdict(set)
+    for label, pk in keys:
+        by_label[label].add(pk)
+    for label, pks in by_label.items():
+        index_objects(apps.get_model(label), pks)
+
+
+_pending = OnCommitBatch(_index_pending)
+flush = _pending.flush  # ทำดัชนีรายการที่รออยู่ทั้งหมด
+
+
+def schedule_index(model, *pks):
+    """ทำดัชนี (หรือลบออกจากดัชนี) รายการเหล่านี้หลัง transaction ปัจจุบัน commit"""
+    _pending.add(*((model._meta.label, pk) for pk in pks if pk is not None))
+
+
+def index_objects(model, pks):
+    """ทำดัชนีรายการตาม pk ใหม่ทั้งหมด รายการที่ไม่มีอยู่แล้วถูกลบออกจากดัชนี"""
+    pks = list(pks)
+    for start in range(0, len(pks), BATCH_SIZE):
+        batch = pks[start : start + BATCH_SIZE]
+        objects = list(
+            model._default_manager.filter(pk__in=batch).prefetch_related(
+                *getattr(model, "search_prefetch", ())
+            )
+        )
+        with transaction.atomic():
+            _write_documents(model, objects)
+            found = {obj.pk for obj in objects}
+            remove_objects(model, [pk for pk in batch if pk not in found])
+
+
+def index_queryset(queryset, batch_size=BATCH_SIZE):
+    """ทำดัชนีทุกรายการใน queryset (ใช้สร้างดัชนีใหม่ทั้งหมด) คืนค่าจำนวนรายการ"""
+    model = queryset.model
+    queryset = queryset.order_by("pk").prefetch_related(
+        *getattr(model, "search_prefetch", ())
+    )
+    count = 0
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        objects = list(page[:batch_size])
+        if not objects:
+            return count
+        with transaction.atomic():
+            _write_documents(model, objects)
+        count += len(objects)
+        last_pk = objects[-1].pk
+
+
+def remove_objects(model, pks):
+    """ลบรายการออกจากดัชนี"""
+    if pks:
+        SearchDocument.objects.filter(
+            model_label=model._meta.label, object_id__in=pks
+        ).delete()
+
+
+def _absolute_url(obj):
+    try:
+        return obj.get_absolute_url()
+    except NoReverseMatch:
+        return ""  # โมเดลยังไม่มีหน้าสาธารณะ
+
+
+def _write_documents(model, objects):
+    if not objects:
+        return
+    label = model._meta.label
+    documents = []
+    frequencies = []
+    for obj in objects:
+        data = obj.search_document()
+        body = normalize(data["body"])
+        documents.append(
+            SearchDocument(
+                model_label=label,
+                object_id=obj.pk,
+                title=data["title"][:255],
+                snippet=" ".join(body.split())[:SNIPPET_LENGTH],
+                url=_absolute_url(obj),
+                is_public=data["is_public"],
+                published_at=data["published_at"],
+            )
+        )
+        terms = term_frequencies(body)
+        for term, count in term_frequencies(data["title"]).items():
+            terms[term] += count * TITLE_WEIGHT
+        frequencies.append(terms)
+
+    documents = SearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=["model_label", "object_id"],
+        update_fields=["title", "snippet", "url", "is_public", "published_at", "indexed_at"],
+    )
+    SearchTerm.objects.filter(document__in=documents).delete()
+    _insert_terms(
+        (term, document.pk, weight)
+        for document, terms in zip(documents, frequencies)
+        for term, weight in terms.items()
+    )
+
+
+def _insert_terms(rows):
+    """
+    INSERT แถวของดัชนีกลับด้วย executemany
+
+    เอกสารหนึ่งรายการมี term หลายร้อยแถว การสร้าง SearchTerm instance ทีละแถวผ่าน
+    bulk_create ใช้เวลาส่วนใหญ่ไปกับ ORM จึงส่ง tuple ตรงไปที่ cursor
+    """
+    connection = connections[router.db_for_write(SearchTerm)]
+    meta = SearchTerm._meta
+    quote = connection.ops.quote_name
+    columns = ", ".join(
+        quote(meta.get_field(name).column) for name in ("term", "document", "weight")
+    )
+    sql = f"INSERT INTO {quote(meta.db_table)} ({columns}) VALUES (%s, %s, %s)"
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while batch := list(islice(rows, INSERT_BATCH_SIZE)):
+            cursor.executemany(sql, batch)
@@ -0,0 +1,124 @@
+"""
+ผลที่วัดได้ (SQLite, ข่าว 100,000 รายการ รายการละ 80 คำ, 5 คำค้น x 5 รอบ)::
+
+    icontains      median   1430.9ms max   2238.6ms
+    search index   median    240.8ms max    605.4ms
+
+สร้างข้อมูล 23.2 วินาที สร้างดัชนี 595.4 วินาที
+"""
+
+import random
+import statistics
+import time
+from itertools import accumulate
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from news.models import Article
+from search.indexing import index_queryset
+from search.query import search
+
+# คำจริงที่ใช้เป็นคำค้น ปนอยู่กับคำสุ่มจำนวนมาก (ความถี่ของคำแบบ Zipf)
+WORDS = (
+    "โรงเรียน นักเรียน ครู ผู้ปกครอง กิจกรรม ประชุม ประกาศ รับสมัคร ทุนการศึกษา "
+    "กีฬาสี วันเด็ก ทัศนศึกษา ห้องสมุด คอมพิวเตอร์ วิทยาศาสตร์ คณิตศาสตร์ ภาษาไทย "
+    "ภาษาอังกฤษ สอบ ผลการเรียน ค่ายลูกเสือ อาหารกลางวัน งบประมาณ ชุมชน โครงการ "
+    "อบรม สัมมนา แข่งขัน รางวัล เหรียญทอง ประจำปี ภาคเรียน หลักสูตร ออนไลน์"
+).split()
+CONSONANTS = "กขคงจชซดตถทนบปผพฟมยรลวสหอ"
+VOWELS = ["", "า", "ิ", "ี", "ุ", "ู", "ั", "ะ"]
+LEADING_VOWELS = ["", "", "", "เ", "แ", "โ", "ไ"]
+FINALS = ["", "", "ก", "ง", "น", "ม", "ย", "ว", "ด", "บ"]
+VOCABULARY_SIZE = 20_000
+QUERIES = ["ทุนการศึกษา", "ค่ายลูกเสือ", "เหรียญทอง", "ประชุมผู้ปกครอง", "วิทยาศาสตร์"]
+
+
+class Command(BaseCommand):
+    help = (
+        "เปรียบเทียบเวลาค้นหาข่าวระหว่าง icontains (แบบเดิมในหน้า admin) กับดัชนีค้นหา "
+        "ข้อมูลทดสอบทั้งหมดถูก rollback"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--articles", type=int, default=100_000)
+        parser.add_argument("--words", type=int, default=80, help="จำนวนคำต่อข่าว")
+        parser.add_argument("--repeat", type=int, default=5, help="จำนวนรอบต่อคำค้น")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            queryset = self.seed(options["articles"], options["words"])
+            self.stdout.write(
+                f"สร้างข่าว {options['articles']} รายการ {time.perf_counter() - started:.1f}s"
+            )
+            started = time.perf_counter()
+            index_queryset(queryset, batch_size=1000)
+            self.stdout.write(f"สร้างดัชนี {time.perf_counter() - started:.1f}s")
+
+            for label, run in (
+                ("icontains", self.search_icontains),
+                ("search index", self.search_index),
+            ):
+                timings = []
+                for query in QUERIES:
+                    for _ in range(options["repeat"]):
+                        started = time.perf_counter()
+                        run(query)
+                        timings.append(time.perf_counter() - started)
+                self.stdout.write(
+                    f"{label:<14} median {statistics.median(timings) * 1000:8.1f}ms "
+                    f"max {max(timings) * 1000:8.1f}ms"
+                )
+            transaction.set_rollback(True)
+
+    def search_icontains(self, query):
+        """แบบเดิม: search_fields = ("title", "content") ของ ArticleAdmin"""
+        queryset = Article.objects.filter(
+            Q(title__icontains=query) | Q(content__icontains=query)
+        )
+        return queryset.count(), list(queryset[:20])
+
+    def search_index(self, query):
+        queryset = search(query, models=[Article], public_only=False)
+        return queryset.count(), list(queryset[:20])
+
+    def vocabulary(self, rng):
+        """คำสุ่มที่มีรูปคล้ายพยางค์ไทย เรียงตามความถี่ (คำแรกพบบ่อยที่สุด)"""
+        words = set(WORDS)
+        while len(words) < VOCABULARY_SIZE:
+            words.add(
+                "".join(
+                    rng.choice(LEADING_VOWELS)
+                    + rng.choice(CONSONANTS)
+                    + rng.choice(VOWELS)
+                    + rng.choice(FINALS)
+                    for _ in range(rng.randint(1, 3))
+                )
+            )
+        words = sorted(words)
+        rng.shuffle(words)
+        return words
+
+    def seed(self, article_count, words_per_article):
+        prefix = f"bench-{time.time_ns()}"
+        rng = random.Random(article_count)
+        words = self.vocabulary(rng)
+        cum_weights = list(accumulate(1 / rank for rank in range(1, len(words) + 1)))
+
+        def text(k):
+            return "".join(rng.choices(words, cum_weights=cum_weights, k=k))
+
+        for start in range(0, article_count, 5000):
+            Article.objects.bulk_create(
+                Article(
+                    title=f"{prefix} {text(4)}",
+                    slug=f"{prefix}-{i}",
+                    content=text(words_per_article),
+                    status=Article.PUBLISHED,
+                )
+                for i in range(start, min(start + 5000, article_count))
+            )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        return Article.objects.filter(slug__startswith=prefix)
@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from news.models import Article
+from pages.models import Page
+from search.indexing import index_queryset
+from search.models import SearchDocument
+
+INDEXED_MODELS = [Article, Page]
+
+
+class Command(BaseCommand):
+    help = "สร้างดัชนีค้นหาใหม่ทั้งหมดสำหรับข่าวและหน้า (ใช้ครั้งแรก หรือหลังเปลี่ยนวิธีตัดคำ)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        for model in INDEXED_MODELS:
+            started = time.perf_counter()
+            # ลบเอกสารของรายการที่ไม่มีอยู่แล้ว ก่อนทำดัชนีรายการที่เหลือใหม่
+            SearchDocument.objects.filter(model_label=model._meta.label).exclude(
+                object_id__in=model._default_manager.values("pk")
+            ).delete()
+            count = index_queryset(
+                model._default_manager.all(), batch_size=options["batch_size"]
+            )
+            self.stdout.write(
+                f"{model._meta.label}: {count} รายการ ({time.perf_counter() - started:.1f}s)"
+            )
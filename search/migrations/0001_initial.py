@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100, verbose_name='โมเดล')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID รายการ')),
+                ('title', models.CharField(max_length=255, verbose_name='หัวข้อ')),
+                ('snippet', models.TextField(blank=True, verbose_name='ข้อความตัวอย่าง')),
+                ('url', models.CharField(blank=True, max_length=500, verbose_name='URL')),
+                ('is_public', models.BooleanField(default=False, verbose_name='เผยแพร่')),
+                ('published_at', models.DateTimeField(blank=True, null=True, verbose_name='วันที่เผยแพร่')),
+                ('indexed_at', models.DateTimeField(auto_now=True, verbose_name='ทำดัชนีเมื่อ')),
+            ],
+            options={
+                'verbose_name': 'เอกสารค้นหา',
+                'verbose_name_plural': 'เอกสารค้นหา',
+                'constraints': [models.UniqueConstraint(fields=('model_label', 'object_id'), name='search_document_unique_object')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='search.searchdocument')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'document', 'weight'], name='search_sear_term_61fbde_idx')],
+            },
+        ),
+    ]
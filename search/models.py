@@ -0,0 +1,48 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    เอกสารหนึ่งรายการในดัชนีค้นหา (ข่าวหนึ่งข่าว หรือหน้าหนึ่งหน้าพร้อมส่วนเนื้อหา)
+    """
+
+    model_label = models.CharField(max_length=100, verbose_name="โมเดล")  # เช่น "news.Article"
+    object_id = models.PositiveBigIntegerField(verbose_name="ID รายการ")
+    title = models.CharField(max_length=255, verbose_name="หัวข้อ")
+    snippet = models.TextField(blank=True, verbose_name="ข้อความตัวอย่าง")
+    url = models.CharField(max_length=500, blank=True, verbose_name="URL")
+    is_public = models.BooleanField(default=False, verbose_name="เผยแพร่")
+    published_at = models.DateTimeField(null=True, blank=True, verbose_name="วันที่เผยแพร่")
+    indexed_at = models.DateTimeField(auto_now=True, verbose_name="ทำดัชนีเมื่อ")
+
+    class Meta:
+        verbose_name = "เอกสารค้นหา"
+        verbose_name_plural = "เอกสารค้นหา"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model_label", "object_id"], name="search_document_unique_object"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.model_label}#{self.object_id} {self.title}"
+
+
+class SearchTerm(models.Model):
+    """
+    ดัชนีกลับ (inverted index): term หนึ่งตัวในเอกสารหนึ่งรายการ พร้อมน้ำหนัก
+    (จำนวนครั้งที่พบ โดย term ในหัวข้อมีน้ำหนักมากกว่าเนื้อหา)
+    """
+
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(
+        SearchDocument, on_delete=models.CASCADE, related_name="terms"
+    )
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        # ครอบคลุมทุกคอลัมน์ที่ query ค้นหาใช้ จึงอ่านจาก index อย่างเดียวได้
+        indexes = [models.Index(fields=["term", "document", "weight"])]
+
+    def __str__(self):
+        return self.term
@@ -0,0 +1,84 @@
+"""
+ค้นหาจากดัชนีและจัดอันดับผลลัพธ์
+
+เอกสารต้องมีทุก term ของคำค้น คะแนนคือผลรวมของ ``น้ำหนัก x idf`` ของแต่ละ term
+โดย ``idf = log(1 + จำนวนเอกสาร / จำนวนเอกสารที่มี term)`` term ที่พบน้อยจึงมีค่ามากกว่า
+"""
+
+import math
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.utils import timezone
+from .models import SearchDocument, SearchTerm
+from .tokenizer import tokenize
+
+
+def query_terms(query):
+    return sorted(set(tokenize(query)))
+
+
+def search(query, models=None, public_only=True):
+    """
+    คืน queryset ของ dict ``{"document_id", "matched", "score"}`` ที่ตรงกับคำค้น
+    เรียงตามคะแนนมากไปน้อย (ใช้ ``load_documents()`` โหลดเอกสารของหน้าผลลัพธ์)
+
+    query เริ่มจาก index ``(term, document)`` ของ SearchTerm แล้วจัดกลุ่มตามเอกสาร
+    จึงอ่านเฉพาะแถวของ term ที่ค้น ไม่ไล่ทุกเอกสาร
+    ``models`` จำกัดเฉพาะโมเดลที่ระบุ ส่วน ``public_only`` ตัดรายการที่ยังไม่เผยแพร่ออก
+    """
+    terms = query_terms(query)
+    hits = SearchTerm.objects.filter(term__in=terms)
+    if models:
+        hits = hits.filter(document__model_label__in=[m._meta.label for m in models])
+    if public_only:
+        hits = hits.filter(
+            document__is_public=True, document__published_at__lte=timezone.now()
+        )
+    if not terms:
+        return hits.none().values("document_id")
+
+    frequencies = dict(
+        SearchTerm.objects.filter(term__in=terms)
+        .values("term")
+        .annotate(df=Count("document_id"))
+        .values_list("term", "df")
+    )
+    if len(frequencies) < len(terms):
+        return hits.none().values("document_id")  # มี term ที่ไม่พบในเอกสารใดเลย
+    total = SearchDocument.objects.count()
+    score = Sum(
+        Case(
+            *[
+                When(term=term, then=F("weight") * Value(math.log(1 + total / df)))
+                for term, df in frequencies.items()
+            ],
+            output_field=FloatField(),
+        )
+    )
+    return (
+        hits.values("document_id")
+        .annotate(matched=Count("pk"), score=score)
+        .filter(matched=len(terms))
+        .order_by("-score", "document_id")
+    )
+
+
+def load_documents(hits):
+    """SearchDocument ของผลลัพธ์ (เช่น หน้าหนึ่งของ Paginator) ตามลำดับคะแนน พร้อม ``score``"""
+    hits = list(hits)
+    documents = SearchDocument.objects.in_bulk([hit["document_id"] for hit in hits])
+    results = []
+    for hit in hits:
+        document = documents.get(hit["document_id"])
+        if document is not None:
+            document.score = hit["score"]
+            results.append(document)
+    return results
+
+
+def search_object_ids(model, query):
+    """subquery ของ pk ที่ตรงกับคำค้น (รวมรายการที่ยังไม่เผยแพร่) สำหรับหน้า admin"""
+    return (
+        search(query, models=[model], public_only=False)
+        .order_by()
+        .values("document__object_id")
+    )
@@ -0,0 +1,134 @@
+from datetime import timedelta
+from django.contrib.admin.sites import AdminSite
+from django.db import IntegrityError, transaction
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from core.testing import QueryPlanTestMixin
+from news.admin import ArticleAdmin
+from news.models import Article, bulk_delete_articles
+from pages.models import ContentSection, Page
+from .models import SearchDocument
+from .query import load_documents, search
+from .tokenizer import tokenize
+
+
+# Create your tests here.
+class TokenizerTests(TestCase):
+    def test_thai_text_becomes_cluster_bigrams(self):
+        self.assertEqual(tokenize("ข่าว"), ["ข่า", "าว"])
+        self.assertEqual(tokenize("ก"), ["ก"])
+
+    def test_html_is_stripped_and_latin_words_lowercased(self):
+        self.assertEqual(
+            tokenize("<p>Django&nbsp;5 <b>ข่าว</b></p>"), ["django", "5", "ข่า", "าว"]
+        )
+
+
+class SearchIndexTests(QueryPlanTestMixin, TestCase):
+    def create_article(self, title, content="", **kwargs):
+        kwargs.setdefault("status", Article.PUBLISHED)
+        with self.captureOnCommitCallbacks(execute=True):
+            return Article.objects.create(
+                title=title, slug=f"a{Article.objects.count()}", content=content, **kwargs
+            )
+
+    def titles(self, query, **kwargs):
+        return [document.title for document in load_documents(search(query, **kwargs))]
+
+    def test_thai_substring_search(self):
+        self.create_article("ประกาศ", "กิจกรรมวันเด็กของโรงเรียนบ้านหนองบัว")
+        self.create_article("อื่น ๆ", "ประชุมผู้ปกครอง")
+        self.assertEqual(self.titles("โรงเรียน"), ["ประกาศ"])
+        self.assertEqual(self.titles("หนองบัว"), ["ประกาศ"])
+        self.assertEqual(self.titles("โรงพยาบาล"), [])
+
+    def test_title_matches_rank_first(self):
+        self.create_article("ข่าวทั่วไป", "มีการแข่งขันกีฬาสีประจำปี")
+        self.create_article("กีฬาสีประจำปี", "รายละเอียดการแข่งขัน")
+        self.assertEqual(self.titles("กีฬาสี"), ["กีฬาสีประจำปี", "ข่าวทั่วไป"])
+
+    def test_unpublished_articles_are_hidden_from_public_search(self):
+        self.create_article("ฉบับร่าง", "ทุนการศึกษา", status=Article.DRAFT)
+        self.create_article(
+            "ตั้งเวลา", "ทุนการศึกษา", publish_date=timezone.now() + timedelta(days=1)
+        )
+        self.assertEqual(self.titles("ทุนการศึกษา"), [])
+        self.assertEqual(
+            sorted(self.titles("ทุนการศึกษา", public_only=False)), ["ฉบับร่าง", "ตั้งเวลา"]
+        )
+
+    def test_index_follows_updates_and_deletes(self):
+        article = self.create_article("ข่าว", "ทัศนศึกษา")
+        article.content = "ค่ายลูกเสือ"
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save()
+        self.assertEqual(self.titles("ทัศนศึกษา"), [])
+        self.assertEqual(self.titles("ลูกเสือ"), ["ข่าว"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article.delete()
+        self.assertFalse(SearchDocument.objects.exists())
+
+    def test_bulk_delete_removes_documents(self):
+        self.create_article("หนึ่ง", "ห้องสมุด")
+        self.create_article("สอง", "ห้องสมุด")
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_delete_articles(Article.objects.all())
+        self.assertFalse(SearchDocument.objects.exists())
+
+    def test_rolled_back_save_is_not_indexed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Article.objects.create(
+                        title="ยกเลิก", slug="x", status=Article.PUBLISHED
+                    )
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+        self.assertFalse(SearchDocument.objects.exists())
+
+    def test_page_sections_are_indexed_with_page(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            page = Page.objects.create(title="เกี่ยวกับเรา", slug="about")
+            ContentSection.objects.create(page=page, content="<p>วิสัยทัศน์ของโรงเรียน</p>")
+        self.assertEqual(self.titles("วิสัยทัศน์"), ["เกี่ยวกับเรา"])
+
+        self.assertEqual(SearchDocument.objects.get().model_label, "pages.Page")
+        with self.captureOnCommitCallbacks(execute=True):
+            page.sections.get().delete()
+        self.assertEqual(self.titles("วิสัยทัศน์"), [])
+
+    def test_search_runs_constant_queries(self):
+        for i in range(5):
+            self.create_article(f"ข่าว {i}", "การประเมินคุณภาพ")
+        # df ของ term + จำนวนเอกสาร + ผลลัพธ์ + เอกสาร
+        with self.assertNumQueries(4):
+            self.assertEqual(len(self.titles("ประเมิน")), 5)
+
+    def test_search_queries_use_indexes(self):
+        for i in range(3):
+            self.create_article(f"ข่าว {i}", "การประเมินคุณภาพ")
+        # COUNT(*) ของจำนวนเอกสารทั้งหมด (ใช้คำนวณ idf) ต้องนับทั้งตารางอยู่แล้ว
+        with self.assertNoSequentialScans(allow=["search_searchdocument"]):
+            self.client.get("/search/", {"q": "ประเมิน"})
+
+    def test_public_endpoint(self):
+        self.create_article("รับสมัครนักเรียน", "เปิดรับสมัครนักเรียนใหม่")
+        response = self.client.get("/search/", {"q": "รับสมัคร"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["count"], 1)
+        self.assertEqual(data["results"][0]["title"], "รับสมัครนักเรียน")
+        self.assertEqual(self.client.get("/search/").json()["count"], 0)
+
+    def test_admin_search_uses_index(self):
+        self.create_article("ฉบับร่าง", "งบประมาณ", status=Article.DRAFT)
+        self.create_article("อื่น", "ไม่เกี่ยว")
+        model_admin = ArticleAdmin(Article, AdminSite())
+        request = RequestFactory().get("/admin/news/article/", {"q": "งบประมาณ"})
+        queryset, may_have_duplicates = model_admin.get_search_results(
+            request, Article.objects.all(), "งบประมาณ"
+        )
+        self.assertFalse(may_have_duplicates)
+        self.assertEqual([a.title for a in queryset], ["ฉบับร่าง"])
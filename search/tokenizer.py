@@ -0,0 +1,53 @@
+"""
+ตัดคำสำหรับดัชนีค้นหา (รองรับภาษาไทย)
+
+ภาษาไทยไม่มีช่องว่างระหว่างคำ จึงตัดข้อความไทยเป็น bigram ของ "กลุ่มอักขระ"
+(พยัญชนะ/สระ พร้อมวรรณยุกต์และสระบน-ล่างที่ตามมา) เช่น ``"ข่าว"`` -> ``["ข่า", "าว"]``
+คำค้นถูกตัดด้วยวิธีเดียวกัน และผลลัพธ์ต้องมี bigram ครบทุกตัว จึงค้นกลางคำได้
+โดยไม่ต้องพึ่งพจนานุกรม ส่วนภาษาอังกฤษและตัวเลขใช้ทั้งคำ (ตัวพิมพ์เล็ก)
+"""
+
+import html
+import re
+import unicodedata
+from collections import Counter
+from django.utils.html import strip_tags
+
+MAX_TERM_LENGTH = 64
+
+_WORD_RE = re.compile(r"[\u0E00-\u0E7F]+|[^\W_\u0E00-\u0E7F]+")
+_THAI_RE = re.compile(r"[\u0E00-\u0E7F]")
+# เครื่องหมายกำกับ (Mn) ของอักษรไทย: ไม้หันอากาศ, สระบน-ล่าง, ไม้ไต่คู้, วรรณยุกต์ ฯลฯ
+_THAI_MARKS = "\u0E31\u0E34-\u0E3A\u0E47-\u0E4E"
+_CLUSTER_RE = re.compile(f"[^{_THAI_MARKS}][{_THAI_MARKS}]*|[{_THAI_MARKS}]+")
+
+
+def normalize(text):
+    """ลบแท็ก HTML (เนื้อหาจาก CKEditor) แล้วปรับเป็น NFC ตัวพิมพ์เล็ก"""
+    text = html.unescape(strip_tags(text or ""))
+    return unicodedata.normalize("NFC", text).lower()
+
+
+def _clusters(run):
+    """แบ่งข้อความไทยเป็นกลุ่มอักขระ: อักขระหลัก + สระบน-ล่าง/วรรณยุกต์ที่ตามมา"""
+    return _CLUSTER_RE.findall(run)
+
+
+def tokenize(text):
+    """ตัดข้อความเป็นรายการ term ตามลำดับที่พบ (ซ้ำได้)"""
+    terms = []
+    for word in _WORD_RE.findall(normalize(text)):
+        if _THAI_RE.match(word):
+            clusters = _clusters(word)
+            if len(clusters) == 1:
+                terms.append(clusters[0])
+            else:
+                terms.extend(a + b for a, b in zip(clusters, clusters[1:]))
+        else:
+            terms.append(word[:MAX_TERM_LENGTH])
+    return terms
+
+
+def term_frequencies(text):
+    """จำนวนครั้งที่แต่ละ term ปรากฏในข้อความ"""
+    return Counter(tokenize(text))
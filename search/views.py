@@ -0,0 +1,35 @@
+from django.core.paginator import Paginator
+from django.http import JsonResponse
+from .query import load_documents, search as search_documents
+
+RESULTS_PER_PAGE = 20
+MAX_QUERY_LENGTH = 200
+
+
+# Create your views here.
+def search(request):
+    """ค้นหาข่าวและหน้าที่เผยแพร่แล้ว: ``/search/?q=<คำค้น>&page=<หน้า>``"""
+    query = request.GET.get("q", "").strip()[:MAX_QUERY_LENGTH]
+    paginator = Paginator(search_documents(query), RESULTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get("page"))
+    return JsonResponse(
+        {
+            "query": query,
+            "count": paginator.count,
+            "page": page.number,
+            "num_pages": paginator.num_pages,
+            "results": [
+                {
+                    "type": document.model_label,
+                    "id": document.object_id,
+                    "title": document.title,
+                    "snippet": document.snippet,
+                    "url": document.url,
+                    "published_at": document.published_at,
+                    "score": round(document.score, 4),
+                }
+                for document in load_documents(page)
+            ],
+        },
+        json_dumps_params={"ensure_ascii": False},
+    )
@@ -0,0 +1,26 @@
+"""
+ปรับตารางสมุดรายชื่อ (``DirectoryEntry``) แบบทีละคน
+
+signal ใน users/models.py เรียก ``schedule_refresh(user_id, ...)`` เมื่อข้อมูลที่แสดงในสมุดรายชื่อ
+ของคนนั้นเปลี่ยน (บัญชี โปรไฟล์ ตำแหน่ง ความเชี่ยวชาญ แท็ก หรือชื่อคณะ/สาขา) แถวของคนนั้น
+ถูกสร้างใหม่หลัง transaction commit (คนเดียวกันที่ถูกแก้หลายครั้งใน transaction เดียวทำครั้งเดียว)
+ถ้าผู้ใช้ถูกลบหรือไม่อยู่ในสมุดรายชื่อแล้ว แถวของเขาจะถูกลบ
+
+การแก้ผ่าน ``QuerySet.update()`` ไม่ส่ง signal ให้รัน ``manage.py rebuild_directory`` หลังจากนั้น
+"""
+
+from django.apps import apps
+from core.oncommit import OnCommitBatch
+
+
+def _refresh(user_ids):
+    apps.get_model("users", "DirectoryEntry").objects.refresh(user_ids)
+
+
+_pending = OnCommitBatch(_refresh)
+flush = _pending.flush  # สร้างแถวของผู้ใช้ที่รออยู่ทั้งหมดใหม่
+
+
+def schedule_refresh(*user_ids):
+    """สร้างแถวของผู้ใช้เหล่านี้ใหม่หลัง transaction ปัจจุบัน commit"""
+    _pending.add(*user_ids)
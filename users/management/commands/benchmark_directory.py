@@ -0,0 +1,136 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from users.models import (
+    CustomUser,
+    Department,
+    DirectoryEntry,
+    Expertise,
+    ExpertiseTag,
+    Faculty,
+    PersonnelProfile,
+    Tag,
+)
+
+FIRST_NAMES = "สมชาย สมหญิง วิชัย อรุณี ประเสริฐ กาญจนา สุรชัย นภา ธนพล ศิริพร".split()
+LAST_NAMES = "ใจดี รักเรียน มีสุข ทองคำ แก้วใส บุญมา ศรีสุข พรหมมา".split()
+AREAS = "สังคมวิทยา รัฐศาสตร์ ประวัติศาสตร์ ภูมิศาสตร์ เศรษฐศาสตร์ จิตวิทยา กฎหมาย การพัฒนาชุมชน".split()
+
+
+class Command(BaseCommand):
+    help = (
+        "เปรียบเทียบการค้นหาบุคลากรแบบ join ตารางต้นทาง กับตารางสมุดรายชื่อ "
+        "ข้อมูลทดสอบทั้งหมดถูก rollback"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50_000)
+        parser.add_argument("--repeat", type=int, default=20, help="จำนวนรอบต่อแบบ")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            departments, tags = self.seed(options["users"])
+            self.stdout.write(
+                f"สร้างผู้ใช้ {options['users']} คน {time.perf_counter() - started:.1f}s"
+            )
+            started = time.perf_counter()
+            DirectoryEntry.objects.rebuild(batch_size=1000)
+            self.stdout.write(f"สร้างสมุดรายชื่อ {time.perf_counter() - started:.1f}s")
+
+            rng = random.Random(0)
+            cases = [
+                (rng.choice(departments).pk, rng.choice(tags).pk, rng.choice(AREAS))
+                for _ in range(options["repeat"])
+            ]
+            for label, run in (
+                ("join (สาขา+แท็ก)", lambda d, t, q: self.join_search(department=d, tag=t)),
+                ("สมุดรายชื่อ (สาขา+แท็ก)", lambda d, t, q: self.directory_search(department=d, tag=t)),
+                ("join (คำค้น)", lambda d, t, q: self.join_search(query=q)),
+                ("สมุดรายชื่อ (คำค้น)", lambda d, t, q: self.directory_search(query=q)),
+            ):
+                timings = []
+                for case in cases:
+                    started = time.perf_counter()
+                    run(*case)
+                    timings.append(time.perf_counter() - started)
+                self.stdout.write(
+                    f"{label:<24} median {statistics.median(timings) * 1000:8.1f}ms "
+                    f"max {max(timings) * 1000:8.1f}ms"
+                )
+            transaction.set_rollback(True)
+
+    def join_search(self, department=None, tag=None, query=""):
+        """แบบเดิม: กรองผ่าน profile -> expertise -> tag แล้วโหลดข้อมูลที่แสดงของแต่ละคน"""
+        queryset = CustomUser.objects.filter(
+            is_active=True, user_type__in=DirectoryEntry.USER_TYPES
+        )
+        if department:
+            queryset = queryset.filter(personnel_profile__Department=department)
+        if tag:
+            queryset = queryset.filter(expertises__expertisetag__Tag=tag)
+        if query:
+            queryset = queryset.filter(
+                Q(first_name__icontains=query)
+                | Q(last_name__icontains=query)
+                | Q(expertises__ExpertiseArea__icontains=query)
+                | Q(personnel_profile__Department__DepartmentName__icontains=query)
+            )
+        users = list(
+            queryset.distinct()
+            .order_by("first_name", "last_name", "pk")
+            .select_related(
+                "personnel_profile__Department__Faculty",
+                "personnel_profile__AdministrativePosition",
+            )
+            .prefetch_related("expertises__expertisetag_set")[:20]
+        )
+        return users
+
+    def directory_search(self, department=None, tag=None, query=""):
+        queryset = DirectoryEntry.objects.search(query, department=department, tag=tag)
+        return list(queryset.order_by("SortName", "UserID")[:20])
+
+    def seed(self, count):
+        prefix = f"bench{time.time_ns()}"
+        rng = random.Random(count)
+        faculties = Faculty.objects.bulk_create(
+            Faculty(FacultyName=f"{prefix} คณะ {i}") for i in range(10)
+        )
+        departments = Department.objects.bulk_create(
+            Department(Faculty=faculties[i % 10], DepartmentName=f"สาขา {i}") for i in range(60)
+        )
+        tags = Tag.objects.bulk_create(Tag(TagName=f"{prefix} แท็ก {i}") for i in range(200))
+        for start in range(0, count, 5000):
+            users = CustomUser.objects.bulk_create(
+                CustomUser(
+                    username=f"{prefix}-{i}",
+                    email=f"{prefix}-{i}@crru.ac.th",
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=f"{rng.choice(LAST_NAMES)} {i}",
+                    user_type="STAFF",
+                )
+                for i in range(start, min(start + 5000, count))
+            )
+            PersonnelProfile.objects.bulk_create(
+                PersonnelProfile(User=user, Department=department, Faculty=department.Faculty)
+                for user in users
+                for department in [rng.choice(departments)]
+            )
+            expertises = Expertise.objects.bulk_create(
+                Expertise(User=user, ExpertiseArea=rng.choice(AREAS))
+                for user in users
+                for _ in range(rng.randint(1, 3))
+            )
+            ExpertiseTag.objects.bulk_create(
+                ExpertiseTag(Expertise=expertise, Tag=tag)
+                for expertise in expertises
+                for tag in rng.sample(tags, rng.randint(1, 3))
+            )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        return departments, tags
@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from users.models import DirectoryEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "สร้างตารางสมุดรายชื่อใหม่ทั้งหมด (ใช้ครั้งแรก หรือหลังแก้ข้อมูลผู้ใช้ด้วย "
+        "QuerySet.update() ซึ่งไม่ส่ง signal)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = DirectoryEntry.objects.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(f"สมุดรายชื่อ: {count} คน ({time.perf_counter() - started:.1f}s)")
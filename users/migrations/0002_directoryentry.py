@@ -0,0 +1,53 @@
+# Generated by Django 5.2.1 on 2026-10-17 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectoryEntry',
+            fields=[
+                ('UserID', models.PositiveIntegerField(primary_key=True, serialize=False, verbose_name='ID ผู้ใช้งาน')),
+                ('UserType', models.CharField(choices=[('STAFF', 'บุคลากร'), ('STUDENT', 'นักศึกษา'), ('SPEAKER', 'วิทยากร'), ('OTHER', 'อื่นๆ')], max_length=10, verbose_name='ประเภทผู้ใช้')),
+                ('FullName', models.CharField(max_length=255, verbose_name='ชื่อ-นามสกุล')),
+                ('SortName', models.CharField(max_length=255, verbose_name='ชื่อสำหรับเรียงลำดับ')),
+                ('EnglishName', models.CharField(blank=True, max_length=255, verbose_name='ชื่อภาษาอังกฤษ')),
+                ('Email', models.EmailField(blank=True, max_length=254, verbose_name='อีเมล')),
+                ('FacultyID', models.IntegerField(blank=True, null=True, verbose_name='ID คณะ')),
+                ('FacultyName', models.CharField(blank=True, max_length=255, verbose_name='คณะ')),
+                ('DepartmentID', models.IntegerField(blank=True, null=True, verbose_name='ID สาขาวิชา')),
+                ('DepartmentName', models.CharField(blank=True, max_length=255, verbose_name='สาขาวิชา')),
+                ('Positions', models.JSONField(blank=True, default=list, verbose_name='ตำแหน่ง')),
+                ('Expertise', models.JSONField(blank=True, default=list, verbose_name='ความเชี่ยวชาญ')),
+                ('Tags', models.JSONField(blank=True, default=list, verbose_name='แท็ก')),
+                ('SearchText', models.TextField(blank=True, verbose_name='ข้อความสำหรับค้นหา')),
+                ('UpdatedAt', models.DateTimeField(auto_now=True, verbose_name='ปรับปรุงเมื่อ')),
+            ],
+            options={
+                'verbose_name': 'สมุดรายชื่อ',
+                'verbose_name_plural': 'สมุดรายชื่อ',
+                'indexes': [models.Index(fields=['SortName', 'UserID'], name='users_directory_name_idx'), models.Index(fields=['FacultyID', 'SortName', 'UserID'], name='users_directory_faculty_idx'), models.Index(fields=['DepartmentID', 'SortName', 'UserID'], name='users_directory_dept_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DirectoryTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('TagID', models.IntegerField(verbose_name='ID แท็ก')),
+                ('FacultyID', models.IntegerField(blank=True, null=True)),
+                ('DepartmentID', models.IntegerField(blank=True, null=True)),
+                ('Entry', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tag_rows', to='users.directoryentry')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['TagID', 'DepartmentID', 'Entry'], name='users_directory_tag_dept_idx'), models.Index(fields=['TagID', 'FacultyID', 'Entry'], name='users_directory_tag_fac_idx')],
+                'constraints': [models.UniqueConstraint(fields=('Entry', 'TagID'), name='users_directory_tag_unique')],
+            },
+        ),
+    ]
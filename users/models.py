@@ -1,12 +1,20 @@
 import os
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Prefetch, Q
 from django.contrib.auth.models import AbstractUser  # สำหรับ Custom User Model
 from datetime import date
 from django.dispatch import receiver
 from django.db.models.signals import (
+    post_delete,
+    post_save,
     pre_delete,
     pre_save,
 )  # สำหรับ Signal การลบ/เปลี่ยนรูปภาพ
+from core.tracking import FieldTrackingMixin
+from mediafiles.cleanup import delete_file_on_commit
+from mediafiles.renditions import Renditions
+from search.tokenizer import normalize
+from .directory import schedule_refresh
 
 
 # --- ฟังก์ชันสำหรับกำหนด path การเก็บรูปภาพของ CustomUser ---
@@ -21,6 +29,29 @@ def user_photo_upload_path(instance, filename):
     return f'photos/users/temp_{instance.email.split("@")[0]}{extension}'
 
 
+class SelectRelatedManager(models.Manager):
+    """
+    manager ที่ join ตารางซึ่ง ``__str__`` ใช้ไว้ล่วงหน้า เช่น รายการตัวเลือกในฟอร์ม
+    และรายการในหน้า admin จึงไม่ query ทีละแถว (สร้างด้วย ``select_related_manager()``)
+    """
+
+    related = ()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # select_related() แบบไม่ระบุฟิลด์จะ join ทุก FK
+        return queryset.select_related(*self.related) if self.related else queryset
+
+
+def select_related_manager(*related):
+    """
+    ``SelectRelatedManager`` ที่ join ``related`` เก็บรายชื่อไว้ที่คลาส ไม่ใช่ส่งผ่าน ``__init__``
+    เพราะ Django สร้าง manager ของ reverse relation (เช่น ``faculty.department_set``)
+    โดย subclass คลาสของ manager แล้วเรียก ``__init__()`` โดยไม่มีอาร์กิวเมนต์
+    """
+    return type("SelectRelatedManager", (SelectRelatedManager,), {"related": related})()
+
+
 # --- 1. โครงสร้างองค์กรและตำแหน่ง (Shared Models) ---
 # Models เหล่านี้เป็นข้อมูลหลักที่ทุกประเภทผู้ใช้งานอาจต้องอ้างอิงถึง
 
@@ -44,6 +75,8 @@ class Department(models.Model):
     DepartmentName = models.CharField(max_length=255, verbose_name="ชื่อสาขาวิชา")
     Description = models.TextField(blank=True, null=True, verbose_name="คำอธิบาย")
 
+    objects = select_related_manager("Faculty")
+
     class Meta:
         verbose_name = "สาขาวิชา"
         verbose_name_plural = "สาขาวิชา"
@@ -80,6 +113,8 @@ class AdministrativePosition(models.Model):
     PositionName = models.CharField(max_length=255, verbose_name="ชื่อตำแหน่งทางผู้บริหาร")
     Description = models.TextField(blank=True, null=True, verbose_name="คำอธิบาย")
 
+    objects = select_related_manager("Faculty")
+
     class Meta:
         verbose_name = "ตำแหน่งทางผู้บริหาร"
         verbose_name_plural = "ตำแหน่งทางผู้บริหาร"
@@ -108,7 +143,7 @@ class PersonnelType(models.Model):
 
 # --- 2. Custom User Model (บัญชีผู้ใช้งานหลัก) ---
 # CustomUser จะเก็บข้อมูลพื้นฐานที่ผู้ใช้ทุกคนมี รวมถึงประเภทผู้ใช้
-class CustomUser(AbstractUser):
+class CustomUser(FieldTrackingMixin, AbstractUser):
     # AbstractUser มี fields พื้นฐานของ User อยู่แล้ว เช่น:
     # username, email, first_name, last_name, password, is_staff, is_active, is_superuser, date_joined, last_login
 
@@ -151,6 +186,8 @@ class CustomUser(AbstractUser):
         verbose_name="รูปภาพประจำตัว",
     )
 
+    tracked_fields = ("Photo",)
+
     class Meta:
         verbose_name = "ผู้ใช้งาน"
         verbose_name_plural = "ผู้ใช้งาน"
@@ -162,33 +199,26 @@ class CustomUser(AbstractUser):
             return self.email
         return f"{full_name} ({self.get_user_type_display()})"
 
+    @property
+    def photo_renditions(self):
+        """รูปย่อของรูปประจำตัว เช่น ``user.photo_renditions.thumb``"""
+        return Renditions(self.Photo)
+
 
 # --- Signals สำหรับจัดการรูปภาพของ CustomUser ---
 # เมื่อมีการเปลี่ยนรูปภาพเก่าจะถูกลบออก
 @receiver(pre_save, sender=CustomUser)
 def auto_delete_photo_on_change(sender, instance, **kwargs):
-    if not instance.pk:  # ถ้าเป็นการสร้างใหม่ ไม่ต้องทำอะไร
-        return False
-
-    try:
-        # ดึงรูปภาพเก่าจากฐานข้อมูล
-        old_photo = sender.objects.get(pk=instance.pk).Photo
-    except sender.DoesNotExist:
-        return False  # ถ้าหาไม่เจอ ก็ไม่ต้องทำอะไร
-
-    new_photo = instance.Photo
-    # ถ้ามีการเปลี่ยนรูปภาพ และไฟล์เก่ามีอยู่จริง ให้ลบไฟล์เก่า
-    if old_photo and old_photo.url != new_photo.url:
-        if os.path.isfile(old_photo.path):
-            os.remove(old_photo.path)
+    # รูปภาพเก่าจากค่าที่จำไว้ตอนโหลด (ไม่ต้องดึงจากฐานข้อมูลซ้ำ)
+    old_photo = instance.replaced_file("Photo")
+    # ถ้ามีการเปลี่ยนรูปภาพ ให้ลบไฟล์เก่าหลัง transaction commit
+    delete_file_on_commit(old_photo)
 
 
 # เมื่อ User ถูกลบ รูปภาพที่เกี่ยวข้องจะถูกลบออกด้วย
 @receiver(pre_delete, sender=CustomUser)
 def auto_delete_photo_on_delete(sender, instance, **kwargs):
-    if instance.Photo:
-        if os.path.isfile(instance.Photo.path):
-            os.remove(instance.Photo.path)
+    delete_file_on_commit(instance.Photo)
 
 
 # --- 3. Profile Models สำหรับแต่ละประเภทผู้ใช้ (One-to-One Link กับ CustomUser) ---
@@ -243,6 +273,8 @@ class PersonnelProfile(models.Model):
         verbose_name="ตำแหน่งทางผู้บริหาร",
     )
 
+    objects = select_related_manager("User")
+
     class Meta:
         verbose_name = "ข้อมูลบุคลากร"
         verbose_name_plural = "ข้อมูลบุคลากร"
@@ -276,6 +308,8 @@ class StudentProfile(models.Model):
         max_length=50, default="กำลังศึกษา", verbose_name="สถานะนักศึกษา"
     )  # เช่น กำลังศึกษา, สำเร็จการศึกษา, พักการเรียน
 
+    objects = select_related_manager("User")
+
     class Meta:
         verbose_name = "ข้อมูลนักศึกษา"
         verbose_name_plural = "ข้อมูลนักศึกษา"
@@ -303,6 +337,8 @@ class SpeakerProfile(models.Model):
     )  # เก็บเป็น String หรือเชื่อมกับ Expertise/Tag ถ้าต้องการละเอียด
     # สามารถเพิ่มฟิลด์อื่น ๆ เช่น ประวัติการบรรยาย, ค่าตอบแทน ฯลฯ
 
+    objects = select_related_manager("User")
+
     class Meta:
         verbose_name = "ข้อมูลวิทยากร"
         verbose_name_plural = "ข้อมูลวิทยากร"
@@ -415,6 +451,8 @@ class ExpertiseTag(models.Model):
     )
     Tag = models.ForeignKey(Tag, on_delete=models.CASCADE, verbose_name="แท็ก")
 
+    objects = select_related_manager("Expertise", "Tag")
+
     class Meta:
         unique_together = ("Expertise", "Tag")  # ห้ามซ้ำกันระหว่างความเชี่ยวชาญและแท็ก
         verbose_name = "ความเชี่ยวชาญกับแท็ก"
@@ -422,3 +460,302 @@ class ExpertiseTag(models.Model):
 
     def __str__(self):
         return f"{self.Expertise.ExpertiseArea} - {self.Tag.TagName}"
+
+
+# --- 6. สมุดรายชื่อ (ข้อมูลสรุปไว้ล่วงหน้าสำหรับหน้าค้นหาบุคลากร) ---
+
+
+class DirectoryEntryManager(models.Manager):
+    BATCH_SIZE = 500
+
+    def people(self):
+        """ผู้ใช้ที่แสดงในสมุดรายชื่อ (ไม่รวมนักศึกษาและบัญชีที่ปิดแล้ว)"""
+        return CustomUser.objects.filter(
+            is_active=True, user_type__in=DirectoryEntry.USER_TYPES
+        )
+
+    def refresh(self, user_ids):
+        """สร้างแถวของผู้ใช้ตาม id ใหม่ ผู้ใช้ที่ไม่อยู่ในสมุดรายชื่อแล้วถูกลบแถวออก"""
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), self.BATCH_SIZE):
+            batch = user_ids[start : start + self.BATCH_SIZE]
+            users = list(self._load(self.people().filter(pk__in=batch)))
+            with transaction.atomic():
+                self._write(users)
+                found = {user.pk for user in users}
+                self.filter(UserID__in=[pk for pk in batch if pk not in found]).delete()
+
+    def rebuild(self, batch_size=BATCH_SIZE):
+        """สร้างสมุดรายชื่อใหม่ทั้งหมด คืนค่าจำนวนแถว"""
+        self.exclude(UserID__in=self.people().values("pk")).delete()
+        queryset = self.people().order_by("pk")
+        count = 0
+        last_pk = None
+        while True:
+            page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            users = list(self._load(page[:batch_size]))
+            if not users:
+                return count
+            with transaction.atomic():
+                self._write(users)
+            count += len(users)
+            last_pk = users[-1].pk
+
+    def search(self, query="", faculty=None, department=None, tag=None):
+        """
+        ค้นหาจากตารางสมุดรายชื่อเท่านั้น (ไม่ join ตารางต้นทาง) คำค้นทุกคำต้องพบในชื่อ
+        ตำแหน่ง คณะ/สาขา หรือความเชี่ยวชาญ ``tag`` ใช้ index ``(TagID, DepartmentID)``
+        """
+        queryset = self.all()
+        if faculty is not None:
+            queryset = queryset.filter(FacultyID=faculty)
+        if department is not None:
+            queryset = queryset.filter(DepartmentID=department)
+        if tag is not None:
+            rows = DirectoryTag.objects.filter(TagID=tag)
+            if department is not None:
+                rows = rows.filter(DepartmentID=department)
+            elif faculty is not None:
+                rows = rows.filter(FacultyID=faculty)
+            queryset = queryset.filter(UserID__in=rows.values("Entry"))
+        for word in normalize(query).split():
+            queryset = queryset.filter(SearchText__contains=word)
+        return queryset
+
+    def _load(self, queryset):
+        today = date.today()
+        return queryset.select_related(
+            "personnel_profile__Faculty",
+            "personnel_profile__Department__Faculty",
+            "personnel_profile__GenericDepartmentPosition",
+            "personnel_profile__AdministrativePosition",
+        ).prefetch_related(
+            Prefetch(
+                "academic_positions",
+                queryset=AcademicPosition.objects.filter(
+                    Q(EndDate__isnull=True) | Q(EndDate__gte=today)
+                ).order_by("-EffectiveDate"),
+            ),
+            Prefetch("expertises", queryset=Expertise.objects.order_by("pk")),
+            Prefetch("expertises__expertisetag_set", queryset=ExpertiseTag.objects.all()),
+        )
+
+    def _write(self, users):
+        if not users:
+            return
+        entries, tags = [], []
+        for user in users:
+            entry = self._entry(user)
+            entries.append(entry)
+            tag_ids = {
+                link.Tag_id for expertise in user.expertises.all()
+                for link in expertise.expertisetag_set.all()
+            }
+            tags.extend(
+                DirectoryTag(
+                    Entry_id=entry.UserID,
+                    TagID=tag_id,
+                    FacultyID=entry.FacultyID,
+                    DepartmentID=entry.DepartmentID,
+                )
+                for tag_id in sorted(tag_ids)
+            )
+        self.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=["UserID"],
+            update_fields=[
+                field.name for field in DirectoryEntry._meta.concrete_fields
+                if not field.primary_key
+            ],
+        )
+        DirectoryTag.objects.filter(Entry__in=[entry.UserID for entry in entries]).delete()
+        DirectoryTag.objects.bulk_create(tags)
+
+    def _entry(self, user):
+        profile = getattr(user, "personnel_profile", None)  # คืน None ถ้าไม่มีโปรไฟล์
+        department = profile.Department if profile else None
+        faculty = (profile.Faculty if profile else None) or (
+            department.Faculty if department else None
+        )
+        positions = [
+            position.PositionName
+            for position in (
+                profile.AdministrativePosition if profile else None,
+                profile.GenericDepartmentPosition if profile else None,
+                *user.academic_positions.all(),
+            )
+            if position
+        ]
+        expertise = [item.ExpertiseArea for item in user.expertises.all()]
+        tags = sorted(
+            {
+                link.Tag.TagName
+                for item in user.expertises.all()
+                for link in item.expertisetag_set.all()
+            }
+        )
+        name = f"{user.first_name} {user.last_name}".strip() or user.email
+        full_name = f"{user.Prefix or ''} {name}".strip()
+        english_name = (
+            f"{user.EnglishFirstName or ''} {user.EnglishLastName or ''}".strip()
+        )
+        return DirectoryEntry(
+            UserID=user.pk,
+            UserType=user.user_type,
+            FullName=full_name[:255],
+            SortName=normalize(name)[:255],
+            EnglishName=english_name[:255],
+            Email=user.email,
+            FacultyID=faculty.pk if faculty else None,
+            FacultyName=faculty.FacultyName if faculty else "",
+            DepartmentID=department.pk if department else None,
+            DepartmentName=department.DepartmentName if department else "",
+            Positions=positions,
+            Expertise=expertise,
+            Tags=tags,
+            SearchText=normalize(
+                " ".join(
+                    [full_name, english_name, user.email, *positions, *expertise, *tags]
+                    + ([faculty.FacultyName] if faculty else [])
+                    + ([department.DepartmentName] if department else [])
+                )
+            ),
+        )
+
+
+class DirectoryEntry(models.Model):
+    """
+    หนึ่งแถวต่อบุคลากร/วิทยากรหนึ่งคน พร้อมคณะ สาขา ตำแหน่ง และความเชี่ยวชาญ/แท็ก
+    สร้างจากตารางต้นทางผ่าน signal (users/directory.py) ใช้สำหรับค้นหาเท่านั้น ห้ามแก้ไขตรง
+    ``UserID`` อ้างถึง CustomUser โดยไม่มี foreign key เช่นเดียวกับ SearchDocument
+    """
+
+    USER_TYPES = ("STAFF", "SPEAKER")
+
+    UserID = models.PositiveIntegerField(primary_key=True, verbose_name="ID ผู้ใช้งาน")
+    UserType = models.CharField(
+        max_length=10, choices=CustomUser.USER_TYPE_CHOICES, verbose_name="ประเภทผู้ใช้"
+    )
+    FullName = models.CharField(max_length=255, verbose_name="ชื่อ-นามสกุล")
+    SortName = models.CharField(max_length=255, verbose_name="ชื่อสำหรับเรียงลำดับ")
+    EnglishName = models.CharField(max_length=255, blank=True, verbose_name="ชื่อภาษาอังกฤษ")
+    Email = models.EmailField(blank=True, verbose_name="อีเมล")
+    FacultyID = models.IntegerField(null=True, blank=True, verbose_name="ID คณะ")
+    FacultyName = models.CharField(max_length=255, blank=True, verbose_name="คณะ")
+    DepartmentID = models.IntegerField(null=True, blank=True, verbose_name="ID สาขาวิชา")
+    DepartmentName = models.CharField(max_length=255, blank=True, verbose_name="สาขาวิชา")
+    Positions = models.JSONField(default=list, blank=True, verbose_name="ตำแหน่ง")
+    Expertise = models.JSONField(default=list, blank=True, verbose_name="ความเชี่ยวชาญ")
+    Tags = models.JSONField(default=list, blank=True, verbose_name="แท็ก")
+    SearchText = models.TextField(blank=True, verbose_name="ข้อความสำหรับค้นหา")
+    UpdatedAt = models.DateTimeField(auto_now=True, verbose_name="ปรับปรุงเมื่อ")
+
+    objects = DirectoryEntryManager()
+
+    class Meta:
+        verbose_name = "สมุดรายชื่อ"
+        verbose_name_plural = "สมุดรายชื่อ"
+        # หน้ารายชื่อเรียงตามชื่อ (ต่อหน้าแบบ keyset) ทั้งหมด รายคณะ และรายสาขา
+        indexes = [
+            models.Index(fields=["SortName", "UserID"], name="users_directory_name_idx"),
+            models.Index(
+                fields=["FacultyID", "SortName", "UserID"], name="users_directory_faculty_idx"
+            ),
+            models.Index(
+                fields=["DepartmentID", "SortName", "UserID"],
+                name="users_directory_dept_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return self.FullName
+
+
+class DirectoryTag(models.Model):
+    """แท็กความเชี่ยวชาญของแถวในสมุดรายชื่อ พร้อมคณะ/สาขาของคนนั้นสำหรับกรองใน index เดียว"""
+
+    Entry = models.ForeignKey(
+        DirectoryEntry,
+        on_delete=models.CASCADE,
+        related_name="tag_rows",
+        db_index=False,  # ครอบคลุมโดย unique (Entry, TagID) แล้ว
+    )
+    TagID = models.IntegerField(verbose_name="ID แท็ก")
+    FacultyID = models.IntegerField(null=True, blank=True)
+    DepartmentID = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["Entry", "TagID"], name="users_directory_tag_unique")
+        ]
+        indexes = [
+            models.Index(
+                fields=["TagID", "DepartmentID", "Entry"], name="users_directory_tag_dept_idx"
+            ),
+            models.Index(
+                fields=["TagID", "FacultyID", "Entry"], name="users_directory_tag_fac_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.Entry_id}:{self.TagID}"
+
+
+# --- Signals สำหรับปรับสมุดรายชื่อ ---
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_directory(sender, instance, **kwargs):
+    schedule_refresh(instance.pk)
+
+
+@receiver(post_save, sender=PersonnelProfile)
+@receiver(post_delete, sender=PersonnelProfile)
+@receiver(post_save, sender=AcademicPosition)
+@receiver(post_delete, sender=AcademicPosition)
+@receiver(post_save, sender=Expertise)
+@receiver(post_delete, sender=Expertise)
+def profile_directory(sender, instance, **kwargs):
+    schedule_refresh(instance.User_id)
+
+
+@receiver(post_save, sender=ExpertiseTag)
+@receiver(post_delete, sender=ExpertiseTag)
+def expertise_tag_directory(sender, instance, **kwargs):
+    # ถ้าความเชี่ยวชาญถูกลบไปพร้อมกัน signal ของ Expertise จะปรับแถวให้เอง
+    schedule_refresh(
+        *Expertise.objects.filter(pk=instance.Expertise_id).values_list("User_id", flat=True)
+    )
+
+
+# ชื่อคณะ สาขา ตำแหน่ง และแท็กถูกเก็บซ้ำไว้ในแถวของทุกคนที่อ้างถึง
+# ใช้ pre_delete เพราะหลังลบ โปรไฟล์ถูกตั้งเป็น NULL ด้วย UPDATE ที่ไม่ส่ง signal ไปแล้ว
+_DIRECTORY_LOOKUPS = {
+    Faculty: lambda pk: PersonnelProfile.objects.filter(
+        Q(Faculty=pk) | Q(Department__Faculty=pk)
+    ).values_list("User_id", flat=True),
+    Department: lambda pk: PersonnelProfile.objects.filter(Department=pk).values_list(
+        "User_id", flat=True
+    ),
+    GenericDepartmentPosition: lambda pk: PersonnelProfile.objects.filter(
+        GenericDepartmentPosition=pk
+    ).values_list("User_id", flat=True),
+    AdministrativePosition: lambda pk: PersonnelProfile.objects.filter(
+        AdministrativePosition=pk
+    ).values_list("User_id", flat=True),
+    Tag: lambda pk: Expertise.objects.filter(expertisetag__Tag=pk).values_list(
+        "User_id", flat=True
+    ),
+}
+
+
+def lookup_directory(sender, instance, created=False, **kwargs):
+    if not created:
+        schedule_refresh(*_DIRECTORY_LOOKUPS[sender](instance.pk))
+
+
+for _model in _DIRECTORY_LOOKUPS:
+    post_save.connect(lookup_directory, sender=_model)
+    pre_delete.connect(lookup_directory, sender=_model)
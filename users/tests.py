@@ -1,3 +1,177 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from mediafiles import cleanup
+from core.testing import QueryPlanTestMixin
+from .models import (
+    AcademicPosition,
+    AdministrativePosition,
+    CustomUser,
+    Department,
+    DirectoryEntry,
+    Expertise,
+    ExpertiseTag,
+    Faculty,
+    PersonnelProfile,
+    Tag,
+)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
 
 # Create your tests here.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CustomUserPhotoTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create(username="staff", email="staff@crru.ac.th")
+        user.Photo = SimpleUploadedFile("photo.jpg", b"old")
+        user.save()
+        self.user = CustomUser.objects.get(pk=user.pk)
+
+    def test_save_runs_single_update(self):
+        self.user.first_name = "สมชาย"
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save()
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]["sql"].startswith("UPDATE"))
+
+    def test_replacing_photo_removes_old_file(self):
+        old_path = self.user.Photo.path
+        self.user.Photo = SimpleUploadedFile("new.jpg", b"new")
+        with self.captureOnCommitCallbacks(execute=True):
+            # upsert ไฟล์ใน storage + UPDATE
+            with self.assertNumQueries(2):
+                self.user.save()
+        cleanup.wait()
+        self.assertFalse(os.path.exists(old_path))
+        with self.user.Photo.open("rb") as photo:
+            self.assertEqual(photo.read(), b"new")
+
+
+class RelatedStrQueryTests(TestCase):
+    """``__str__`` ที่อ้างถึงตารางอื่นต้องไม่ query ทีละแถว"""
+
+    def test_str_uses_joined_rows(self):
+        faculty = Faculty.objects.create(FacultyName="คณะครุศาสตร์")
+        Department.objects.bulk_create(
+            Department(Faculty=faculty, DepartmentName=f"สาขา {i}") for i in range(5)
+        )
+        users = CustomUser.objects.bulk_create(
+            CustomUser(username=f"user{i}", email=f"user{i}@crru.ac.th") for i in range(5)
+        )
+        PersonnelProfile.objects.bulk_create(PersonnelProfile(User=user) for user in users)
+        for model in (Department, PersonnelProfile, ExpertiseTag):
+            with self.subTest(model=model.__name__), self.assertNumQueries(1):
+                [str(obj) for obj in model.objects.all()]
+
+    def test_reverse_manager_joins_only_declared_relations(self):
+        # Django สร้าง manager ของ reverse relation จากคลาสของ manager โดยไม่ส่งอาร์กิวเมนต์
+        faculty = Faculty.objects.create(FacultyName="คณะครุศาสตร์")
+        for manager in (faculty.department_set, faculty.administrativeposition_set):
+            with self.subTest(model=manager.model.__name__):
+                self.assertEqual(manager.all().query.select_related, {"Faculty": {}})
+
+
+class DirectoryTests(QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.faculty = Faculty.objects.create(FacultyName="คณะมนุษยศาสตร์และสังคมศาสตร์")
+        cls.department = Department.objects.create(Faculty=cls.faculty, DepartmentName="รัฐศาสตร์")
+        cls.other_department = Department.objects.create(
+            Faculty=cls.faculty, DepartmentName="สังคมวิทยา"
+        )
+        cls.tag = Tag.objects.create(TagName="การเมืองท้องถิ่น")
+
+    def add_staff(self, username, department, tag=None, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = CustomUser.objects.create(
+                username=username, email=f"{username}@crru.ac.th", user_type="STAFF", **fields
+            )
+            PersonnelProfile.objects.create(User=user, Department=department)
+            expertise = Expertise.objects.create(User=user, ExpertiseArea="การปกครองส่วนท้องถิ่น")
+            if tag:
+                ExpertiseTag.objects.create(Expertise=expertise, Tag=tag)
+        return user
+
+    def test_entry_is_kept_in_sync_by_signals(self):
+        user = self.add_staff(
+            "somchai", self.department, self.tag, Prefix="ผศ.", first_name="สมชาย", last_name="ใจดี"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            AcademicPosition.objects.create(
+                User=user, PositionName="ผู้ช่วยศาสตราจารย์", EffectiveDate="2020-01-01"
+            )
+            user.personnel_profile.AdministrativePosition = AdministrativePosition.objects.create(
+                Faculty=self.faculty, PositionName="รองคณบดี"
+            )
+            user.personnel_profile.save()
+        entry = DirectoryEntry.objects.get(UserID=user.pk)
+        self.assertEqual(entry.FullName, "ผศ. สมชาย ใจดี")
+        self.assertEqual((entry.FacultyName, entry.DepartmentName), (self.faculty.FacultyName, "รัฐศาสตร์"))
+        self.assertEqual(entry.Positions, ["รองคณบดี", "ผู้ช่วยศาสตราจารย์"])
+        self.assertEqual(entry.Tags, ["การเมืองท้องถิ่น"])
+
+        # ชื่อสาขาที่เก็บซ้ำไว้ถูกปรับตามเมื่อสาขาถูกแก้ไข
+        with self.captureOnCommitCallbacks(execute=True):
+            self.department.DepartmentName = "รัฐประศาสนศาสตร์"
+            self.department.save()
+        entry.refresh_from_db()
+        self.assertEqual(entry.DepartmentName, "รัฐประศาสนศาสตร์")
+
+        tag_id = self.tag.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.delete()
+        self.assertFalse(DirectoryEntry.objects.search(tag=tag_id).exists())
+        self.assertEqual(DirectoryEntry.objects.get(UserID=user.pk).Tags, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.is_active = False
+            user.save()
+        self.assertFalse(DirectoryEntry.objects.filter(UserID=user.pk).exists())
+
+    def test_students_are_not_listed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomUser.objects.create(username="student", user_type="STUDENT")
+        self.assertFalse(DirectoryEntry.objects.exists())
+
+    def test_search_api_filters_by_department_tag_and_text(self):
+        match = self.add_staff("a", self.department, self.tag, first_name="อรุณี")
+        self.add_staff("b", self.department, first_name="บุญมา")
+        self.add_staff("c", self.other_department, self.tag, first_name="ชัยวัฒน์")
+        url = reverse("users:directory")
+
+        response = self.client.get(url, {"department": self.department.pk, "tag": self.tag.pk})
+        self.assertEqual([r["id"] for r in response.json()["results"]], [match.pk])
+        response = self.client.get(url, {"q": "อรุณี ท้องถิ่น"})
+        self.assertEqual([r["id"] for r in response.json()["results"]], [match.pk])
+        response = self.client.get(url, {"faculty": self.faculty.pk})
+        self.assertEqual(len(response.json()["results"]), 3)
+        self.assertEqual(self.client.get(url, {"tag": "x"}).status_code, 400)
+
+    def test_search_reads_only_the_directory_with_indexes(self):
+        self.add_staff("a", self.department, self.tag)
+        with self.assertNumQueries(1):
+            self.client.get(reverse("users:directory"), {"department": self.department.pk})
+        self.assertQueryUsesIndex(
+            DirectoryEntry.objects.search(department=self.department.pk, tag=self.tag.pk)
+            .order_by("SortName", "UserID")[:20]
+        )
+        self.assertQueryUsesIndex(
+            DirectoryEntry.objects.search(faculty=self.faculty.pk).order_by("SortName", "UserID")[:20]
+        )
+
+    def test_rebuild_restores_rows_after_bulk_changes(self):
+        user = self.add_staff("a", self.department, self.tag)
+        CustomUser.objects.filter(pk=user.pk).update(first_name="ใหม่")  # ไม่ส่ง signal
+        DirectoryEntry.objects.filter(UserID=user.pk).delete()
+        self.assertEqual(DirectoryEntry.objects.rebuild(), 1)
+        self.assertEqual(DirectoryEntry.objects.get(UserID=user.pk).FullName, "ใหม่")
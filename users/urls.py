@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = "users"
+
+urlpatterns = [
+    path("directory/", views.directory, name="directory"),
+]
@@ -1,3 +1,61 @@
-from django.shortcuts import render
+from django.http import Http404, JsonResponse
+from django.utils.cache import patch_cache_control
+from core.pagination import InvalidCursor, keyset_paginate
+from .models import DirectoryEntry
+
+RESULTS_PER_PAGE = 20
+MAX_QUERY_LENGTH = 200
+CACHE_MAX_AGE = 60  # วินาที
+
 
 # Create your views here.
+def directory(request):
+    """
+    ค้นหาบุคลากร: ``/users/directory/?q=<คำค้น>&faculty=<id>&department=<id>&tag=<id>&after=<cursor>``
+    อ่านจากตารางสมุดรายชื่อเท่านั้น เรียงตามชื่อแบบ keyset pagination
+    """
+    filters = {}
+    for name in ("faculty", "department", "tag"):
+        value = request.GET.get(name, "").strip()
+        if value:
+            if not value.isdigit():
+                return JsonResponse({"error": f"{name} ต้องเป็นตัวเลข"}, status=400)
+            filters[name] = int(value)
+    query = request.GET.get("q", "").strip()[:MAX_QUERY_LENGTH]
+    try:
+        page = keyset_paginate(
+            DirectoryEntry.objects.search(query, **filters).defer("SearchText"),
+            ("SortName", "UserID"),
+            request.GET.get("after"),
+            per_page=RESULTS_PER_PAGE,
+        )
+    except InvalidCursor:
+        raise Http404("ไม่พบหน้าที่ต้องการ")
+    response = JsonResponse(
+        {
+            "query": query,
+            "next": page.next_cursor,
+            "results": [
+                {
+                    "id": entry.UserID,
+                    "name": entry.FullName,
+                    "english_name": entry.EnglishName,
+                    "email": entry.Email,
+                    "type": entry.UserType,
+                    "faculty": {"id": entry.FacultyID, "name": entry.FacultyName}
+                    if entry.FacultyID
+                    else None,
+                    "department": {"id": entry.DepartmentID, "name": entry.DepartmentName}
+                    if entry.DepartmentID
+                    else None,
+                    "positions": entry.Positions,
+                    "expertise": entry.Expertise,
+                    "tags": entry.Tags,
+                }
+                for entry in page.items
+            ],
+        },
+        json_dumps_params={"ensure_ascii": False},
+    )
+    patch_cache_control(response, public=True, max_age=CACHE_MAX_AGE)
+    return response